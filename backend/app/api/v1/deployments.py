@@ -1,12 +1,12 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional
 
-from ...database import get_db
+from ...database import get_async_db
 from ...models.node import Node
-from ...services.node_client import node_manager
+from ...services.cluster_state import cluster_state_cache
 from ...schemas.common import APIResponse
 from ...schemas.deployment import DeploymentSummary, NodeDeploymentStatus, GPUDeploymentStatus, DeployedModelInfo, ModelDeploymentStat
 from collections import Counter
@@ -17,24 +17,26 @@ logger = logging.getLogger(__name__)
 @router.get("/status", response_model=APIResponse[DeploymentSummary])
 async def get_deployment_status(
     environment_id: int = None,
-    db: Session = Depends(get_db)
+    max_staleness: Optional[float] = Query(None, ge=0, description="可接受的节点状态最大年龄（秒），默认使用缓存配置"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取所有节点的部署状态概览，包括模型统计和GPU负载"""
-    logger.info(f"获取部署状态概览: environment_id={environment_id}")
+    logger.info(f"获取部署状态概览: environment_id={environment_id}, max_staleness={max_staleness}")
     
-    query = db.query(Node)
+    query = select(Node)
     if environment_id:
-        query = query.filter(Node.environment_id == environment_id)
-    nodes = query.all()
+        query = query.where(Node.environment_id == environment_id)
+    nodes = (await db.scalars(query)).all()
     
     if not nodes:
         return APIResponse(data=DeploymentSummary(model_stats=[], deployment_statuses=[]), message="没有找到任何节点")
 
     node_dicts = [{"node_ip": n.node_ip, "node_port": n.node_port} for n in nodes]
     
-    # 并行获取模型状态和GPU状态
+    # 从集群状态缓存读取模型状态和GPU状态
     try:
-        model_status_map, gpu_status_map = await node_manager.batch_get_status(node_dicts)
+        snapshot = await cluster_state_cache.get_status(node_dicts, max_staleness=max_staleness)
+        model_status_map, gpu_status_map = snapshot.model_status, snapshot.gpu_status
     except Exception as e:
         logger.error(f"批量获取模型或GPU状态失败: {e}")
         raise HTTPException(status_code=500, detail=f"批量获取状态失败: {e}")
@@ -47,8 +49,8 @@ async def get_deployment_status(
         running_models = model_status_map.get(node_key, [])
         gpu_loads = gpu_status_map.get(node_key, [])
         
-        db_available_gpu_ids = json.loads(node.available_gpu_ids) if node.available_gpu_ids else []
-        available_models = json.loads(node.available_models) if node.available_models else []
+        db_available_gpu_ids = node.available_gpu_ids
+        available_models = node.available_models
 
         gpu_map: Dict[int, GPUDeploymentStatus] = {}
 
@@ -104,7 +106,9 @@ async def get_deployment_status(
 
     summary = DeploymentSummary(
         model_stats=model_stats,
-        deployment_statuses=deployment_statuses
+        deployment_statuses=deployment_statuses,
+        snapshot_time=snapshot.fetched_at,
+        snapshot_age=round(snapshot.age, 3)
     )
 
     return APIResponse(
@@ -2,13 +2,15 @@
 节点操作API - 与节点端Model Inference Client API集成
 """
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
 
-from ...database import get_db
+from ...database import get_async_db
 from ...models.node import Node
 from ...services.node_client import node_manager
+from ...services.cluster_state import cluster_state_cache
 from ...schemas.common import APIResponse
 
 router = APIRouter()
@@ -17,12 +19,12 @@ logger = logging.getLogger(__name__)
 @router.get("/{node_id}/gpu-status", response_model=APIResponse[List[Dict[str, Any]]])
 async def get_node_gpu_status(
     node_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取节点GPU状态"""
     logger.info(f"获取节点GPU状态: node_id={node_id}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -44,12 +46,12 @@ async def get_node_gpu_status(
 @router.get("/{node_id}/model-status", response_model=APIResponse[List[Dict[str, Any]]])
 async def get_node_model_status(
     node_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取节点模型状态"""
     logger.info(f"获取节点模型状态: node_id={node_id}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -74,12 +76,12 @@ async def start_model_on_node(
     model_name: str,
     gpu_id: int,
     config: Dict[str, Any] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """在节点上启动模型"""
     logger.info(f"在节点上启动模型: node_id={node_id}, model_name='{model_name}', gpu_id={gpu_id}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -87,6 +89,7 @@ async def start_model_on_node(
         # 获取节点客户端并启动模型
         client = node_manager.get_client(node.node_ip, node.node_port)
         result = await client.start_model(model_name, gpu_id, config)
+        cluster_state_cache.invalidate(f"{node.node_ip}:{node.node_port}")
         
         return APIResponse(
             data=result,
@@ -103,12 +106,12 @@ async def stop_model_on_node(
     node_id: int,
     model_name: str,
     gpu_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """在节点上停止模型"""
     logger.info(f"在节点上停止模型: node_id={node_id}, model_name='{model_name}', gpu_id={gpu_id}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -116,6 +119,7 @@ async def stop_model_on_node(
         # 获取节点客户端并停止模型
         client = node_manager.get_client(node.node_ip, node.node_port)
         result = await client.stop_model(model_name, gpu_id)
+        cluster_state_cache.invalidate(f"{node.node_ip}:{node.node_port}")
         
         return APIResponse(
             data=result,
@@ -131,12 +135,12 @@ async def stop_model_on_node(
 async def kill_process_on_node(
     node_id: int,
     pid: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """在节点上终止进程"""
     logger.info(f"在节点上终止进程: node_id={node_id}, pid={pid}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -144,6 +148,7 @@ async def kill_process_on_node(
         # 获取节点客户端并终止进程
         client = node_manager.get_client(node.node_ip, node.node_port)
         result = await client.kill_process(pid)
+        cluster_state_cache.invalidate(f"{node.node_ip}:{node.node_port}")
         
         return APIResponse(
             data=result,
@@ -158,16 +163,16 @@ async def kill_process_on_node(
 @router.get("/batch/health-check", response_model=APIResponse[Dict[str, bool]])
 async def batch_health_check(
     environment_id: int = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """批量健康检查"""
     logger.info(f"批量健康检查: environment_id={environment_id}")
     # 获取节点列表
-    query = db.query(Node)
+    query = select(Node)
     if environment_id:
-        query = query.filter(Node.environment_id == environment_id)
+        query = query.where(Node.environment_id == environment_id)
     
-    nodes = query.all()
+    nodes = (await db.scalars(query)).all()
     if not nodes:
         return APIResponse(
             data={},
@@ -200,16 +205,17 @@ async def batch_health_check(
 @router.get("/batch/gpu-status", response_model=APIResponse[Dict[str, List[Dict[str, Any]]]])
 async def batch_get_gpu_status(
     environment_id: int = None,
-    db: Session = Depends(get_db)
+    max_staleness: Optional[float] = Query(None, ge=0, description="可接受的节点状态最大年龄（秒）"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """批量获取GPU状态"""
     logger.info(f"批量获取GPU状态: environment_id={environment_id}")
     # 获取节点列表
-    query = db.query(Node)
+    query = select(Node)
     if environment_id:
-        query = query.filter(Node.environment_id == environment_id)
+        query = query.where(Node.environment_id == environment_id)
     
-    nodes = query.all()
+    nodes = (await db.scalars(query)).all()
     if not nodes:
         return APIResponse(
             data={},
@@ -226,8 +232,9 @@ async def batch_get_gpu_status(
             for node in nodes
         ]
         
-        # 批量获取GPU状态
-        gpu_status = await node_manager.batch_get_gpu_status(node_dicts)
+        # 从集群状态缓存获取GPU状态
+        snapshot = await cluster_state_cache.get_status(node_dicts, max_staleness=max_staleness)
+        gpu_status = snapshot.gpu_status
         
         return APIResponse(
             data=gpu_status,
@@ -242,16 +249,17 @@ async def batch_get_gpu_status(
 @router.get("/batch/model-status", response_model=APIResponse[Dict[str, List[Dict[str, Any]]]])
 async def batch_get_model_status(
     environment_id: int = None,
-    db: Session = Depends(get_db)
+    max_staleness: Optional[float] = Query(None, ge=0, description="可接受的节点状态最大年龄（秒）"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """批量获取模型状态"""
     logger.info(f"批量获取模型状态: environment_id={environment_id}")
     # 获取节点列表
-    query = db.query(Node)
+    query = select(Node)
     if environment_id:
-        query = query.filter(Node.environment_id == environment_id)
+        query = query.where(Node.environment_id == environment_id)
     
-    nodes = query.all()
+    nodes = (await db.scalars(query)).all()
     if not nodes:
         return APIResponse(
             data={},
@@ -268,8 +276,9 @@ async def batch_get_model_status(
             for node in nodes
         ]
         
-        # 批量获取模型状态
-        model_status = await node_manager.batch_get_model_status(node_dicts)
+        # 从集群状态缓存获取模型状态
+        snapshot = await cluster_state_cache.get_status(node_dicts, max_staleness=max_staleness)
+        model_status = snapshot.model_status
         
         return APIResponse(
             data=model_status,
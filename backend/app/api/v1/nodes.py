@@ -1,16 +1,20 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
-import json
 from datetime import datetime
 
-from ...database import get_db
+from ...database import get_db, get_async_db
 from ...models.node import Node
+from ...models.node_gpu import NodeGpu
+from ...models.node_supported_model import NodeSupportedModel
 from ...models.environment import Environment
 from ...schemas.node import Node as NodeSchema, NodeCreate, NodeUpdate, NodeStatusUpdate
 from ...schemas.common import APIResponse
 from ...services.node_client import node_manager
+from ...services.cluster_state import cluster_state_cache
+from ...services.node_capabilities import free_gpus_query
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -19,26 +23,30 @@ logger = logging.getLogger(__name__)
 def get_nodes(
     environment_id: int = None,
     status: str = None,
+    model_name: str = None,
+    has_free_gpu: bool = False,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    """获取所有节点"""
-    logger.info(f"获取节点列表: environment_id={environment_id}, status='{status}', skip={skip}, limit={limit}")
+    """获取所有节点，可按支持的模型、是否有空闲GPU筛选"""
+    logger.info(
+        f"获取节点列表: environment_id={environment_id}, status='{status}', model_name='{model_name}', "
+        f"has_free_gpu={has_free_gpu}, skip={skip}, limit={limit}"
+    )
     query = db.query(Node)
     if environment_id:
         query = query.filter(Node.environment_id == environment_id)
     if status:
         query = query.filter(Node.status == status)
+    if has_free_gpu:
+        # 空闲GPU查询已按模型筛选，不再单独连接 node_supported_models
+        free_nodes = free_gpus_query(model_name, online_only=False).with_only_columns(NodeGpu.node_id)
+        query = query.filter(Node.id.in_(free_nodes))
+    elif model_name:
+        query = query.filter(Node.supported_models.any(NodeSupportedModel.model_name == model_name))
     
-    nodes = query.offset(skip).limit(limit).all()
-    
-    # 转换JSON字段
-    for node in nodes:
-        if node.available_gpu_ids:
-            node.available_gpu_ids = json.loads(node.available_gpu_ids)
-        if node.available_models:
-            node.available_models = json.loads(node.available_models)
+    nodes = query.order_by(Node.id).offset(skip).limit(limit).all()
     
     return APIResponse(
         data=nodes,
@@ -70,19 +78,11 @@ def create_node(
         )
     
     # 创建新节点
-    node_data = node.dict()
-    node_data['available_gpu_ids'] = json.dumps(node_data['available_gpu_ids'])
-    node_data['available_models'] = json.dumps(node_data['available_models'])
-    
-    db_node = Node(**node_data)
+    db_node = Node(**node.dict())
     db.add(db_node)
     db.commit()
     db.refresh(db_node)
     
-    # 转换JSON字段用于响应
-    db_node.available_gpu_ids = json.loads(db_node.available_gpu_ids)
-    db_node.available_models = json.loads(db_node.available_models)
-    
     return APIResponse(
         data=db_node,
         message=f"节点 {node.node_ip}:{node.node_port} 添加成功"
@@ -99,12 +99,6 @@ def get_node(
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
-    # 转换JSON字段
-    if node.available_gpu_ids:
-        node.available_gpu_ids = json.loads(node.available_gpu_ids)
-    if node.available_models:
-        node.available_models = json.loads(node.available_models)
-    
     return APIResponse(
         data=node,
         message="节点详情获取成功"
@@ -140,21 +134,20 @@ def update_node(
                 detail=f"节点 {new_ip}:{new_port} 在当前环境中已存在"
             )
     
+    # 地址变更时回收旧地址的客户端
+    old_ip, old_port = node.node_ip, node.node_port
+
     # 更新节点信息
     update_data = node_update.dict(exclude_unset=True)
     for field, value in update_data.items():
-        if field in ['available_gpu_ids', 'available_models'] and value is not None:
-            value = json.dumps(value)
         setattr(node, field, value)
     
     db.commit()
     db.refresh(node)
     
-    # 转换JSON字段用于响应
-    if node.available_gpu_ids:
-        node.available_gpu_ids = json.loads(node.available_gpu_ids)
-    if node.available_models:
-        node.available_models = json.loads(node.available_models)
+    if (node.node_ip, node.node_port) != (old_ip, old_port):
+        node_manager.remove_client(old_ip, old_port)
+        cluster_state_cache.invalidate(f"{old_ip}:{old_port}")
     
     return APIResponse(
         data=node,
@@ -176,6 +169,10 @@ def delete_node(
     db.delete(node)
     db.commit()
     
+    # 回收该节点的客户端和缓存状态
+    node_manager.remove_client(node.node_ip, node.node_port)
+    cluster_state_cache.invalidate(node_info)
+    
     return APIResponse(
         data={"deleted_id": node_id},
         message=f"节点 {node_info} 删除成功"
@@ -198,9 +195,9 @@ def update_node_heartbeat(
     node.status = status_update.status
     
     if status_update.available_gpu_ids is not None:
-        node.available_gpu_ids = json.dumps(status_update.available_gpu_ids)
+        node.available_gpu_ids = status_update.available_gpu_ids
     if status_update.available_models is not None:
-        node.available_models = json.dumps(status_update.available_models)
+        node.available_models = status_update.available_models
     
     db.commit()
     
@@ -212,13 +209,13 @@ def update_node_heartbeat(
 @router.post("/{node_id}/discover_models", response_model=APIResponse[dict])
 async def discover_node_models(
     node_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     发现并更新节点可用模型列表到数据库
     """
     logger.info(f"发现并更新节点可用模型: id={node_id}")
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id, options=[selectinload(Node.supported_models)])
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -231,9 +228,9 @@ async def discover_node_models(
         discovered_models = list(supported_models.keys())
         
         # 更新节点的可用模型列表
-        node.available_models = json.dumps(discovered_models)
+        node.available_models = discovered_models
         node.updated_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         return APIResponse(
             data={
@@ -262,9 +259,7 @@ def get_node_models(
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
-    models = []
-    if node.available_models:
-        models = json.loads(node.available_models)
+    models = node.available_models
     
     return APIResponse(
         data=models,
@@ -274,11 +269,11 @@ def get_node_models(
 @router.get("/{node_id}/status", response_model=APIResponse[dict])
 async def get_node_status(
     node_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """检查并获取节点状态信息"""
     logger.info(f"检查并获取节点状态: id={node_id}")
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -295,22 +290,16 @@ async def get_node_status(
             node.status = "offline"
         
         node.updated_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
     except Exception as e:
         # 如果健康检查失败，标记为离线
         node.status = "offline"
         node.updated_at = datetime.utcnow()
-        db.commit()
-    
-    # 解析JSON字段
-    available_gpu_ids = []
-    available_models = []
+        await db.commit()
     
-    if node.available_gpu_ids:
-        available_gpu_ids = json.loads(node.available_gpu_ids)
-    if node.available_models:
-        available_models = json.loads(node.available_models)
+    available_gpu_ids = node.available_gpu_ids
+    available_models = node.available_models
     
     status_info = {
         "node_id": node.id,
@@ -320,7 +309,7 @@ async def get_node_status(
         "last_heartbeat": node.last_heartbeat,
         "available_gpu_ids": available_gpu_ids,
         "available_models": available_models,
-        "total_gpus": len(available_gpu_ids) if available_gpu_ids else 0,
+        "total_gpus": len(available_gpu_ids),
         "created_at": node.created_at,
         "updated_at": node.updated_at
     }
@@ -333,12 +322,12 @@ async def get_node_status(
 @router.get("/{node_id}/gpu-status", response_model=APIResponse[List[Dict[str, Any]]])
 async def get_node_gpu_status(
     node_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取节点GPU状态"""
     logger.info(f"获取节点GPU状态: id={node_id}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -360,12 +349,12 @@ async def get_node_gpu_status(
 @router.get("/{node_id}/model-status", response_model=APIResponse[List[Dict[str, Any]]])
 async def get_node_model_status(
     node_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取节点模型状态"""
     logger.info(f"获取节点模型状态: id={node_id}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -388,12 +377,12 @@ async def get_node_model_status(
 async def start_model_on_node(
     node_id: int,
     request: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """在节点上启动模型"""
     logger.info(f"在节点上启动模型: id={node_id}, request={request}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -409,6 +398,7 @@ async def start_model_on_node(
             request["gpu_id"],
             request.get("config", {})
         )
+        cluster_state_cache.invalidate(f"{node.node_ip}:{node.node_port}")
         
         return APIResponse(
             data=result,
@@ -424,12 +414,12 @@ async def start_model_on_node(
 async def stop_model_on_node(
     node_id: int,
     request: Dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """在节点上停止模型"""
     logger.info(f"在节点上停止模型: id={node_id}, request={request}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -441,6 +431,7 @@ async def stop_model_on_node(
         # 获取节点客户端并停止模型
         client = node_manager.get_client(node.node_ip, node.node_port)
         result = await client.stop_model(request["model_name"], request["gpu_id"])
+        cluster_state_cache.invalidate(f"{node.node_ip}:{node.node_port}")
         
         return APIResponse(
             data=result,
@@ -456,12 +447,12 @@ async def stop_model_on_node(
 async def kill_process_on_node(
     node_id: int,
     pid: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """在节点上终止进程"""
     logger.info(f"在节点上终止进程: id={node_id}, pid={pid}")
     # 获取节点信息
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -469,6 +460,7 @@ async def kill_process_on_node(
         # 获取节点客户端并终止进程
         client = node_manager.get_client(node.node_ip, node.node_port)
         result = await client.kill_process(pid)
+        cluster_state_cache.invalidate(f"{node.node_ip}:{node.node_port}")
         
         return APIResponse(
             data=result,
@@ -483,11 +475,11 @@ async def kill_process_on_node(
 @router.get("/{node_id}/models/supported", response_model=APIResponse[Dict[str, str]])
 async def get_supported_models(
     node_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """直接从节点获取支持的模型列表，不更新数据库"""
     logger.info(f"获取节点支持的模型列表: id={node_id}")
-    node = db.query(Node).filter(Node.id == node_id).first()
+    node = await db.get(Node, node_id)
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
@@ -1,30 +1,45 @@
 import httpx
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from urllib.parse import quote
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 
-from ...database import get_db
+from ...database import get_db, get_async_db
 from ...models.model import Model
 from ...models.queue_length_record import QueueLengthRecord
-from ...schemas.queue import QueueInfo, QueueLengthRecord as QueueLengthRecordSchema
+from ...schemas.queue import QueueInfo, QueueHistoryPoint, QueueForecast, QueueForecastAccuracy
 from ...schemas.common import APIResponse
 from ...config import settings
+from ...services.queue_rollup import query_queue_history, raw_history_point
+from ...services.queue_forecast import get_queue_forecasts
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+@router.get("/forecasts/accuracy", response_model=APIResponse[List[QueueForecastAccuracy]])
+def get_forecast_accuracy(db: Session = Depends(get_db)):
+    """获取所有模型队列长度预测的单步误差统计，用于判断预测是否可信"""
+    forecasts = get_queue_forecasts(db, horizon_seconds=0)
+    data = [
+        QueueForecastAccuracy(model_id=f.model_id, last_bucket=f.last_bucket, **f.accuracy._asdict())
+        for f in sorted(forecasts.values(), key=lambda f: f.model_id)
+    ]
+    return APIResponse(data=data, message="预测准确度获取成功")
+
 @router.get("/{model_id}", response_model=APIResponse[QueueInfo])
 async def get_queue_info(
     model_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """通过RabbitMQ Management API获取指定模型关联的队列信息"""
     logger.info(f"开始通过HTTP API获取模型 {model_id} 的队列信息")
 
     # 1. 从数据库获取模型配置
-    model = db.query(Model).filter(Model.id == model_id).first()
+    model = await db.get(Model, model_id)
     if not model:
         logger.warning(f"模型 {model_id} 未在数据库中找到")
         raise HTTPException(status_code=404, detail="模型配置不存在")
@@ -105,33 +120,76 @@ async def get_queue_info(
             detail=f"获取队列信息时发生未知错误: {e}"
         )
 
-@router.get("/{model_id}/history", response_model=APIResponse[List[QueueLengthRecordSchema]])
+@router.get("/{model_id}/history", response_model=APIResponse[List[QueueHistoryPoint]])
 async def get_queue_length_history(
     model_id: int,
-    limit: int = Query(100, ge=1, le=1000, description="返回的记录数量"),
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=10000, description="返回的记录数量"),
+    start: Optional[datetime] = Query(None, description="起始时间（UTC），默认为结束时间前24小时"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC），默认为当前时间"),
+    resolution: Optional[str] = Query(None, pattern="^(raw|1m|10m|1h)$", description="数据精度，不指定时自动选择"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定模型的队列长度历史记录"""
-    logger.info(f"开始获取模型 {model_id} 的队列长度历史记录，限制 {limit} 条")
+    logger.info(f"开始获取模型 {model_id} 的队列长度历史记录，限制 {limit} 条, start={start}, end={end}, resolution={resolution}")
 
     # 检查模型是否存在
-    model = db.query(Model).filter(Model.id == model_id).first()
+    model = await db.get(Model, model_id)
     if not model:
         logger.warning(f"模型 {model_id} 未在数据库中找到")
         raise HTTPException(status_code=404, detail="模型不存在")
 
-    # 查询历史记录
-    history = (
-        db.query(QueueLengthRecord)
-        .filter(QueueLengthRecord.model_id == model_id)
-        .order_by(QueueLengthRecord.timestamp.desc())
-        .limit(limit)
-        .all()
-    )
+    if start is None and end is None and resolution is None:
+        # 未指定时间范围时返回最新的原始记录
+        records = (await db.scalars(
+            select(QueueLengthRecord)
+            .where(QueueLengthRecord.model_id == model_id)
+            .order_by(QueueLengthRecord.timestamp.desc())
+            .limit(limit)
+        )).all()
+        history = [raw_history_point(r) for r in records]
+        tier_name = "raw"
+    else:
+        # 统一按不带时区的UTC时间比较
+        if end is not None and end.tzinfo is not None:
+            end = end.astimezone(timezone.utc).replace(tzinfo=None)
+        if start is not None and start.tzinfo is not None:
+            start = start.astimezone(timezone.utc).replace(tzinfo=None)
+        end = end or datetime.utcnow()
+        start = start or end - timedelta(days=1)
+        if start > end:
+            raise HTTPException(status_code=400, detail="起始时间不能晚于结束时间")
+        tier, history = await db.run_sync(query_queue_history, model_id, start, end, limit, resolution)
+        tier_name = tier.name
     
-    logger.info(f"成功获取模型 {model_id} 的 {len(history)} 条队列长度历史记录")
+    logger.info(f"成功获取模型 {model_id} 的 {len(history)} 条队列长度历史记录（精度: {tier_name}）")
     
     return APIResponse(
         data=history,
-        message="队列长度历史记录获取成功"
-    )
\ No newline at end of file
+        message=f"队列长度历史记录获取成功（精度: {tier_name}）"
+    )
+
+@router.get("/{model_id}/forecast", response_model=APIResponse[QueueForecast])
+def get_queue_forecast(
+    model_id: int,
+    horizon_seconds: int = Query(3600, ge=0, le=86400, description="预测时长（秒）"),
+    db: Session = Depends(get_db)
+):
+    """获取指定模型未来一段时间的队列长度预测（10分钟精度）及预测准确度"""
+    model = db.query(Model).filter(Model.id == model_id).first()
+    if not model:
+        raise HTTPException(status_code=404, detail="模型不存在")
+
+    forecast = get_queue_forecasts(db, horizon_seconds, model_ids=[model_id]).get(model_id)
+    if forecast is None:
+        raise HTTPException(status_code=404, detail="该模型尚无足够的队列历史用于预测")
+
+    return APIResponse(
+        data=QueueForecast(
+            model_id=forecast.model_id,
+            last_bucket=forecast.last_bucket,
+            peak_length=round(forecast.peak_length, 3),
+            points=[p._asdict() for p in forecast.points],
+            accuracy=forecast.accuracy._asdict(),
+        ),
+        message="队列长度预测获取成功"
+    )
@@ -1,18 +1,41 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional
 
 from backend.app import models
 from backend.app import schemas
-from backend.app.database import get_db
+from backend.app.database import get_db, get_async_db
+from backend.app.strategies import get_strategy_class, create_strategy, list_strategies
 
 router = APIRouter()
 
+def _validate_parameters(name: str, parameters: Optional[Dict[str, Any]]) -> str:
+    """用策略的参数模型校验参数，返回补全默认值后的JSON字符串"""
+    strategy_cls = get_strategy_class(name)
+    if strategy_cls is None:
+        available = ", ".join(s["name"] for s in list_strategies())
+        raise HTTPException(status_code=400, detail=f"未知的调度策略 '{name}'，可用策略: {available}")
+    try:
+        params = strategy_cls.parse_parameters(parameters)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"策略 '{name}' 的参数无效: {e.errors()}")
+    return json.dumps(params.model_dump())
+
+@router.get("/available", response_model=List[schemas.StrategyInfo])
+def read_available_strategies():
+    """列出所有已注册的调度策略及其参数定义"""
+    return list_strategies()
+
 @router.post("/", response_model=schemas.SchedulingStrategy)
 def create_scheduling_strategy(
     strategy: schemas.SchedulingStrategyCreate, db: Session = Depends(get_db)
 ):
-    db_strategy = models.SchedulingStrategy(**strategy.dict())
+    strategy_data = strategy.dict()
+    strategy_data["parameters"] = _validate_parameters(strategy.name, strategy.parameters)
+    db_strategy = models.SchedulingStrategy(**strategy_data)
     db.add(db_strategy)
     db.commit()
     db.refresh(db_strategy)
@@ -39,11 +62,19 @@ def update_scheduling_strategy(
     db_strategy = db.query(models.SchedulingStrategy).filter(models.SchedulingStrategy.id == strategy_id).first()
     if db_strategy is None:
         raise HTTPException(status_code=404, detail="SchedulingStrategy not found")
-    
+
     update_data = strategy.dict(exclude_unset=True)
+    # 策略名称或参数变化时重新校验参数，传入的参数与已保存参数合并
+    if "name" in update_data or "parameters" in update_data:
+        name = update_data.get("name") or db_strategy.name
+        parameters = {}
+        if name == db_strategy.name and db_strategy.parameters:
+            parameters = json.loads(db_strategy.parameters)
+        parameters.update(update_data.get("parameters") or {})
+        update_data["parameters"] = _validate_parameters(name, parameters)
     for key, value in update_data.items():
         setattr(db_strategy, key, value)
-        
+
     db.add(db_strategy)
     db.commit()
     db.refresh(db_strategy)
@@ -56,4 +87,18 @@ def delete_scheduling_strategy(strategy_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="SchedulingStrategy not found")
     db.delete(db_strategy)
     db.commit()
-    return db_strategy
\ No newline at end of file
+    return db_strategy
+
+@router.post("/{strategy_id}/dry-run", response_model=schemas.DeploymentPlan)
+async def dry_run_scheduling_strategy(strategy_id: int, db: AsyncSession = Depends(get_async_db)):
+    """按当前集群与队列状态预演策略，返回部署计划但不执行"""
+    db_strategy = await db.get(models.SchedulingStrategy, strategy_id)
+    if db_strategy is None:
+        raise HTTPException(status_code=404, detail="SchedulingStrategy not found")
+    if get_strategy_class(db_strategy.name) is None:
+        raise HTTPException(status_code=400, detail=f"调度策略 '{db_strategy.name}' 未注册")
+    try:
+        strategy_impl = create_strategy(db_strategy.name, db_strategy.parameters)
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"策略 '{db_strategy.name}' 的参数无效: {e}")
+    return await strategy_impl.dry_run(db)
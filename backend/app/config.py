@@ -1,9 +1,30 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./model_scheduling.db"
+    ASYNC_DATABASE_URL: Optional[str] = None  # 异步路由和定时任务使用的数据库URL，默认由 DATABASE_URL 换成异步驱动（aiosqlite/asyncpg）得到
+
+    # 数据库迁移配置（Alembic，见 backend/app/migrations）
+    AUTO_MIGRATE: bool = True  # 启动时升级数据库到最新版本；多副本部署时可关闭，改为发布时执行 alembic upgrade head
+    MIGRATION_BACKFILL_BATCH_SIZE: int = 5000  # 迁移中数据回填每批处理的行数，每批一个短事务
+    MIGRATION_BACKFILL_PAUSE_SECONDS: float = 0.0  # 回填每批之间的间隔（秒），给线上写入让出写锁
+
+    # 连接池配置（PostgreSQL 等服务端数据库生效，每个进程的同步和异步引擎各有一个连接池）
+    DB_POOL_SIZE: int = 10  # 保持的连接数
+    DB_MAX_OVERFLOW: int = 20  # 连接池满时最多额外创建的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 等待空闲连接的时间（秒）
+    DB_POOL_PRE_PING: bool = True  # 取出连接前检查是否可用（数据库重启或连接被中间件断开后自动重连）
+    DB_POOL_RECYCLE: int = 1800  # 连接最长使用时间（秒），应小于数据库或代理的空闲断开时间
+    DB_COPY_MIN_ROWS: int = 1000  # PostgreSQL（psycopg2）批量写入不少于该行数时使用 COPY
+
+    # SQLite 配置（每个连接建立时设置，仅 SQLite 生效）
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL 模式下读写互不阻塞，只有写与写互斥
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # WAL 模式下 NORMAL 不会损坏数据库，只在断电时可能丢失最近提交的事务
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # 等待其他连接释放写锁的时间（毫秒），超时才报 database is locked
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # 内存映射读取的大小（字节），0 表示不使用
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024  # 每个连接的页缓存大小（KB）
     
     # CORS配置
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -14,13 +35,50 @@ class Settings(BaseSettings):
     
     # 日志配置
     LOG_LEVEL: str = "INFO"
+
+    # 监控指标配置
+    METRICS_ENABLED: bool = True  # 是否统计API请求并在 /metrics 输出 Prometheus 指标
+    METRICS_PER_NODE: bool = True  # 节点请求指标是否按节点区分（节点很多时可关闭以减少时间序列）
     
     # 调度器配置
     NODE_STATUS_REFRESH_INTERVAL: int = 30  # 节点状态刷新间隔（秒）
+    CLUSTER_STATE_MAX_STALENESS: float = 60.0  # 读取集群状态缓存时默认可接受的最大数据年龄（秒）
     ENABLE_SCHEDULER: bool = True
 
+    # 节点HTTP连接池配置（全部节点共享一个连接池）
+    NODE_HTTP_TIMEOUT: float = 30.0  # 单次请求超时（秒）
+    NODE_HTTP_MAX_CONNECTIONS: int = 200  # 全局最大连接数
+    NODE_HTTP_MAX_CONNECTIONS_PER_HOST: int = 4  # 单个节点最大并发连接数
+    NODE_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 100  # 全局最大保活连接数
+    NODE_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # 空闲连接回收时间（秒）
+    NODE_FANOUT_CONCURRENCY: int = 100  # 批量请求节点时的全局并发上限
+    NODE_CALL_DEADLINE: float = 5.0  # 批量请求中单次节点调用的截止时间（秒）
+
+    # 部署计划执行配置
+    ACTUATION_CONCURRENCY: int = 50  # 同时执行的部署操作上限
+    ACTUATION_PER_NODE_CONCURRENCY: int = 2  # 单个节点同时执行的部署操作上限
+    ACTUATION_ACTION_TIMEOUT: float = 120.0  # 单个部署操作的超时时间（秒），replace 包含停止和启动
+
     # 队列历史记录配置
     QUEUE_HISTORY_MAX_LENGTH: int = 1000  # 每个队列保留的历史记录条数
+    QUEUE_HISTORY_TTL_SECONDS: int = 0  # 历史记录保留时长（秒），大于0时按时间清理并忽略条数限制
+    QUEUE_HISTORY_PARTITION_PREMAKE_DAYS: int = 3  # PostgreSQL 下提前创建的按天分区数（含当天）
+    QUEUE_SCRAPE_CONCURRENCY: int = 10  # 同时抓取的RabbitMQ管理端点数量上限
+
+    # 队列历史降采样配置（各精度聚合数据的保留天数）
+    QUEUE_ROLLUP_1M_RETENTION_DAYS: int = 2
+    QUEUE_ROLLUP_10M_RETENTION_DAYS: int = 30
+    QUEUE_ROLLUP_1H_RETENTION_DAYS: int = 400
+    QUEUE_HISTORY_MAX_POINTS: int = 1000  # 自动选择精度时单次查询返回的目标点数
+
+    # 队列长度预测配置（基于10分钟聚合数据的 Holt-Winters 模型，按日季节性）
+    QUEUE_FORECAST_ALPHA: float = 0.2  # 水平分量平滑系数
+    QUEUE_FORECAST_BETA: float = 0.05  # 趋势分量平滑系数
+    QUEUE_FORECAST_GAMMA: float = 0.3  # 季节分量平滑系数
+    QUEUE_FORECAST_DAMPING: float = 0.9  # 趋势阻尼系数，避免长时间外推发散
+    QUEUE_FORECAST_WARMUP_DAYS: int = 7  # 首次拟合时回放的历史天数
+    QUEUE_FORECAST_EVAL_STEPS: int = 3  # 按提前多少个10分钟时间桶的预测评估准确度（应接近模型冷启动时间）
+    QUEUE_FORECAST_ERROR_DECAY: float = 0.993  # 预测误差的衰减系数，约一天前的误差权重减半
 
     class Config:
         env_file = ".env"
@@ -1,21 +1,150 @@
-from sqlalchemy import create_engine
+import io
+from typing import Any, Dict, List
+from sqlalchemy import PrimaryKeyConstraint, Table, create_engine, event, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from .services.metrics import instrument_engine
 
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # SQLite需要这个参数
-)
+# 同步驱动对应的异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """把同步数据库URL换成对应的异步驱动，已经是异步驱动的URL原样返回"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.drivername in ASYNC_DRIVERS.values():
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    按数据库类型返回 create_engine 的参数：
+    SQLite 允许跨线程使用连接；PostgreSQL 等服务端数据库配置连接池，PostgreSQL 会话时区固定为UTC
+    （代码中写入和比较的都是不带时区的UTC时间）。
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}  # SQLite需要这个参数
+
+    options: Dict[str, Any] = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if parsed.get_backend_name() == "postgresql":
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"timezone": "UTC"}}
+        else:
+            options["connect_args"] = {"options": "-c timezone=UTC"}
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """新建SQLite连接时设置日志模式、同步级别、锁等待时间和缓存"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        # 负数表示以 KB 为单位
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    finally:
+        cursor.close()
+
+def configure_sqlite(engine):
+    """为SQLite引擎注册连接参数，其他数据库不做处理；异步引擎传入 async_engine.sync_engine"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+configure_sqlite(engine)
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎：async 路由和定时任务使用，数据库I/O不阻塞事件循环
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+configure_sqlite(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine)
+
+# 提交后不过期对象，提交后仍可直接读取属性（异步会话中不能隐式懒加载）
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-# 依赖注入函数，用于获取数据库会话
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _compile_partitioned_primary_key(constraint, compiler, **kw):
+    """PostgreSQL 分区表的主键必须包含分区键：表的 info["partition_key"] 中的列会补进主键"""
+    table = constraint.table
+    missing = [name for name in table.info.get("partition_key", ()) if name not in constraint.columns]
+    if not missing:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = list(constraint.columns) + [table.c[name] for name in missing]
+    text = ""
+    if constraint.name is not None:
+        text += f"CONSTRAINT {compiler.preparer.format_constraint(constraint)} "
+    return text + "PRIMARY KEY (" + ", ".join(compiler.preparer.quote(c.name) for c in columns) + ")"
+
+def bulk_insert(db: Session, table: Table, rows: List[Dict[str, Any]]):
+    """
+    批量插入，不提交事务：
+    PostgreSQL（psycopg2）下行数不少于 DB_COPY_MIN_ROWS 时用 COPY 写入；
+    其他情况用 executemany（asyncpg 管线化执行，psycopg2 按页合并为多行 INSERT）。
+    rows 中未给出的列使用数据库默认值（COPY 时为 NULL），调用方应给出所有需要的列。
+    """
+    if not rows:
+        return
+    connection = db.connection()
+    if (
+        connection.dialect.name == "postgresql"
+        and connection.dialect.driver == "psycopg2"
+        and len(rows) >= settings.DB_COPY_MIN_ROWS
+    ):
+        _copy_rows(connection, table, rows)
+    else:
+        db.execute(insert(table), rows)
+
+def _copy_rows(connection, table: Table, rows: List[Dict[str, Any]]):
+    """用 COPY FROM STDIN（文本格式）写入，与当前会话在同一个事务中"""
+    columns = list(rows[0].keys())
+
+    def encode(value) -> str:
+        if value is None:
+            return "\\N"
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(encode(row.get(column)) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    quote = connection.dialect.identifier_preparer.quote
+    sql = f"COPY {quote(table.name)} ({', '.join(quote(c) for c in columns)}) FROM STDIN"
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+# 依赖注入函数，用于获取数据库会话（同步路由，运行在线程池中）
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# 依赖注入函数，用于获取异步数据库会话（async 路由）
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,40 +1,126 @@
 import logging
+from datetime import datetime
+from typing import List, Dict, Any, Tuple, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 from backend.app.services.node_client import NodeAPIClient
-from backend.app.database import SessionLocal
+from backend.app.services.cluster_state import ClusterSnapshot
+from backend.app.services.db_writer import db_writer
+from backend.app.database import AsyncSessionLocal
 from backend.app.models.node import Node
+from backend.app.models.model_instance import ModelInstance
 
 logger = logging.getLogger(__name__)
 
+def _parse_instance(item: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+    """从节点返回的模型状态中解析 (model_name, gpu_id)，无效数据返回 None"""
+    model_name = item.get("model_name")
+    try:
+        gpu_id = int(item.get("gpu_id"))
+    except (TypeError, ValueError):
+        return None
+    if not model_name:
+        return None
+    return model_name, gpu_id
+
+def persist_node_status(db: Session, nodes: List[Node], snapshot: ClusterSnapshot) -> Dict[str, int]:
+    """
+    将节点状态快照与 model_instances 表比对并批量写入：
+    新出现的 (节点, 模型, GPU) 插入，状态变化的更新，已消失的标记为 STOPPED；
+    同时根据节点可达性更新 Node.status / last_heartbeat。所有变更在同一个事务中提交。
+    """
+    now = datetime.utcnow()
+    node_ids = [n.id for n in nodes]
+
+    # 只查询比对需要的列，避免加载完整ORM对象
+    existing = {}
+    rows = db.query(
+        ModelInstance.id, ModelInstance.node_id, ModelInstance.model_name,
+        ModelInstance.gpu_id, ModelInstance.status, ModelInstance.pid, ModelInstance.port
+    ).filter(ModelInstance.node_id.in_(node_ids)).all()
+    for row in rows:
+        existing.setdefault((row.node_id, row.model_name, row.gpu_id), row)
+
+    inserts = []
+    updates = []
+    node_updates = []
+    for node in nodes:
+        node_key = f"{node.node_ip}:{node.node_port}"
+        if node_key in snapshot.errors:
+            # 节点不可达时无法确认实例状态，保留原记录
+            node_updates.append({"id": node.id, "status": "offline", "updated_at": now})
+            continue
+        node_updates.append({"id": node.id, "status": "online", "last_heartbeat": now, "updated_at": now})
+
+        observed = set()
+        for item in snapshot.model_status.get(node_key, []):
+            parsed = _parse_instance(item)
+            if parsed is None:
+                continue
+            model_name, gpu_id = parsed
+            triple = (node.id, model_name, gpu_id)
+            observed.add(triple)
+            values = {
+                "status": item.get("status") or "RUNNING",
+                "pid": item.get("pid"),
+                "port": item.get("port"),
+            }
+            row = existing.get(triple)
+            if row is None:
+                inserts.append({"node_id": node.id, "model_name": model_name, "gpu_id": gpu_id, **values})
+            elif (row.status, row.pid, row.port) != (values["status"], values["pid"], values["port"]):
+                updates.append({"id": row.id, "updated_at": now, **values})
+
+        for triple, row in existing.items():
+            if triple[0] == node.id and triple not in observed and row.status != "STOPPED":
+                updates.append({"id": row.id, "status": "STOPPED", "updated_at": now})
+
+    try:
+        if inserts:
+            db.bulk_insert_mappings(ModelInstance, inserts)
+        if updates:
+            db.bulk_update_mappings(ModelInstance, updates)
+        if node_updates:
+            db.bulk_update_mappings(Node, node_updates)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {"inserted": len(inserts), "updated": len(updates), "nodes": len(node_updates)}
+
 async def refresh_node_status():
     """定时刷新所有节点的状态"""
     logger.info("开始刷新节点状态...")
-    db = SessionLocal()
+    from backend.app.services.cluster_state import cluster_state_cache
+    db = AsyncSessionLocal()
     try:
-        nodes = db.query(Node).all()
+        nodes = (await db.scalars(select(Node))).all()
         if not nodes:
+            # 节点已全部删除，清除遗留的缓存
+            cluster_state_cache.invalidate()
             logger.info("没有节点需要刷新")
             return
 
         # 适配 Node 模型字段（假设字段为 host 和 port）
-        node_list = [{"node_ip": getattr(n, "node_ip", None) , "node_port": getattr(n, "node_port", None)} for n in nodes]
-        node_list = [n for n in node_list if n["node_ip"] and n["node_port"]]
+        nodes = [n for n in nodes if n.node_ip and n.node_port]
+        node_list = [{"node_ip": n.node_ip, "node_port": n.node_port} for n in nodes]
 
         if not node_list:
+            cluster_state_cache.invalidate()
             logger.info("节点列表为空或缺少必要字段，跳过刷新")
             return
 
-        # 使用全局 node_manager 调用批量状态获取
-        from backend.app.services.node_client import node_manager
-        model_status_map, gpu_status_map = await node_manager.batch_get_status(node_list)
-        status_data = {
-            "model_status": model_status_map,
-            "gpu_status": gpu_status_map
-        }
+        # 刷新集群状态缓存（同时清除已删除节点的缓存），API与调度任务从缓存读取
+        snapshot = await cluster_state_cache.refresh(node_list)
 
-        # TODO: 将 status_data 更新到数据库
-        logger.info(f"节点状态刷新完成: {status_data}")
+        stats = await db_writer.submit(persist_node_status, nodes, snapshot)
+        logger.info(
+            f"节点状态刷新完成: {stats['nodes']} 个节点, {len(snapshot.errors)} 个不可达, "
+            f"新增实例 {stats['inserted']} 个, 更新实例 {stats['updated']} 个"
+        )
 
     except Exception as e:
         logger.error(f"刷新节点状态时出错: {e}", exc_info=True)
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
@@ -1,70 +1,234 @@
+import time
+import asyncio
 import logging
 import httpx
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, func
 from sqlalchemy.orm import Session
 from urllib.parse import quote
+from typing import List, Dict, Optional, Tuple, NamedTuple
 
-from ..database import SessionLocal
+from ..database import AsyncSessionLocal, bulk_insert
 from ..models.model import Model
 from ..models.queue_length_record import QueueLengthRecord
 from ..config import settings
+from ..services.queue_rollup import rollup_queue_samples, prune_queue_rollups
+from ..services.queue_forecast import update_queue_forecasts
+from ..services import metrics
+from ..services.db_writer import db_writer
+from ..services.queue_partitions import (
+    drop_expired_queue_history_partitions, ensure_queue_history_partitions, is_partitioned
+)
 
 logger = logging.getLogger(__name__)
 
+# 同一个RabbitMQ管理端点：(host, port, vhost, username, password)
+BrokerKey = Tuple[str, int, str, str, str]
+
+# 批量拉取队列信息时只请求需要的字段，减少响应体大小
+QUEUE_COLUMNS = (
+    "name,messages,messages_ready,messages_unacknowledged,consumers,"
+    "message_stats.publish_details.rate,message_stats.deliver_get_details.rate"
+)
+
+class QueueSample(NamedTuple):
+    """单个队列的一次采样"""
+    length: int
+    consumers: Optional[int] = None
+    publish_rate: Optional[float] = None
+    deliver_rate: Optional[float] = None
+
+def parse_queue_sample(queue: Dict) -> QueueSample:
+    """从RabbitMQ管理API返回的队列信息中提取队列长度、消费者数量和消息速率"""
+    stats = queue.get("message_stats") or {}
+
+    def rate(key: str) -> Optional[float]:
+        details = stats.get(key)
+        if not isinstance(details, dict) or details.get("rate") is None:
+            return None
+        return float(details["rate"])
+
+    return QueueSample(
+        length=queue.get("messages", 0) or 0,
+        consumers=queue.get("consumers"),
+        publish_rate=rate("publish_details"),
+        deliver_rate=rate("deliver_get_details"),
+    )
+
+def group_models_by_broker(models: List[Model]) -> Dict[BrokerKey, List[Model]]:
+    """按RabbitMQ管理端点对模型分组，同组模型只需一次请求"""
+    groups: Dict[BrokerKey, List[Model]] = {}
+    for model in models:
+        if not all([model.rabbitmq_username, model.rabbitmq_password]):
+            logger.warning(f"模型 '{model.model_name}' (ID: {model.id}) 的RabbitMQ管理配置不完整，跳过此模型。")
+            continue
+        key = (
+            model.rabbitmq_host,
+            model.rabbitmq_port,
+            model.rabbitmq_vhost or '/',
+            model.rabbitmq_username,
+            model.rabbitmq_password,
+        )
+        groups.setdefault(key, []).append(model)
+    return groups
+
+async def scrape_broker(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    broker: BrokerKey,
+    models: List[Model],
+) -> Dict[int, QueueSample]:
+    """一次请求获取某个vhost下的全部队列，返回 {model_id: QueueSample}"""
+    host, port, vhost, username, password = broker
+    api_url = f"http://{host}:{port}/api/queues/{quote(vhost, safe='')}"
+
+    async with semaphore:
+        try:
+            response = await client.get(
+                api_url,
+                params={"columns": QUEUE_COLUMNS},
+                auth=(username, password),
+                timeout=10.0
+            )
+        except httpx.RequestError as e:
+            logger.error(f"请求RabbitMQ {host}:{port} vhost '{vhost}' 的队列信息时发生网络错误: {e}")
+            metrics.record_queue_scrape_error(f"{host}:{port}", "network")
+            return {}
+
+    if response.status_code != 200:
+        logger.warning(f"请求RabbitMQ {host}:{port} vhost '{vhost}' 的队列信息失败，状态码: {response.status_code}")
+        metrics.record_queue_scrape_error(f"{host}:{port}", "status")
+        return {}
+
+    try:
+        queues = {q.get("name"): q for q in response.json()}
+    except Exception as e:
+        logger.error(f"解析RabbitMQ {host}:{port} vhost '{vhost}' 的队列信息失败: {e}")
+        metrics.record_queue_scrape_error(f"{host}:{port}", "parse")
+        return {}
+
+    samples = {}
+    for model in models:
+        queue = queues.get(model.rabbitmq_queue_name)
+        if queue is None:
+            logger.warning(f"模型 '{model.model_name}' 的队列 '{model.rabbitmq_queue_name}' 在RabbitMQ中未找到")
+            metrics.record_queue_scrape_error(f"{host}:{port}", "missing_queue")
+            continue
+        samples[model.id] = parse_queue_sample(queue)
+    return samples
+
+async def scrape_queue_lengths(models: List[Model]) -> Dict[int, QueueSample]:
+    """并发抓取所有RabbitMQ端点，返回 {model_id: QueueSample}"""
+    groups = group_models_by_broker(models)
+    if not groups:
+        return {}
+
+    semaphore = asyncio.Semaphore(settings.QUEUE_SCRAPE_CONCURRENCY)
+    async with httpx.AsyncClient() as client:
+        results = await asyncio.gather(
+            *(scrape_broker(client, semaphore, broker, group) for broker, group in groups.items())
+        )
+
+    samples = {}
+    for result in results:
+        samples.update(result)
+    return samples
+
+def write_queue_samples(db: Session, samples: Dict[int, QueueSample], now: datetime):
+    """一次批量插入本轮抓取到的所有队列采样"""
+    if not samples:
+        return
+    bulk_insert(
+        db,
+        QueueLengthRecord.__table__,
+        [
+            {
+                "model_id": model_id,
+                "length": sample.length,
+                "consumers": sample.consumers,
+                "publish_rate": sample.publish_rate,
+                "deliver_rate": sample.deliver_rate,
+                "timestamp": now,
+            }
+            for model_id, sample in samples.items()
+        ]
+    )
+
+def prune_queue_history(db: Session, model_ids: List[int], now: datetime) -> int:
+    """
+    用一条DELETE语句清理历史记录：
+    配置了 QUEUE_HISTORY_TTL_SECONDS 时按时间删除（PostgreSQL 分区表整分区删除），
+    否则每个模型只保留最新的 QUEUE_HISTORY_MAX_LENGTH 条。
+    """
+    if settings.QUEUE_HISTORY_TTL_SECONDS > 0:
+        cutoff = now - timedelta(seconds=settings.QUEUE_HISTORY_TTL_SECONDS)
+        if is_partitioned(db):
+            return drop_expired_queue_history_partitions(db, cutoff)
+        stmt = delete(QueueLengthRecord).where(QueueLengthRecord.timestamp < cutoff)
+    else:
+        if not model_ids:
+            return 0
+        ranked = select(
+            QueueLengthRecord.id,
+            func.row_number().over(
+                partition_by=QueueLengthRecord.model_id,
+                order_by=(QueueLengthRecord.timestamp.desc(), QueueLengthRecord.id.desc())
+            ).label("rn")
+        ).where(QueueLengthRecord.model_id.in_(model_ids)).subquery()
+        stmt = delete(QueueLengthRecord).where(
+            QueueLengthRecord.id.in_(select(ranked.c.id).where(ranked.c.rn > settings.QUEUE_HISTORY_MAX_LENGTH))
+        )
+    result = db.execute(stmt, execution_options={"synchronize_session": False})
+    return result.rowcount or 0
+
+def store_queue_samples(db: Session, samples: Dict[int, QueueSample], now: datetime) -> int:
+    """写入本轮采样、合并到降采样数据并清理过期记录，不提交事务，返回清理的记录数"""
+    lengths = {model_id: sample.length for model_id, sample in samples.items()}
+    if is_partitioned(db):
+        ensure_queue_history_partitions(db, now)
+    write_queue_samples(db, samples, now)
+    rollup_queue_samples(db, lengths, now)
+    deleted = prune_queue_history(db, list(lengths.keys()), now)
+    deleted += prune_queue_rollups(db, now)
+    return deleted
+
 async def record_queue_lengths():
     """
     定时任务：记录所有已配置模型的RabbitMQ队列长度。
     """
     logger.info("开始执行记录队列长度的定时任务")
-    db: Session = SessionLocal()
+    db = AsyncSessionLocal()
     try:
-        models = db.query(Model).filter(Model.rabbitmq_host.isnot(None), Model.rabbitmq_queue_name.isnot(None)).all()
-        
-        async with httpx.AsyncClient() as client:
-            for model in models:
-                if not all([model.rabbitmq_username, model.rabbitmq_password]):
-                    logger.warning(f"模型 '{model.model_name}' (ID: {model.id}) 的RabbitMQ管理配置不完整，跳过此模型。")
-                    continue
-
-                vhost = quote(model.rabbitmq_vhost or '/', safe='')
-                queue_name = quote(model.rabbitmq_queue_name, safe='')
-                api_url = f"http://{model.rabbitmq_host}:{model.rabbitmq_port}/api/queues/{vhost}/{queue_name}"
-
-                try:
-                    response = await client.get(
-                        api_url,
-                        auth=(model.rabbitmq_username, model.rabbitmq_password),
-                        timeout=10.0
-                    )
-
-                    if response.status_code == 200:
-                        data = response.json()
-                        queue_length = data.get("messages", 0)
-                        
-                        # 1. 创建并保存新的记录
-                        new_record = QueueLengthRecord(model_id=model.id, length=queue_length)
-                        db.add(new_record)
-                        db.commit()
-                        logger.info(f"成功记录模型 '{model.model_name}' 的队列长度: {queue_length}")
-
-                        # 2. 清理旧的记录
-                        record_count = db.query(QueueLengthRecord).filter(QueueLengthRecord.model_id == model.id).count()
-                        if record_count > settings.QUEUE_HISTORY_MAX_LENGTH:
-                            num_to_delete = record_count - settings.QUEUE_HISTORY_MAX_LENGTH
-                            oldest_records = db.query(QueueLengthRecord).filter(QueueLengthRecord.model_id == model.id).order_by(QueueLengthRecord.timestamp.asc()).limit(num_to_delete).all()
-                            for record in oldest_records:
-                                db.delete(record)
-                            db.commit()
-                            logger.info(f"为模型 '{model.model_name}' 清理了 {num_to_delete} 条旧的队列长度记录。")
-
-                    else:
-                        logger.warning(f"请求模型 '{model.model_name}' 的队列信息失败，状态码: {response.status_code}")
-
-                except httpx.RequestError as e:
-                    logger.error(f"请求模型 '{model.model_name}' 的队列信息时发生网络错误: {e}")
-                except Exception as e:
-                    logger.error(f"处理模型 '{model.model_name}' 时发生未知错误: {e}")
-                    db.rollback()
+        models = (await db.scalars(
+            select(Model).where(Model.rabbitmq_host.isnot(None), Model.rabbitmq_queue_name.isnot(None))
+        )).all()
+        started = time.perf_counter()
+        samples = await scrape_queue_lengths(models)
+        scrape_seconds = time.perf_counter() - started
+
+        # 写入和清理在同一个事务中完成
+        now = datetime.utcnow()
+        recorded = []
+        try:
+            deleted = await db_writer.submit(store_queue_samples, samples, now)
+            recorded = list(samples.keys())
+            logger.info(f"成功记录 {len(samples)} 个模型的队列长度，清理了 {deleted} 条旧的队列长度记录。")
+        except Exception as e:
+            logger.error(f"写入队列长度记录时发生错误: {e}")
+        # 只有写入成功的采样才算作成功采集
+        metrics.record_queue_scrape(models, recorded, scrape_seconds)
 
     finally:
-        db.close()
-    logger.info("记录队列长度的定时任务执行完毕")
\ No newline at end of file
+        await db.close()
+    logger.info("记录队列长度的定时任务执行完毕")
+
+async def refresh_queue_forecasts():
+    """
+    定时任务：用新完成的10分钟聚合数据增量更新各模型的队列长度预测。
+    """
+    try:
+        fitted = await db_writer.submit(update_queue_forecasts)
+        if fitted:
+            logger.info(f"队列长度预测已更新，拟合了 {fitted} 个时间桶")
+    except Exception as e:
+        logger.error(f"更新队列长度预测时发生错误: {e}")
@@ -1,19 +1,24 @@
 import logging
 import traceback
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
+from .database import engine
 from .config import settings
 from .scheduler import init_scheduler, start_scheduler, shutdown_scheduler
 from .api.v1.api import api_router
+from .services.node_client import node_manager
+from .services.db_writer import db_writer
+from .services.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from .migrations import upgrade_database
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 把数据库升级到最新版本（多实例部署时可关闭，改为发布时执行 alembic upgrade head）
+if settings.AUTO_MIGRATE:
+    upgrade_database(engine)
 
 app = FastAPI(
     title="Model Inference Scheduling Platform",
@@ -30,6 +35,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 统计API请求数与延迟
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # 包含API路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -44,6 +53,8 @@ async def startup_event():
 async def shutdown_event():
     if settings.ENABLE_SCHEDULER:
         shutdown_scheduler()
+    await db_writer.close()
+    await node_manager.close_all()
 
 # 全局异常处理器
 @app.exception_handler(Exception)
@@ -71,4 +82,11 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus 指标"""
+        # 直接设置 Content-Type，media_type 会被 Starlette 再追加一次 charset
+        return Response(registry.render(), headers={"Content-Type": CONTENT_TYPE})
\ No newline at end of file
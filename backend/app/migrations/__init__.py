@@ -0,0 +1,119 @@
+"""
+数据库迁移（Alembic）
+应用启动时（AUTO_MIGRATE）或发布时在项目根目录执行 `alembic upgrade head` 把数据库升级到最新版本。
+引入迁移之前由 create_all 建好的数据库没有版本记录：标记为最初的表结构版本（0000）后由后续迁移补齐
+新增的表、列和索引（这些迁移会跳过已经存在的部分）。
+升级后数据库结构与模型仍不一致时启动失败，需要编写迁移补齐，避免运行时才因缺少列而出错。
+"""
+import os
+import logging
+from contextlib import contextmanager
+from typing import Iterator
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.operations import ops
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from .backfill import PROGRESS_TABLE
+from ..services.queue_partitions import DEFAULT_PARTITION, PARTITION_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# 引入迁移前最初版本的表结构
+BASELINE_REVISION = "0000"
+# 多个进程同时启动时，PostgreSQL 下用咨询锁保证只有一个进程执行迁移
+MIGRATION_LOCK_ID = 7_320_114_501
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """比较模型与数据库时忽略回填进度表，以及 PostgreSQL 的队列历史分区子表"""
+    if type_ == "table" and reflected and compare_to is None:
+        if name == PROGRESS_TABLE or name == DEFAULT_PARTITION or name.startswith(PARTITION_PREFIX):
+            return False
+    return True
+
+def _is_partition_key(table_name: str, column_name: str) -> bool:
+    from ..database import Base
+    table = Base.metadata.tables.get(table_name)
+    return table is not None and column_name in table.info.get("partition_key", ())
+
+def process_revision_directives(context, revision, directives):
+    """
+    自动生成迁移时忽略分区键列的可空性差异：PostgreSQL 的主键列总是 NOT NULL，
+    分区键补进主键后（见 database.py）与模型中声明的可空性不同，不需要修改
+    """
+    script = directives[0]
+    for container in (script.upgrade_ops, script.downgrade_ops):
+        for table_ops in list(container.ops):
+            if not isinstance(table_ops, ops.ModifyTableOps):
+                continue
+            table_ops.ops = [
+                op for op in table_ops.ops
+                if not (isinstance(op, ops.AlterColumnOp) and op.modify_nullable is not None
+                        and _is_partition_key(op.table_name, op.column_name))
+            ]
+            if not table_ops.ops:
+                container.ops.remove(table_ops)
+
+def alembic_config() -> Config:
+    """不依赖 alembic.ini 的迁移配置"""
+    config = Config()
+    config.set_main_option("script_location", os.path.dirname(os.path.abspath(__file__)))
+    return config
+
+@contextmanager
+def _migration_lock(connection: Connection) -> Iterator[None]:
+    if connection.dialect.name != "postgresql":
+        yield
+        return
+    connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    connection.commit()
+    try:
+        yield
+    finally:
+        connection.rollback()
+        connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.commit()
+
+def is_unversioned(connection: Connection) -> bool:
+    """是否为引入迁移前由 create_all 建立的数据库（有业务表但没有版本记录）"""
+    tables = set(inspect(connection).get_table_names())
+    return "alembic_version" not in tables and "environments" in tables
+
+def schema_differences(connection: Connection) -> list:
+    """数据库结构与模型的差异（compare_metadata 的结果），忽略分区键列的可空性差异"""
+    from ..database import Base
+    from .. import models  # noqa: F401
+
+    context = MigrationContext.configure(connection, opts={"include_object": include_object})
+    differences = compare_metadata(context, Base.metadata)
+    connection.rollback()
+    return [
+        diff for diff in differences
+        if not (isinstance(diff, list) and all(
+            change[0] == "modify_nullable" and _is_partition_key(change[2], change[3]) for change in diff
+        ))
+    ]
+
+def _check_schema(connection: Connection):
+    """升级后数据库结构与模型仍不一致时抛出异常，阻止应用以错误的结构启动"""
+    differences = schema_differences(connection)
+    if differences:
+        detail = "\n".join(f"  {diff}" for diff in differences)
+        raise RuntimeError(f"数据库结构与模型不一致，需要编写迁移处理（alembic revision --autogenerate）:\n{detail}")
+
+def upgrade_database(engine: Engine, revision: str = "head"):
+    """
+    把数据库升级到指定版本（默认最新），没有版本记录的旧数据库先标记为最初的表结构版本（见 env.py）；
+    升级到最新版本后检查数据库结构与模型是否一致，不一致时抛出 RuntimeError
+    """
+    config = alembic_config()
+    with engine.connect() as connection:
+        with _migration_lock(connection):
+            config.attributes["connection"] = connection
+            command.upgrade(config, revision)
+            if revision == "head":
+                _check_schema(connection)
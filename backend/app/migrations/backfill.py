@@ -0,0 +1,232 @@
+"""
+迁移中的数据回填与在线建索引
+大表上的数据修改按主键顺序分批执行，每批一个短事务，不会长时间锁住正在写入的表：
+  - 每批在同一个事务中处理数据并记录进度（backfill_progress 表），中断后重新执行迁移从上次的位置继续
+  - 定期输出进度日志（已处理行数、百分比、速度、预计剩余时间），进度表也可以在回填过程中直接查询
+  - 处理函数应当是幂等的（如只写入还不存在的记录），同一批可能因重试而执行多次
+PostgreSQL 下建索引使用 CREATE INDEX CONCURRENTLY，分区表逐个分区并发建索引后挂到父表的索引上。
+"""
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+from alembic import context, op
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine, Row
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_TABLE = "backfill_progress"
+
+progress_table = Table(
+    PROGRESS_TABLE,
+    MetaData(),
+    Column("name", String(200), primary_key=True),
+    Column("last_key", BigInteger, nullable=True),  # 已处理的最大主键
+    Column("rows_done", BigInteger, nullable=False, default=0),
+    Column("rows_total", BigInteger, nullable=True),  # 开始（或继续）时估计的总行数
+    Column("started_at", DateTime, nullable=True),
+    Column("updated_at", DateTime, nullable=True),
+    Column("completed_at", DateTime, nullable=True),
+)
+
+@dataclass
+class Backfill:
+    """
+    一个分批回填操作：按 key 列（整数主键）升序读取 table 中满足 where 的行（只读取 columns 列），
+    每批调用 process(conn, rows)，rows 的第一列必须是 key
+    """
+    name: str
+    table: str
+    columns: Sequence[str]
+    process: Callable[[Connection, List[Row]], None]
+    key: str = "id"
+    where: Optional[str] = None  # 额外的筛选条件（SQL片段）
+
+    def _condition(self) -> str:
+        condition = f"{self.key} > :last_key"
+        return f"{condition} AND ({self.where})" if self.where else condition
+
+@dataclass
+class BackfillProgress:
+    name: str
+    rows_done: int
+    rows_total: Optional[int]
+    resumed_from: int  # 本次开始前已完成的行数，速度只按本次处理的行计算
+    started: float
+
+    def report(self, final: bool = False):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = (self.rows_done - self.resumed_from) / elapsed
+        if self.rows_total:
+            percent = min(self.rows_done / self.rows_total, 1.0) * 100
+            remaining = max(self.rows_total - self.rows_done, 0) / rate if rate > 0 else 0
+            detail = f"{self.rows_done}/{self.rows_total} 行（{percent:.1f}%），{rate:.0f} 行/秒"
+            if not final:
+                detail += f"，预计剩余 {remaining:.0f}s"
+        else:
+            detail = f"{self.rows_done} 行，{rate:.0f} 行/秒"
+        logger.info(f"数据回填 {self.name}{' 完成' if final else ''}: {detail}")
+
+def _load_state(engine: Engine, name: str) -> Optional[Row]:
+    progress_table.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return conn.execute(progress_table.select().where(progress_table.c.name == name)).first()
+
+def run_backfill(
+    engine: Engine,
+    backfill: Backfill,
+    batch_size: Optional[int] = None,
+    pause_seconds: Optional[float] = None,
+    log_interval: float = 10.0,
+) -> int:
+    """
+    执行回填直到处理完所有行，返回本次处理的行数；已完成的回填直接返回 0。
+    engine 上的每批使用独立连接和事务，不能在持有写锁的迁移事务中调用（迁移中使用 run_backfill_in_migration）
+    """
+    batch_size = batch_size or settings.MIGRATION_BACKFILL_BATCH_SIZE
+    pause_seconds = settings.MIGRATION_BACKFILL_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+
+    state = _load_state(engine, backfill.name)
+    if state is not None and state.completed_at is not None:
+        logger.info(f"数据回填 {backfill.name} 已于 {state.completed_at} 完成，跳过")
+        return 0
+    last_key = state.last_key if state is not None else None
+    done_before = state.rows_done if state is not None else 0
+
+    with engine.begin() as conn:
+        if last_key is None:
+            # 从最小的主键之前开始
+            first_key = conn.execute(text(f"SELECT min({backfill.key}) FROM {backfill.table}")).scalar()
+            start_key = first_key - 1 if first_key is not None else 0
+        else:
+            start_key = last_key
+        remaining = conn.execute(
+            text(f"SELECT count(*) FROM {backfill.table} WHERE {backfill._condition()}"),
+            {"last_key": start_key},
+        ).scalar_one()
+        now = datetime.utcnow()
+        values = {"rows_total": done_before + remaining, "updated_at": now}
+        if state is None:
+            conn.execute(progress_table.insert().values(name=backfill.name, rows_done=0, started_at=now, **values))
+        else:
+            conn.execute(progress_table.update().where(progress_table.c.name == backfill.name).values(**values))
+    if state is not None:
+        logger.info(f"数据回填 {backfill.name} 从 {backfill.key} > {last_key} 继续，已完成 {done_before} 行")
+
+    progress = BackfillProgress(backfill.name, done_before, done_before + remaining, done_before, time.monotonic())
+    processed = 0
+    last_report = time.monotonic()
+    select_batch = text(
+        f"SELECT {', '.join(backfill.columns)} FROM {backfill.table} "
+        f"WHERE {backfill._condition()} ORDER BY {backfill.key} LIMIT :limit"
+    )
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_batch, {"last_key": start_key, "limit": batch_size}).all()
+            now = datetime.utcnow()
+            if not rows:
+                conn.execute(
+                    progress_table.update().where(progress_table.c.name == backfill.name)
+                    .values(updated_at=now, completed_at=now)
+                )
+                break
+            backfill.process(conn, rows)
+            start_key = rows[-1][0]
+            progress.rows_done += len(rows)
+            conn.execute(
+                progress_table.update().where(progress_table.c.name == backfill.name)
+                .values(last_key=start_key, rows_done=progress.rows_done, updated_at=now)
+            )
+        processed += len(rows)
+        if time.monotonic() - last_report >= log_interval:
+            progress.report()
+            last_report = time.monotonic()
+        if pause_seconds > 0:
+            time.sleep(pause_seconds)
+
+    progress.report(final=True)
+    return processed
+
+def run_backfill_in_migration(backfill: Backfill, **kwargs) -> int:
+    """在迁移脚本中执行回填：先提交当前迁移事务，再在事务外分批执行"""
+    if context.is_offline_mode():
+        raise RuntimeError(f"数据回填 {backfill.name} 需要连接数据库执行，不能在 --sql 模式下生成")
+    with op.get_context().autocommit_block():
+        return run_backfill(op.get_bind().engine, backfill, **kwargs)
+
+def reset_backfill(name: str):
+    """在迁移中删除回填的进度记录，使降级后重新升级（或反向）时重新执行该回填"""
+    bind = op.get_bind()
+    if PROGRESS_TABLE in inspect(bind).get_table_names():
+        bind.execute(progress_table.delete().where(progress_table.c.name == name))
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+def _drop_invalid_index(conn: Connection, index_name: str):
+    """删除之前中断的 CREATE INDEX CONCURRENTLY 留下的无效索引，使建索引可以重新执行"""
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    ), {"name": index_name}).first()
+    if invalid:
+        logger.info(f"删除无效索引 {index_name}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {_quote(conn, index_name)}"))
+
+def create_index_online(index_name: str, table_name: str, columns: Sequence[str]):
+    """
+    在迁移中为大表建索引，不阻塞写入（可重复执行）：
+    PostgreSQL 普通表使用 CREATE INDEX CONCURRENTLY；分区表先在父表上建 ON ONLY 索引，
+    再逐个分区并发建索引并挂到父表索引上（之后新建的分区会自动带上该索引）。
+    其他数据库直接建索引（SQLite 同一时间只有一个写入者，建索引期间写入会等待）
+    """
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(index_name, table_name, list(columns), if_not_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        quoted_columns = ", ".join(_quote(conn, c) for c in columns)
+        partitions = conn.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table AND parent.relkind = 'p' ORDER BY child.relname"
+        ), {"table": table_name}).scalars().all()
+        is_partitioned = conn.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE relname = :table"), {"table": table_name}
+        ).scalar()
+
+        if not is_partitioned:
+            _drop_invalid_index(conn, index_name)
+            logger.info(f"并发创建索引 {index_name} ON {table_name}")
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_quote(conn, index_name)} "
+                f"ON {_quote(conn, table_name)} ({quoted_columns})"
+            ))
+            return
+
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {_quote(conn, index_name)} ON ONLY {_quote(conn, table_name)} ({quoted_columns})"
+        ))
+        for partition in partitions:
+            suffix = partition[len(table_name):].lstrip("_") or partition
+            child_index = f"{index_name[:62 - len(suffix)]}_{suffix}"
+            _drop_invalid_index(conn, child_index)
+            logger.info(f"并发创建分区索引 {child_index} ON {partition}")
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_quote(conn, child_index)} "
+                f"ON {_quote(conn, partition)} ({quoted_columns})"
+            ))
+            attached = conn.execute(text(
+                "SELECT 1 FROM pg_inherits JOIN pg_class c ON c.oid = pg_inherits.inhrelid "
+                "JOIN pg_class p ON p.oid = pg_inherits.inhparent WHERE c.relname = :child AND p.relname = :parent"
+            ), {"child": child_index, "parent": index_name}).first()
+            if not attached:
+                conn.execute(text(f"ALTER INDEX {_quote(conn, index_name)} ATTACH PARTITION {_quote(conn, child_index)}"))
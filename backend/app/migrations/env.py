@@ -0,0 +1,71 @@
+"""
+Alembic 运行环境
+应用启动时由 upgrade_database 传入连接（config.attributes["connection"]）；
+在命令行执行 alembic 时使用应用的数据库引擎（DATABASE_URL）。每个迁移脚本在独立的事务中执行，
+迁移中的回填和在线建索引可以提交之前的事务、在事务外分批执行（见 backfill.py）。
+"""
+import logging
+from logging.config import fileConfig
+
+from alembic import context
+
+from backend.app.config import settings
+from backend.app.database import Base
+from backend.app import models  # noqa: F401  注册所有模型
+from backend.app.migrations import BASELINE_REVISION, include_object, is_unversioned, process_revision_directives
+
+logger = logging.getLogger("backend.app.migrations")
+
+config = context.config
+target_metadata = Base.metadata
+
+# 命令行执行时按 alembic.ini 配置日志，应用内执行时沿用应用的日志配置
+if config.config_file_name is not None and not config.attributes.get("connection"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+def configure(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        process_revision_directives=process_revision_directives,
+        transaction_per_migration=True,
+        # SQLite 不支持大部分 ALTER，自动生成的修改使用 batch 模式（重建表）
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+def run_migrations_offline():
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations(connection):
+    configure(connection)
+    # 引入迁移前建立的数据库先标记为最初的表结构版本，之后的迁移补齐新增的表、列和索引
+    if is_unversioned(connection):
+        logger.info(f"数据库没有迁移版本记录，标记为版本 {BASELINE_REVISION} 后升级")
+        context.get_context().stamp(context.script, BASELINE_REVISION)
+    connection.commit()
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+
+    from backend.app.database import engine
+    with engine.connect() as connection:
+        run_migrations(connection)
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
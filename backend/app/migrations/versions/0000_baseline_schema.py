@@ -0,0 +1,123 @@
+"""baseline schema
+
+引入迁移之前最初版本的表结构（create_all 建出的 environments、models、nodes、model_instances、
+queue_length_records、scheduling_strategies 六张表）。没有版本记录的旧数据库会被标记为此版本，
+之后新增的表、列和索引由后续迁移补齐。
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-17 06:02:15.204118
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('environments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_environments_id', 'environments', ['id'], unique=False)
+    op.create_index('ix_environments_name', 'environments', ['name'], unique=True)
+
+    op.create_table('scheduling_strategies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_scheduling_strategies_id', 'scheduling_strategies', ['id'], unique=False)
+    op.create_index('ix_scheduling_strategies_name', 'scheduling_strategies', ['name'], unique=True)
+
+    op.create_table('models',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('environment_id', sa.Integer(), nullable=False),
+    sa.Column('model_name', sa.String(length=100), nullable=False),
+    sa.Column('inference_time', sa.Float(), nullable=True),
+    sa.Column('average_inference_time', sa.Float(), nullable=True, comment='平均推理时间(秒)'),
+    sa.Column('username', sa.String(length=100), nullable=True),
+    sa.Column('password', sa.String(length=100), nullable=True),
+    sa.Column('port', sa.Integer(), nullable=True),
+    sa.Column('rabbitmq_queue_name', sa.String(length=100), nullable=True),
+    sa.Column('rabbitmq_host', sa.String(length=255), nullable=True),
+    sa.Column('rabbitmq_port', sa.Integer(), nullable=True),
+    sa.Column('rabbitmq_username', sa.String(length=100), nullable=True),
+    sa.Column('rabbitmq_password', sa.String(length=100), nullable=True),
+    sa.Column('rabbitmq_vhost', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['environment_id'], ['environments.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_models_id', 'models', ['id'], unique=False)
+
+    op.create_table('nodes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('environment_id', sa.Integer(), nullable=False),
+    sa.Column('node_ip', sa.String(length=45), nullable=False),
+    sa.Column('node_port', sa.Integer(), nullable=False),
+    sa.Column('available_gpu_ids', sa.Text(), nullable=True),
+    sa.Column('available_models', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('last_heartbeat', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['environment_id'], ['environments.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_nodes_id', 'nodes', ['id'], unique=False)
+
+    op.create_table('model_instances',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('node_id', sa.Integer(), nullable=False),
+    sa.Column('model_name', sa.String(length=100), nullable=False),
+    sa.Column('gpu_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('pid', sa.Integer(), nullable=True),
+    sa.Column('port', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['node_id'], ['nodes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_model_instances_id', 'model_instances', ['id'], unique=False)
+
+    op.create_table('queue_length_records',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('model_id', sa.Integer(), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['model_id'], ['models.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_queue_length_records_id', 'queue_length_records', ['id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_queue_length_records_id', table_name='queue_length_records')
+    op.drop_table('queue_length_records')
+
+    op.drop_index('ix_model_instances_id', table_name='model_instances')
+    op.drop_table('model_instances')
+
+    op.drop_index('ix_nodes_id', table_name='nodes')
+    op.drop_table('nodes')
+
+    op.drop_index('ix_models_id', table_name='models')
+    op.drop_table('models')
+
+    op.drop_index('ix_scheduling_strategies_name', table_name='scheduling_strategies')
+    op.drop_index('ix_scheduling_strategies_id', table_name='scheduling_strategies')
+    op.drop_table('scheduling_strategies')
+
+    op.drop_index('ix_environments_name', table_name='environments')
+    op.drop_index('ix_environments_id', table_name='environments')
+    op.drop_table('environments')
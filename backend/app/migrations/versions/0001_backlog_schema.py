@@ -0,0 +1,175 @@
+"""backlog schema
+
+引入迁移之前陆续新增的表、列和索引：
+  - 新表 scheduling_actions、node_gpus、node_supported_models、queue_forecasts、queue_length_rollups
+  - models.min_instances / max_instances，queue_length_records.consumers / publish_rate / deliver_rate，
+    scheduling_strategies.parameters
+  - model_instances、queue_length_records 上的查询索引（在线创建，不阻塞写入）
+旧数据库可能由其间任意版本的 create_all 建出，已经存在的表、列和索引跳过。
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-17 06:10:52.730516
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.app.migrations.backfill import create_index_online
+
+revision = '0001'
+down_revision = '0000'
+branch_labels = None
+depends_on = None
+
+def _new_columns():
+    """{表名: [新增的列]}，每次调用新建 Column 对象（Column 只能属于一张表）"""
+    return {
+        'models': [
+            sa.Column('min_instances', sa.Integer(), nullable=True, comment='最少实例数，为空时使用调度策略的默认值'),
+            sa.Column('max_instances', sa.Integer(), nullable=True, comment='最多实例数，为空时使用调度策略的默认值'),
+        ],
+        'queue_length_records': [
+            sa.Column('consumers', sa.Integer(), nullable=True),
+            sa.Column('publish_rate', sa.Float(), nullable=True),
+            sa.Column('deliver_rate', sa.Float(), nullable=True),
+        ],
+        'scheduling_strategies': [
+            sa.Column('parameters', sa.Text(), nullable=True),
+        ],
+    }
+
+# 已有数据的表上新增的索引：(索引名, 表名, 列)
+NEW_INDEXES = [
+    ('ix_model_instances_node_model_gpu', 'model_instances', ['node_id', 'model_name', 'gpu_id']),
+    ('ix_model_instances_model_status', 'model_instances', ['model_name', 'status']),
+    ('ix_queue_length_records_model_id_timestamp', 'queue_length_records', ['model_id', 'timestamp']),
+]
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+def _columns(table_name):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table_name)}
+
+def _create_new_tables():
+    tables = _tables()
+    if 'scheduling_actions' not in tables:
+        op.create_table('scheduling_actions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('strategy', sa.String(length=100), nullable=False),
+        sa.Column('action', sa.String(length=20), nullable=False),
+        sa.Column('model_name', sa.String(length=100), nullable=False),
+        sa.Column('old_model_name', sa.String(length=100), nullable=True),
+        sa.Column('node_id', sa.Integer(), nullable=True),
+        sa.Column('gpu_id', sa.Integer(), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('reason', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_scheduling_actions_created_at', 'scheduling_actions', ['created_at'], unique=False)
+        op.create_index('ix_scheduling_actions_id', 'scheduling_actions', ['id'], unique=False)
+        op.create_index('ix_scheduling_actions_model_created', 'scheduling_actions', ['model_name', 'created_at'], unique=False)
+        op.create_index('ix_scheduling_actions_old_model_created', 'scheduling_actions', ['old_model_name', 'created_at'], unique=False)
+
+    if 'node_gpus' not in tables:
+        op.create_table('node_gpus',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('node_id', sa.Integer(), nullable=False),
+        sa.Column('gpu_id', sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(['node_id'], ['nodes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('node_id', 'gpu_id', name='uq_node_gpus_node_gpu')
+        )
+
+    if 'node_supported_models' not in tables:
+        op.create_table('node_supported_models',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('node_id', sa.Integer(), nullable=False),
+        sa.Column('model_name', sa.String(length=100), nullable=False),
+        sa.ForeignKeyConstraint(['node_id'], ['nodes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('node_id', 'model_name', name='uq_node_supported_models_node_model')
+        )
+        op.create_index('ix_node_supported_models_model_node', 'node_supported_models', ['model_name', 'node_id'], unique=False)
+
+    if 'queue_forecasts' not in tables:
+        op.create_table('queue_forecasts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('model_id', sa.Integer(), nullable=False),
+        sa.Column('level', sa.Float(), nullable=False),
+        sa.Column('trend', sa.Float(), nullable=False),
+        sa.Column('seasonal', sa.Text(), nullable=False),
+        sa.Column('last_bucket', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_value', sa.Float(), nullable=True),
+        sa.Column('pending_forecasts', sa.Text(), nullable=True),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('error_count', sa.Integer(), nullable=False),
+        sa.Column('error_weight', sa.Float(), nullable=False),
+        sa.Column('abs_error_sum', sa.Float(), nullable=False),
+        sa.Column('sq_error_sum', sa.Float(), nullable=False),
+        sa.Column('naive_abs_error_sum', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['model_id'], ['models.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('model_id')
+        )
+        op.create_index('ix_queue_forecasts_id', 'queue_forecasts', ['id'], unique=False)
+
+    if 'queue_length_rollups' not in tables:
+        op.create_table('queue_length_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('model_id', sa.Integer(), nullable=False),
+        sa.Column('resolution', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('min_length', sa.Integer(), nullable=False),
+        sa.Column('max_length', sa.Integer(), nullable=False),
+        sa.Column('sum_length', sa.Float(), nullable=False),
+        sa.Column('last_length', sa.Integer(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['model_id'], ['models.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_queue_length_rollups_id', 'queue_length_rollups', ['id'], unique=False)
+        op.create_index('ix_queue_length_rollups_model_res_bucket', 'queue_length_rollups', ['model_id', 'resolution', 'bucket_start'], unique=True)
+        op.create_index('ix_queue_length_rollups_res_bucket', 'queue_length_rollups', ['resolution', 'bucket_start'], unique=False)
+
+def upgrade():
+    _create_new_tables()
+
+    # 新增的列都可为空，ADD COLUMN 只修改表定义，不重写已有数据
+    for table_name, columns in _new_columns().items():
+        existing = _columns(table_name)
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table_name, column)
+
+    for index_name, table_name, columns in NEW_INDEXES:
+        create_index_online(index_name, table_name, columns)
+
+def downgrade():
+    for index_name, table_name, _ in reversed(NEW_INDEXES):
+        op.drop_index(index_name, table_name=table_name)
+
+    for table_name, columns in _new_columns().items():
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in columns:
+                batch_op.drop_column(column.name)
+
+    op.drop_index('ix_queue_length_rollups_res_bucket', table_name='queue_length_rollups')
+    op.drop_index('ix_queue_length_rollups_model_res_bucket', table_name='queue_length_rollups')
+    op.drop_index('ix_queue_length_rollups_id', table_name='queue_length_rollups')
+    op.drop_table('queue_length_rollups')
+
+    op.drop_index('ix_queue_forecasts_id', table_name='queue_forecasts')
+    op.drop_table('queue_forecasts')
+
+    op.drop_index('ix_node_supported_models_model_node', table_name='node_supported_models')
+    op.drop_table('node_supported_models')
+    op.drop_table('node_gpus')
+
+    op.drop_index('ix_scheduling_actions_old_model_created', table_name='scheduling_actions')
+    op.drop_index('ix_scheduling_actions_model_created', table_name='scheduling_actions')
+    op.drop_index('ix_scheduling_actions_id', table_name='scheduling_actions')
+    op.drop_index('ix_scheduling_actions_created_at', table_name='scheduling_actions')
+    op.drop_table('scheduling_actions')
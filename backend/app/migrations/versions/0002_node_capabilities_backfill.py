@@ -0,0 +1,123 @@
+"""node capabilities backfill
+
+旧版本 nodes 表用 available_gpu_ids / available_models 两个 JSON 字段保存节点的GPU与支持的模型，
+现在保存在 node_gpus / node_supported_models 关系表中。旧数据库（0000 的结构）在这里分批回填关系表，
+然后删除旧字段；改用关系表之后由 create_all 建立的数据库没有旧字段，直接跳过。
+降级时重新添加旧字段，并从关系表分批回填 JSON 列表（关系表由 0001 的降级删除）。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 05:10:41.512204
+"""
+import json
+from typing import List, Optional
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.app.migrations.backfill import Backfill, reset_backfill, run_backfill_in_migration
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+LEGACY_COLUMNS = ('available_gpu_ids', 'available_models')
+UPGRADE_BACKFILL = '0002_node_capabilities'
+DOWNGRADE_BACKFILL = '0002_node_capabilities_downgrade'
+
+nodes = sa.table(
+    'nodes', sa.column('id', sa.Integer), sa.column('available_gpu_ids', sa.Text), sa.column('available_models', sa.Text)
+)
+node_gpus = sa.table('node_gpus', sa.column('id', sa.Integer), sa.column('node_id', sa.Integer), sa.column('gpu_id', sa.String))
+node_supported_models = sa.table(
+    'node_supported_models', sa.column('id', sa.Integer), sa.column('node_id', sa.Integer),
+    sa.column('model_name', sa.String),
+)
+
+def _parse_legacy_list(value: Optional[str]) -> List[str]:
+    """解析旧JSON字段，去重并转为字符串，无效数据返回空列表"""
+    try:
+        items = json.loads(value) if value else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if not isinstance(items, list):
+        return []
+    return list(dict.fromkeys(str(item) for item in items))
+
+def _copy_node_lists(conn, rows):
+    """只写入关系表中还没有记录的节点，重复执行同一批不会重复写入"""
+    node_ids = [row.id for row in rows]
+    has_gpus = set(conn.execute(
+        sa.select(node_gpus.c.node_id).where(node_gpus.c.node_id.in_(node_ids)).distinct()
+    ).scalars())
+    has_models = set(conn.execute(
+        sa.select(node_supported_models.c.node_id).where(node_supported_models.c.node_id.in_(node_ids)).distinct()
+    ).scalars())
+    gpus, supported = [], []
+    for row in rows:
+        if row.id not in has_gpus:
+            gpus.extend({'node_id': row.id, 'gpu_id': v} for v in _parse_legacy_list(row.available_gpu_ids))
+        if row.id not in has_models:
+            supported.extend({'node_id': row.id, 'model_name': v} for v in _parse_legacy_list(row.available_models))
+    if gpus:
+        conn.execute(node_gpus.insert(), gpus)
+    if supported:
+        conn.execute(node_supported_models.insert(), supported)
+
+def _restore_node_lists(conn, rows):
+    """把关系表中的GPU与模型写回旧字段（JSON 列表，与旧版本格式一致），重复执行结果相同"""
+    node_ids = [row.id for row in rows]
+    gpu_ids = {node_id: [] for node_id in node_ids}
+    model_names = {node_id: [] for node_id in node_ids}
+    for node_id, gpu_id in conn.execute(
+        sa.select(node_gpus.c.node_id, node_gpus.c.gpu_id)
+        .where(node_gpus.c.node_id.in_(node_ids)).order_by(node_gpus.c.id)
+    ):
+        gpu_ids[node_id].append(str(gpu_id))
+    for node_id, model_name in conn.execute(
+        sa.select(node_supported_models.c.node_id, node_supported_models.c.model_name)
+        .where(node_supported_models.c.node_id.in_(node_ids)).order_by(node_supported_models.c.id)
+    ):
+        model_names[node_id].append(model_name)
+    conn.execute(
+        nodes.update().where(nodes.c.id == sa.bindparam('node_id')).values(
+            available_gpu_ids=sa.bindparam('gpu_ids'), available_models=sa.bindparam('model_names')
+        ),
+        [
+            {'node_id': node_id, 'gpu_ids': json.dumps(gpu_ids[node_id]), 'model_names': json.dumps(model_names[node_id])}
+            for node_id in node_ids
+        ],
+    )
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('nodes')}
+    legacy = [c for c in LEGACY_COLUMNS if c in columns]
+    if not legacy:
+        return
+    if len(legacy) == len(LEGACY_COLUMNS):
+        run_backfill_in_migration(Backfill(
+            name=UPGRADE_BACKFILL,
+            table='nodes',
+            columns=('id',) + LEGACY_COLUMNS,
+            process=_copy_node_lists,
+            where='available_gpu_ids IS NOT NULL OR available_models IS NOT NULL',
+        ))
+    # nodes 表很小，SQLite 下重建表删除旧字段
+    with op.batch_alter_table('nodes') as batch_op:
+        for column in legacy:
+            batch_op.drop_column(column)
+    reset_backfill(DOWNGRADE_BACKFILL)
+
+def downgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('nodes')}
+    for column in LEGACY_COLUMNS:
+        if column not in columns:
+            op.add_column('nodes', sa.Column(column, sa.Text(), nullable=True))
+    run_backfill_in_migration(Backfill(
+        name=DOWNGRADE_BACKFILL,
+        table='nodes',
+        columns=('id',),
+        process=_restore_node_lists,
+    ))
+    reset_backfill(UPGRADE_BACKFILL)
@@ -0,0 +1,116 @@
+"""partition queue history
+
+PostgreSQL 上由旧版本建立的 queue_length_records 是普通表，这里转换为按 timestamp 按天范围分区的表
+（services/queue_partitions.py），其他数据库和已经是分区表的跳过：
+  1. 在迁移事务中把旧表改名，建立同名的分区表（沿用原来的 id 序列）、默认分区和按天分区，之后的写入直接进入新表
+  2. 在事务外分批把旧表的记录复制到新表（回填，可中断后继续），完成后删除旧表
+复制完成之前查询到的历史不完整。按 QUEUE_HISTORY_TTL_SECONDS 保留时为保留期内的每一天建分区，
+否则旧记录都进入默认分区（按条数保留仍逐行清理）。降级时反向转换为普通表。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 07:20:33.918204
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+from backend.app.config import settings
+from backend.app.migrations.backfill import Backfill, reset_backfill, run_backfill_in_migration
+from backend.app.services.queue_partitions import create_partitions
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+TABLE = 'queue_length_records'
+OLD_TABLE = 'queue_length_records_old'
+SEQUENCE = 'queue_length_records_id_seq'
+INDEXES = [
+    ('ix_queue_length_records_id', ['id']),
+    ('ix_queue_length_records_model_id_timestamp', ['model_id', 'timestamp']),
+]
+COLUMNS = ('id', 'model_id', 'length', 'consumers', 'publish_rate', 'deliver_rate', 'timestamp')
+UPGRADE_BACKFILL = '0003_partition_queue_history'
+DOWNGRADE_BACKFILL = '0003_partition_queue_history_downgrade'
+
+def _is_partitioned():
+    return op.get_bind().execute(
+        sa.text("SELECT relkind = 'p' FROM pg_class WHERE relname = :table AND pg_table_is_visible(oid)"),
+        {'table': TABLE},
+    ).scalar()
+
+def _rename_current_table():
+    """旧表连同主键、索引改名，序列与旧表解除关联，让出名称给新表"""
+    op.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY NONE')
+    op.rename_table(TABLE, OLD_TABLE)
+    op.execute(f'ALTER INDEX {TABLE}_pkey RENAME TO {OLD_TABLE}_pkey')
+    for index_name, _ in INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS {index_name} RENAME TO {index_name}_old')
+
+def _create_table(partitioned):
+    op.create_table(TABLE,
+    sa.Column('id', sa.BigInteger(), server_default=sa.text(f"nextval('{SEQUENCE}')"), nullable=False),
+    sa.Column('model_id', sa.Integer(), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('consumers', sa.Integer(), nullable=True),
+    sa.Column('publish_rate', sa.Float(), nullable=True),
+    sa.Column('deliver_rate', sa.Float(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=not partitioned),
+    sa.ForeignKeyConstraint(['model_id'], ['models.id'], ),
+    sa.PrimaryKeyConstraint('id', 'timestamp') if partitioned else sa.PrimaryKeyConstraint('id'),
+    **({'postgresql_partition_by': 'RANGE (timestamp)'} if partitioned else {})
+    )
+    op.execute(f'ALTER SEQUENCE {SEQUENCE} AS bigint OWNED BY {TABLE}.id')
+    for index_name, columns in INDEXES:
+        op.create_index(index_name, TABLE, columns, unique=False)
+
+def _create_day_partitions():
+    today = datetime.utcnow().date()
+    first_day = today
+    if settings.QUEUE_HISTORY_TTL_SECONDS > 0:
+        first_day = (datetime.utcnow() - timedelta(seconds=settings.QUEUE_HISTORY_TTL_SECONDS)).date()
+    days = (today - first_day).days + max(settings.QUEUE_HISTORY_PARTITION_PREMAKE_DAYS, 1)
+    create_partitions(op.get_bind(), first_day, days)
+
+def _copy_rows(conn, rows):
+    """复制一批旧表记录，已经复制过的跳过；没有时间的记录按 1970-01-01 写入（进入默认分区，随清理删除）"""
+    new_table = sa.table(TABLE, *(sa.column(name) for name in COLUMNS))
+    values = [dict(row._mapping) for row in rows]
+    for value in values:
+        if value['timestamp'] is None:
+            value['timestamp'] = datetime(1970, 1, 1)
+    conn.execute(insert(new_table).values(values).on_conflict_do_nothing())
+
+def _convert(partitioned, backfill_name):
+    """转换为分区表（或普通表）；旧表仍然存在说明上次复制中断，直接继续复制"""
+    if OLD_TABLE not in sa.inspect(op.get_bind()).get_table_names():
+        if bool(_is_partitioned()) == partitioned:
+            return
+        _rename_current_table()
+        _create_table(partitioned)
+        if partitioned:
+            _create_day_partitions()
+    run_backfill_in_migration(Backfill(
+        name=backfill_name,
+        table=OLD_TABLE,
+        columns=COLUMNS,
+        process=_copy_rows,
+    ))
+    # 分区表的子表随父表一起删除
+    op.execute(f'DROP TABLE {OLD_TABLE} CASCADE')
+
+def upgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    _convert(True, UPGRADE_BACKFILL)
+    reset_backfill(DOWNGRADE_BACKFILL)
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    _convert(False, DOWNGRADE_BACKFILL)
+    reset_backfill(UPGRADE_BACKFILL)
@@ -0,0 +1,58 @@
+"""node gpu id integer
+
+node_gpus.gpu_id 由字符串改为整数，与 model_instances.gpu_id 一致，查询空闲GPU时两表直接按列连接，
+不再对 model_instances.gpu_id 做类型转换（转换后无法使用 ix_model_instances_node_model_gpu）。
+无法转换为整数的GPU ID（调度本来就会忽略）以及转换后同一节点上重复的GPU ID先删除。
+降级时改回字符串。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:02:16.540381
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+node_gpus = sa.table('node_gpus', sa.column('id', sa.Integer), sa.column('node_id', sa.Integer), sa.column('gpu_id', sa.String))
+
+def _gpu_id_type():
+    return next(c['type'] for c in sa.inspect(op.get_bind()).get_columns('node_gpus') if c['name'] == 'gpu_id')
+
+def _delete_invalid_gpu_ids():
+    """删除无法转换为整数、或转换后与同一节点上已有GPU重复的记录（node_gpus 每个节点一行一个GPU，数据量很小）"""
+    conn = op.get_bind()
+    seen, invalid = set(), []
+    for row in conn.execute(sa.select(node_gpus).order_by(node_gpus.c.id)):
+        gpu_id = str(row.gpu_id).strip()
+        key = (row.node_id, int(gpu_id)) if re.fullmatch(r'[0-9]+', gpu_id) else None
+        if key is None or key in seen:
+            invalid.append(row.id)
+        else:
+            seen.add(key)
+    if invalid:
+        conn.execute(node_gpus.delete().where(node_gpus.c.id.in_(invalid)))
+
+def upgrade():
+    if isinstance(_gpu_id_type(), sa.Integer):
+        return
+    _delete_invalid_gpu_ids()
+    with op.batch_alter_table('node_gpus') as batch_op:
+        batch_op.alter_column(
+            'gpu_id', existing_type=sa.String(length=64), type_=sa.Integer(), existing_nullable=False,
+            postgresql_using='trim(gpu_id)::integer',
+        )
+
+def downgrade():
+    if not isinstance(_gpu_id_type(), sa.Integer):
+        return
+    with op.batch_alter_table('node_gpus') as batch_op:
+        batch_op.alter_column(
+            'gpu_id', existing_type=sa.Integer(), type_=sa.String(length=64), existing_nullable=False,
+            postgresql_using='gpu_id::varchar(64)',
+        )
@@ -2,9 +2,14 @@
 from .environment import Environment
 from .model import Model
 from .node import Node
+from .node_gpu import NodeGpu
+from .node_supported_model import NodeSupportedModel
 from .model_instance import ModelInstance
 from .queue_length_record import QueueLengthRecord
+from .queue_length_rollup import QueueLengthRollup
+from .queue_forecast import QueueForecast
 from .scheduling_strategy import SchedulingStrategy
+from .scheduling_action import SchedulingAction
 
 # 确保所有模型都被导出
-__all__ = ["Environment", "Model", "Node", "ModelInstance", "QueueLengthRecord", "SchedulingStrategy"]
\ No newline at end of file
+__all__ = ["Environment", "Model", "Node", "NodeGpu", "NodeSupportedModel", "ModelInstance", "QueueLengthRecord", "QueueLengthRollup", "QueueForecast", "SchedulingStrategy", "SchedulingAction"]
\ No newline at end of file
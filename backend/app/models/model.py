@@ -20,6 +20,8 @@ class Model(Base):
     rabbitmq_username = Column(String(100), nullable=True)
     rabbitmq_password = Column(String(100), nullable=True)
     rabbitmq_vhost = Column(String(100), default="/")
+    min_instances = Column(Integer, nullable=True, comment="最少实例数，为空时使用调度策略的默认值")
+    max_instances = Column(Integer, nullable=True, comment="最多实例数，为空时使用调度策略的默认值")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 class ModelInstance(Base):
     __tablename__ = "model_instances"
+    __table_args__ = (
+        # 刷新任务按 (节点, 模型, GPU) 比对实例
+        Index("ix_model_instances_node_model_gpu", "node_id", "model_name", "gpu_id"),
+        # 按模型查询运行中实例
+        Index("ix_model_instances_model_status", "model_name", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     node_id = Column(Integer, ForeignKey("nodes.id"), nullable=False)
@@ -17,4 +23,4 @@ class ModelInstance(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # 关系
-    node = relationship("Node", back_populates="model_instances")
\ No newline at end of file
+    node = relationship("Node", back_populates="model_instances")
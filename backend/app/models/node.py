@@ -1,7 +1,38 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from typing import Iterable, List, Optional
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, cast, func, select
+from sqlalchemy.orm import column_property, relationship
 from ..database import Base
+from .node_gpu import NodeGpu
+from .node_supported_model import NodeSupportedModel
+
+# 聚合子查询中列表元素的分隔符（ASCII单元分隔符，不会出现在GPU ID和模型名称中）
+LIST_SEPARATOR = "\x1f"
+
+def _parse_gpu_id(value) -> Optional[int]:
+    """GPU ID转换为整数（node_gpus.gpu_id 为整数），无法转换时返回 None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _split(joined: Optional[str]) -> List[str]:
+    return joined.split(LIST_SEPARATOR) if joined else []
+
+def _replace_children(current: list, values: Optional[Iterable], factory, attr: str, convert=str) -> list:
+    """
+    按新的取值列表更新子记录：保留仍存在的记录、新增缺少的记录，去掉的记录由 delete-orphan 删除。
+    取值先经 convert 转换，转换结果为 None 的忽略
+    """
+    existing = {getattr(child, attr): child for child in current}
+    children = []
+    seen = set()
+    for value in values or []:
+        value = convert(value)
+        if value is None or value in seen:
+            continue
+        seen.add(value)
+        children.append(existing.get(value) or factory(**{attr: value}))
+    return children
 
 class Node(Base):
     __tablename__ = "nodes"
@@ -10,8 +41,6 @@ class Node(Base):
     environment_id = Column(Integer, ForeignKey("environments.id"), nullable=False)
     node_ip = Column(String(45), nullable=False)
     node_port = Column(Integer, default=6004, nullable=False)
-    available_gpu_ids = Column(Text, nullable=True)  # JSON格式存储 ["0", "1", "2"]
-    available_models = Column(Text, nullable=True)   # JSON格式存储 ["MAM", "FastFitAll"]
     status = Column(String(20), default="unknown")   # online, offline, error, unknown
     last_heartbeat = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -19,4 +48,51 @@ class Node(Base):
 
     # 关系
     environment = relationship("Environment", back_populates="nodes")
-    model_instances = relationship("ModelInstance", back_populates="node")
\ No newline at end of file
+    model_instances = relationship("ModelInstance", back_populates="node", cascade="all, delete-orphan")
+    # 可用GPU与支持的模型的子记录，用于修改；async 代码中修改前需在查询中显式加载（selectinload）
+    gpus = relationship("NodeGpu", back_populates="node", cascade="all, delete-orphan", order_by=NodeGpu.id)
+    supported_models = relationship(
+        "NodeSupportedModel", back_populates="node", cascade="all, delete-orphan", order_by=NodeSupportedModel.id
+    )
+
+    # 读取时随节点行一起查询的聚合列表，不为每个GPU、模型创建ORM对象（节点多、模型多时加载子记录开销很大）
+    _gpu_ids_joined = column_property(
+        select(func.aggregate_strings(cast(NodeGpu.gpu_id, String), LIST_SEPARATOR))
+        .where(NodeGpu.node_id == id)
+        .correlate_except(NodeGpu)
+        .scalar_subquery()
+    )
+    _model_names_joined = column_property(
+        select(func.aggregate_strings(NodeSupportedModel.model_name, LIST_SEPARATOR))
+        .where(NodeSupportedModel.node_id == id)
+        .correlate_except(NodeSupportedModel)
+        .scalar_subquery()
+    )
+
+    @property
+    def available_gpu_ids(self) -> List[str]:
+        """可用GPU ID列表，如 ["0", "1", "2"]，按数值排序"""
+        # 子记录已加载（包括刚修改过）时以子记录为准，否则使用查询得到的聚合列表
+        if "gpus" in self.__dict__:
+            gpu_ids = [gpu.gpu_id for gpu in self.gpus]
+        else:
+            gpu_ids = [int(gpu_id) for gpu_id in _split(self._gpu_ids_joined)]
+        return [str(gpu_id) for gpu_id in sorted(gpu_ids)]
+
+    @available_gpu_ids.setter
+    def available_gpu_ids(self, gpu_ids: Optional[Iterable[str]]):
+        # 无法转换为整数的GPU ID忽略（调度只能在整数编号的GPU上部署实例）
+        self.gpus = _replace_children(self.gpus, gpu_ids, NodeGpu, "gpu_id", convert=_parse_gpu_id)
+
+    @property
+    def available_models(self) -> List[str]:
+        """支持的模型名称列表，如 ["FastFitAll", "MAM"]，按名称排序"""
+        if "supported_models" in self.__dict__:
+            model_names = [model.model_name for model in self.supported_models]
+        else:
+            model_names = _split(self._model_names_joined)
+        return sorted(model_names)
+
+    @available_models.setter
+    def available_models(self, model_names: Optional[Iterable[str]]):
+        self.supported_models = _replace_children(self.supported_models, model_names, NodeSupportedModel, "model_name")
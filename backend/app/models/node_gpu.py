@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+class NodeGpu(Base):
+    __tablename__ = "node_gpus"
+    __table_args__ = (
+        # 每个节点的GPU ID唯一，同时用于按节点查询GPU
+        UniqueConstraint("node_id", "gpu_id", name="uq_node_gpus_node_gpu"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    node_id = Column(Integer, ForeignKey("nodes.id", ondelete="CASCADE"), nullable=False)
+    gpu_id = Column(Integer, nullable=False)  # GPU编号，与 model_instances.gpu_id 类型一致，连接查询时不需要类型转换
+
+    # 关系
+    node = relationship("Node", back_populates="gpus")
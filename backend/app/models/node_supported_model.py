@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+class NodeSupportedModel(Base):
+    __tablename__ = "node_supported_models"
+    __table_args__ = (
+        UniqueConstraint("node_id", "model_name", name="uq_node_supported_models_node_model"),
+        # 按模型查询可运行该模型的节点
+        Index("ix_node_supported_models_model_node", "model_name", "node_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    node_id = Column(Integer, ForeignKey("nodes.id", ondelete="CASCADE"), nullable=False)
+    model_name = Column(String(100), nullable=False)
+
+    # 关系
+    node = relationship("Node", back_populates="supported_models")
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, Text, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+
+from ..database import Base
+
+class QueueForecast(Base):
+    """每个模型的队列长度预测状态（Holt-Winters 加法模型，按日季节性），随10分钟聚合数据增量更新"""
+    __tablename__ = "queue_forecasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_id = Column(Integer, ForeignKey("models.id"), nullable=False, unique=True)
+    level = Column(Float, nullable=False, default=0.0)
+    trend = Column(Float, nullable=False, default=0.0)
+    seasonal = Column(Text, nullable=False)  # JSON格式存储一天内各时间桶的季节分量，初始化前为观测值（未观测到为 null）
+    last_bucket = Column(DateTime(timezone=True), nullable=True)  # 已拟合的最后一个时间桶（UTC）
+    last_value = Column(Float, nullable=True)
+    # 尚未到期的预测 JSON：[[目标时间桶, 预测值, 预测时的实际值], ...]，到期后计算预测误差
+    pending_forecasts = Column(Text, nullable=True)
+    # 已拟合的时间桶数；第一个季节周期内按经过的时间桶计数（含缺失的），达到一天的时间桶数时完成初始化
+    sample_count = Column(Integer, nullable=False, default=0)
+
+    # 提前 QUEUE_FORECAST_EVAL_STEPS 个时间桶的预测误差，按 QUEUE_FORECAST_ERROR_DECAY 指数衰减累计，用于评估预测是否可信
+    error_count = Column(Integer, nullable=False, default=0)
+    error_weight = Column(Float, nullable=False, default=0.0)
+    abs_error_sum = Column(Float, nullable=False, default=0.0)
+    sq_error_sum = Column(Float, nullable=False, default=0.0)
+    naive_abs_error_sum = Column(Float, nullable=False, default=0.0)  # 沿用预测时的实际值作为预测的误差
+
+    model = relationship("Model")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import event, Column, BigInteger, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -6,10 +6,29 @@ from ..database import Base
 
 class QueueLengthRecord(Base):
     __tablename__ = "queue_length_records"
+    __table_args__ = (
+        # 按模型查询时间窗口内的记录、按模型保留最新N条
+        Index("ix_queue_length_records_model_id_timestamp", "model_id", "timestamp"),
+        # PostgreSQL 下按天范围分区，过期数据整分区删除（见 services/queue_partitions.py）；主键需包含分区键
+        {"postgresql_partition_by": "RANGE (timestamp)", "info": {"partition_key": ("timestamp",)}},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # SQLite 的自增主键必须是 INTEGER
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)
     model_id = Column(Integer, ForeignKey("models.id"), nullable=False)
     length = Column(Integer, nullable=False)
+    consumers = Column(Integer, nullable=True)  # 采样时队列的消费者数量
+    publish_rate = Column(Float, nullable=True)  # RabbitMQ统计的消息发布速率（条/秒）
+    deliver_rate = Column(Float, nullable=True)  # RabbitMQ统计的消息投递速率（条/秒）
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
-    model = relationship("Model")
\ No newline at end of file
+    model = relationship("Model")
+
+@event.listens_for(QueueLengthRecord.__table__, "after_create")
+def _create_initial_partitions(target, connection, **kw):
+    """PostgreSQL 下建表后立即创建默认分区和最近几天的分区，否则写入会因没有对应分区而失败"""
+    if connection.dialect.name == "postgresql":
+        from datetime import datetime
+        from ..config import settings
+        from ..services.queue_partitions import create_partitions
+        create_partitions(connection, datetime.utcnow().date(), max(settings.QUEUE_HISTORY_PARTITION_PREMAKE_DAYS, 1))
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+
+from ..database import Base
+
+class QueueLengthRollup(Base):
+    """队列长度的降采样聚合，每个 (模型, 精度, 时间桶) 一行"""
+    __tablename__ = "queue_length_rollups"
+    __table_args__ = (
+        Index("ix_queue_length_rollups_model_res_bucket", "model_id", "resolution", "bucket_start", unique=True),
+        # 按精度清理过期数据
+        Index("ix_queue_length_rollups_res_bucket", "resolution", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_id = Column(Integer, ForeignKey("models.id"), nullable=False)
+    resolution = Column(Integer, nullable=False)  # 时间桶长度（秒）: 60, 600, 3600
+    bucket_start = Column(DateTime(timezone=True), nullable=False)  # 时间桶起始时间（UTC）
+    min_length = Column(Integer, nullable=False)
+    max_length = Column(Integer, nullable=False)
+    sum_length = Column(Float, nullable=False)
+    last_length = Column(Integer, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+
+    model = relationship("Model")
+
+    @property
+    def avg_length(self) -> float:
+        return self.sum_length / self.sample_count if self.sample_count else 0.0
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+class SchedulingAction(Base):
+    """调度策略执行过的部署操作，用于按模型计算冷却时间和追溯调度历史"""
+    __tablename__ = "scheduling_actions"
+    __table_args__ = (
+        # 查询冷却期内各模型最近一次操作
+        Index("ix_scheduling_actions_model_created", "model_name", "created_at"),
+        Index("ix_scheduling_actions_old_model_created", "old_model_name", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    strategy = Column(String(100), nullable=False)
+    action = Column(String(20), nullable=False)  # start, stop, replace
+    model_name = Column(String(100), nullable=False)
+    old_model_name = Column(String(100), nullable=True)
+    node_id = Column(Integer, nullable=True)
+    gpu_id = Column(Integer, nullable=True)
+    success = Column(Boolean, nullable=False, default=False)
+    error = Column(Text, nullable=True)
+    reason = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -7,4 +7,5 @@ class SchedulingStrategy(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
-    is_active = Column(Boolean, default=False, nullable=False)
\ No newline at end of file
+    is_active = Column(Boolean, default=False, nullable=False)
+    parameters = Column(Text, nullable=True)  # JSON格式存储策略参数，由对应策略的参数模型校验
@@ -1,7 +1,9 @@
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from backend.app.config import settings
 from backend.app.jobs import node_jobs, queue_jobs, scheduling_jobs
+from backend.app.services import metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,11 +13,22 @@ scheduler = AsyncIOScheduler()
 async def async_apply_scheduling_strategies():
     await scheduling_jobs.apply_scheduling_strategies()
 
+def on_job_event(event):
+    """统计错过执行时间（misfire）和因上一次仍在运行而跳过（overrun）的任务"""
+    if event.code == EVENT_JOB_MISSED:
+        metrics.job_misfires.inc(event.job_id)
+        logger.warning(f"定时任务 {event.job_id} 错过了计划执行时间 {event.scheduled_run_time}")
+    elif event.code == EVENT_JOB_MAX_INSTANCES:
+        metrics.job_overruns.inc(event.job_id)
+        logger.warning(f"定时任务 {event.job_id} 上一次执行尚未结束，跳过本次执行")
+
 def init_scheduler():
-    """初始化调度器并注册任务"""
+    """初始化调度器并注册任务（任务执行耗时与结果记录到监控指标）"""
+    scheduler.add_listener(on_job_event, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
     # 注册节点状态刷新任务
     scheduler.add_job(
-        node_jobs.refresh_node_status,
+        metrics.instrument_job("refresh_node_status", node_jobs.refresh_node_status),
         trigger=IntervalTrigger(seconds=settings.NODE_STATUS_REFRESH_INTERVAL),
         id="refresh_node_status",
         replace_existing=True
@@ -24,16 +37,25 @@ def init_scheduler():
 
     # 注册队列长度记录任务
     scheduler.add_job(
-        queue_jobs.record_queue_lengths,
+        metrics.instrument_job("record_queue_lengths", queue_jobs.record_queue_lengths),
         trigger=IntervalTrigger(seconds=60),  # 每60秒执行一次
         id="record_queue_lengths",
         replace_existing=True
     )
     logger.info("调度器任务已注册: record_queue_lengths")
 
+    # 注册队列长度预测更新任务（只在10分钟时间桶完成后才有新数据，其余执行为空操作）
+    scheduler.add_job(
+        metrics.instrument_job("refresh_queue_forecasts", queue_jobs.refresh_queue_forecasts),
+        trigger=IntervalTrigger(seconds=60),
+        id="refresh_queue_forecasts",
+        replace_existing=True
+    )
+    logger.info("调度器任务已注册: refresh_queue_forecasts")
+
     # 注册调度策略应用任务
     scheduler.add_job(
-        async_apply_scheduling_strategies,
+        metrics.instrument_job("apply_scheduling_strategies", async_apply_scheduling_strategies),
         trigger=IntervalTrigger(minutes=1),  # 每1分钟执行一次，方便测试
         id="apply_scheduling_strategies",
         replace_existing=True
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from datetime import datetime
 
 class DeployedModelInfo(BaseModel):
     """单个部署模型的信息"""
@@ -33,4 +34,6 @@ class ModelDeploymentStat(BaseModel):
 class DeploymentSummary(BaseModel):
     """部署页面的聚合数据结构"""
     model_stats: List[ModelDeploymentStat]
-    deployment_statuses: List[NodeDeploymentStatus]
\ No newline at end of file
+    deployment_statuses: List[NodeDeploymentStatus]
+    snapshot_time: Optional[datetime] = Field(None, description="节点状态快照的获取时间（UTC）")
+    snapshot_age: Optional[float] = Field(None, description="节点状态快照的年龄（秒）")
\ No newline at end of file
@@ -16,6 +16,8 @@ class ModelBase(BaseModel):
     rabbitmq_username: Optional[str] = Field(None, description="RabbitMQ用户名")
     rabbitmq_password: Optional[str] = Field(None, description="RabbitMQ密码")
     rabbitmq_vhost: str = Field(default="/", description="RabbitMQ虚拟主机")
+    min_instances: Optional[int] = Field(None, ge=0, description="最少实例数，为空时使用调度策略的默认值")
+    max_instances: Optional[int] = Field(None, ge=0, description="最多实例数，为空时使用调度策略的默认值")
 
 class ModelCreate(ModelBase):
     pass
@@ -33,6 +35,8 @@ class ModelUpdate(BaseModel):
     rabbitmq_username: Optional[str] = Field(None, description="RabbitMQ用户名")
     rabbitmq_password: Optional[str] = Field(None, description="RabbitMQ密码")
     rabbitmq_vhost: Optional[str] = Field(None, description="RabbitMQ虚拟主机")
+    min_instances: Optional[int] = Field(None, ge=0, description="最少实例数，为空时使用调度策略的默认值")
+    max_instances: Optional[int] = Field(None, ge=0, description="最多实例数，为空时使用调度策略的默认值")
 
 class Model(ModelBase):
     id: int
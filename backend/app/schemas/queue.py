@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class QueueInfo(BaseModel):
@@ -28,4 +28,50 @@ class QueueLengthRecord(QueueLengthRecordBase):
     timestamp: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class QueueHistoryPoint(BaseModel):
+    """队列历史中的一个点，原始记录或降采样时间桶"""
+    id: Optional[int] = None
+    model_id: int
+    timestamp: datetime
+    length: float
+    min_length: int
+    max_length: int
+    avg_length: float
+    last_length: int
+    sample_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class ForecastAccuracy(BaseModel):
+    """提前 horizon_seconds 的预测误差统计，skill = 1 - mae / naive_mae，大于0表示优于“沿用当前值”的朴素预测"""
+    horizon_seconds: int
+    samples: int
+    mae: Optional[float] = None
+    rmse: Optional[float] = None
+    naive_mae: Optional[float] = None
+    skill: Optional[float] = None
+
+
+class ForecastPoint(BaseModel):
+    timestamp: datetime
+    length: float
+
+
+class QueueForecast(BaseModel):
+    """模型的队列长度预测"""
+    model_id: int
+    last_bucket: Optional[datetime] = None
+    peak_length: float
+    points: List[ForecastPoint]
+    accuracy: ForecastAccuracy
+
+
+class QueueForecastAccuracy(ForecastAccuracy):
+    """模型的预测准确度"""
+    model_id: int
+    last_bucket: Optional[datetime] = None
@@ -1,10 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
+import json
+from pydantic import BaseModel, field_validator
+from datetime import datetime
+from typing import Optional, Dict, Any, List
 
 class SchedulingStrategyBase(BaseModel):
     name: str
     description: Optional[str] = None
     is_active: bool = False
+    parameters: Dict[str, Any] = {}
 
 class SchedulingStrategyCreate(SchedulingStrategyBase):
     pass
@@ -13,9 +16,52 @@ class SchedulingStrategyUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     is_active: Optional[bool] = None
+    parameters: Optional[Dict[str, Any]] = None
 
 class SchedulingStrategy(SchedulingStrategyBase):
     id: int
 
+    @field_validator("parameters", mode="before")
+    @classmethod
+    def parse_parameters(cls, v):
+        # 数据库中以JSON字符串存储
+        if v is None or v == "":
+            return {}
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+    class Config:
+        from_attributes = True
+
+class StrategyInfo(BaseModel):
+    """已注册的调度策略"""
+    name: str
+    description: str
+    parameters_schema: Dict[str, Any]
+
+class DeploymentAction(BaseModel):
+    """部署计划中的单个操作"""
+    action: str
+    node_id: int
+    node_ip: str
+    node_port: int
+    gpu_id: int
+    model_name: str
+    old_model_name: Optional[str] = None
+    reason: str
+    drain_seconds_before: Optional[float] = None
+    drain_seconds_after: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class DeploymentPlan(BaseModel):
+    """调度策略预演生成的部署计划"""
+    strategy: str
+    actions: List[DeploymentAction]
+    decision_ms: float
+    created_at: datetime
+
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
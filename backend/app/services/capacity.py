@@ -0,0 +1,100 @@
+"""
+模型容量估算
+基于 Little 定律与RabbitMQ观测到的消息速率，估算各模型的到达速率、单实例服务速率，
+以及在目标排空时间内消化积压所需的实例数
+"""
+import math
+from typing import NamedTuple, Optional, Tuple
+
+from .queue_stats import QueueWindowStats
+
+class ModelCapacity(NamedTuple):
+    """单个模型的容量估算结果"""
+    model_id: int
+    queue_length: float  # 当前积压（最近平均队列长度）
+    arrival_rate: float  # 到达速率（条/秒）
+    service_rate: Optional[float]  # 单实例服务速率（条/秒），无法估算时为 None
+    service_rate_source: str  # observed（由投递速率观测）、static（由平均推理时间换算）、none
+    instances: int  # 当前运行的实例数
+    demand: float  # 达到目标排空时间所需的处理能力，以实例数计（可为小数）
+    required_instances: int  # 达到目标排空时间所需的实例数
+    drain_seconds: Optional[float]  # 按当前实例数排空积压所需时间，None 表示无法排空
+    wait_seconds: Optional[float]  # Little 定律 W = L / λ 估算的平均排队时间
+    forecast_queue_length: Optional[float] = None  # 参与计算的预测队列峰值，未使用预测时为 None
+
+def estimate_arrival_rate(stats: QueueWindowStats, window_seconds: int) -> float:
+    """优先使用RabbitMQ的发布速率，否则用 投递速率 + 队列增长速率 推算"""
+    if stats.publish_rate is not None:
+        return max(stats.publish_rate, 0.0)
+    # trend 是窗口后半段与前半段平均值之差，两段中心相隔 window_seconds / 2
+    growth = stats.trend / (window_seconds / 2) if window_seconds else 0.0
+    return max((stats.deliver_rate or 0.0) + growth, 0.0)
+
+def estimate_service_rate(stats: Optional[QueueWindowStats], inference_time: Optional[float]) -> Tuple[Optional[float], str]:
+    """估算单实例服务速率，返回 (速率, 来源)"""
+    # 队列有积压时实例处于饱和状态，投递速率 / 消费者数量 即单实例的处理能力
+    if stats and stats.deliver_rate and stats.consumers and stats.recent_avg_length > 0:
+        return stats.deliver_rate / stats.consumers, "observed"
+    if inference_time:
+        return 1.0 / inference_time, "static"
+    return None, "none"
+
+def drain_seconds(queue_length: float, arrival_rate: float, service_rate: Optional[float], instances: int) -> Optional[float]:
+    """以 instances 个实例排空积压所需时间 L / (nμ − λ)，处理能力不超过到达速率时无法排空"""
+    if queue_length <= 0:
+        return 0.0
+    if not service_rate or instances <= 0:
+        return None
+    net_rate = instances * service_rate - arrival_rate
+    if net_rate <= 0:
+        return None
+    return round(queue_length / net_rate, 3)
+
+def capacity_demand(
+    queue_length: float,
+    arrival_rate: float,
+    service_rate: Optional[float],
+    target_drain_seconds: float,
+    target_utilization: float = 1.0,
+) -> float:
+    """
+    在目标时间内排空积压、且稳态利用率不超过目标值所需的处理能力（实例数）：
+    max((λ + L/T) / μ, λ / (ρμ))；服务速率未知时有积压或流量就按一个实例计
+    """
+    if queue_length <= 0 and arrival_rate <= 0:
+        return 0.0
+    if not service_rate:
+        return 1.0
+    drain = (arrival_rate + queue_length / target_drain_seconds) / service_rate
+    steady = arrival_rate / (service_rate * target_utilization)
+    return max(drain, steady)
+
+def estimate_model_capacity(
+    stats: QueueWindowStats,
+    inference_time: Optional[float],
+    instances: int,
+    window_seconds: int,
+    target_drain_seconds: float,
+    target_utilization: float = 1.0,
+    forecast_queue_length: Optional[float] = None,
+) -> ModelCapacity:
+    """根据窗口统计估算单个模型的容量需求；给出预测队列峰值时按当前积压与预测峰值中的较大者计算"""
+    queue_length = stats.recent_avg_length
+    arrival_rate = estimate_arrival_rate(stats, window_seconds)
+    service_rate, source = estimate_service_rate(stats, inference_time)
+    planned_length = max(queue_length, forecast_queue_length or 0.0)
+    demand = capacity_demand(planned_length, arrival_rate, service_rate, target_drain_seconds, target_utilization)
+    return ModelCapacity(
+        model_id=stats.model_id,
+        queue_length=queue_length,
+        arrival_rate=arrival_rate,
+        service_rate=service_rate,
+        service_rate_source=source,
+        instances=instances,
+        demand=demand,
+        # 浮点误差不应多算一个实例
+        required_instances=math.ceil(demand - 1e-9) if demand > 0 else 0,
+        drain_seconds=drain_seconds(queue_length, arrival_rate, service_rate, instances),
+        wait_seconds=round(queue_length / arrival_rate, 3) if arrival_rate > 0 else None,
+        forecast_queue_length=round(forecast_queue_length, 3) if forecast_queue_length is not None else None,
+    )
@@ -0,0 +1,145 @@
+"""
+集群状态缓存
+缓存各节点的模型/GPU状态快照，由定时刷新任务填充，供API和调度任务共享读取
+"""
+import asyncio
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, NamedTuple, Set
+
+from ..config import settings
+from .node_client import NodeManager, node_manager
+
+logger = logging.getLogger(__name__)
+
+class CachedNodeStatus(NamedTuple):
+    """单个节点的缓存状态"""
+    model_status: List[Dict[str, Any]]
+    gpu_status: List[Dict[str, Any]]
+    error: Optional[str]
+    fetched_at: float  # time.monotonic() 时间戳
+
+@dataclass
+class ClusterSnapshot:
+    """一组节点的状态快照"""
+    model_status: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    gpu_status: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)  # 不可达节点 -> 错误信息
+    age: float = 0.0  # 快照中最旧节点数据的年龄（秒）
+
+    @property
+    def fetched_at(self) -> datetime:
+        """快照中最旧节点数据的获取时间（UTC）"""
+        return datetime.utcnow() - timedelta(seconds=self.age)
+
+class ClusterStateCache:
+    """集群状态缓存，并发的缓存未命中会合并为同一次节点请求"""
+
+    def __init__(self, manager: NodeManager = node_manager):
+        self._manager = manager
+        self._entries: Dict[str, CachedNodeStatus] = {}
+        # 正在进行中的节点请求，node_key -> 负责该节点的批量请求任务
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _node_key(node: Dict[str, Any]) -> str:
+        return f"{node['node_ip']}:{node.get('node_port', 6004)}"
+
+    async def get_status(
+        self,
+        nodes: List[Dict[str, Any]],
+        max_staleness: Optional[float] = None,
+    ) -> ClusterSnapshot:
+        """获取节点状态快照，超过 max_staleness 秒的节点数据会重新获取"""
+        if max_staleness is None:
+            max_staleness = settings.CLUSTER_STATE_MAX_STALENESS
+
+        now = time.monotonic()
+        stale_nodes = []
+        for node in nodes:
+            entry = self._entries.get(self._node_key(node))
+            if entry is None or now - entry.fetched_at > max_staleness:
+                stale_nodes.append(node)
+
+        if stale_nodes:
+            await self._fetch(stale_nodes)
+        return self._build_snapshot(nodes)
+
+    async def refresh(self, nodes: List[Dict[str, Any]]) -> ClusterSnapshot:
+        """
+        强制从节点重新获取状态（定时刷新任务使用）。
+        nodes 为当前全部节点，不在其中的节点（已删除或修改了地址）的缓存一并清除
+        """
+        await self._fetch(nodes)
+        self._prune({self._node_key(node) for node in nodes})
+        return self._build_snapshot(nodes)
+
+    def invalidate(self, node_key: Optional[str] = None):
+        """使指定节点（或全部节点）的缓存失效"""
+        if node_key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(node_key, None)
+
+    def _prune(self, node_keys: Set[str]):
+        """清除不在 node_keys 中的节点缓存"""
+        for key in [key for key in self._entries if key not in node_keys]:
+            del self._entries[key]
+
+    async def _fetch(self, nodes: List[Dict[str, Any]]):
+        """获取节点状态，已有进行中请求的节点直接等待该请求（single-flight）"""
+        pending = set()
+        to_fetch = []
+        for node in nodes:
+            task = self._inflight.get(self._node_key(node))
+            if task is None:
+                to_fetch.append(node)
+            else:
+                pending.add(task)
+
+        if to_fetch:
+            task = asyncio.ensure_future(self._do_fetch(to_fetch))
+            keys = [self._node_key(node) for node in to_fetch]
+            for key in keys:
+                self._inflight[key] = task
+            task.add_done_callback(lambda done, keys=keys: self._clear_inflight(keys, done))
+            pending.add(task)
+
+        # shield: 某个调用方被取消时不影响其他等待同一请求的调用方
+        await asyncio.gather(*(asyncio.shield(task) for task in pending), return_exceptions=True)
+
+    def _clear_inflight(self, keys: List[str], task: asyncio.Task):
+        for key in keys:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    async def _do_fetch(self, nodes: List[Dict[str, Any]]):
+        async for result in self._manager.iter_status(nodes):
+            self._entries[result.node_key] = CachedNodeStatus(
+                model_status=result.model_status,
+                gpu_status=result.gpu_status,
+                error=result.error,
+                fetched_at=time.monotonic(),
+            )
+
+    def _build_snapshot(self, nodes: List[Dict[str, Any]]) -> ClusterSnapshot:
+        now = time.monotonic()
+        snapshot = ClusterSnapshot()
+        for node in nodes:
+            key = self._node_key(node)
+            entry = self._entries.get(key)
+            if entry is None:
+                snapshot.model_status[key] = []
+                snapshot.gpu_status[key] = []
+                continue
+            snapshot.model_status[key] = entry.model_status
+            snapshot.gpu_status[key] = entry.gpu_status
+            if entry.error is not None:
+                snapshot.errors[key] = entry.error
+            snapshot.age = max(snapshot.age, now - entry.fetched_at)
+        return snapshot
+
+# 全局集群状态缓存实例
+cluster_state_cache = ClusterStateCache()
@@ -0,0 +1,81 @@
+"""
+后台任务的单写入者队列
+定时任务的写操作（队列采样、节点状态、预测、调度记录）提交到队列，由同一个工作任务按提交顺序逐个执行，
+各任务之间不再争用SQLite写锁；每个写操作在独立的短事务中完成，不会长时间占用写锁阻塞API的写入。
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from ..database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class DatabaseWriter:
+    """单写入者队列，写操作是接收同步 Session 的函数，在异步会话中通过 run_sync 执行并提交"""
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None):
+        self._session_factory = session_factory or AsyncSessionLocal
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pending(self) -> int:
+        """等待执行的写操作数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        # 工作任务绑定在事件循环上，事件循环变化时（如测试中多次 asyncio.run）重新创建
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue), name="db-writer")
+
+    async def submit(self, func: Callable[..., T], *args: Any) -> T:
+        """提交写操作 func(session, *args) 并等待其执行完成，返回 func 的返回值；执行失败时回滚并抛出原异常"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((func, args, future))
+        return await future
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            func, args, future = await queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                try:
+                    result = await self._execute(func, args)
+                except Exception as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+            finally:
+                queue.task_done()
+
+    async def _execute(self, func: Callable[..., T], args: Tuple[Any, ...]) -> T:
+        async with self._session_factory() as db:
+            result = await db.run_sync(func, *args)
+            await db.commit()
+            return result
+
+    async def close(self):
+        """执行完已提交的写操作后停止工作任务"""
+        if self._worker is None or self._worker.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+# 全局单写入者队列
+db_writer = DatabaseWriter()
@@ -0,0 +1,382 @@
+"""
+Prometheus 指标
+不依赖 prometheus_client，按 Prometheus 文本格式（0.0.4）在 /metrics 输出。
+记录指标的函数都是同步的、只在更新数值时短暂持有线程锁（同步路由运行在线程池中），不会跨 await 持锁。
+
+覆盖范围：
+  - API：按路由模板统计请求数与延迟
+  - 定时任务：执行耗时、结果、错过执行（misfire）与上一次仍在运行导致的跳过（overrun）
+  - 节点请求：按接口的延迟分布，按节点的请求数、累计耗时、错误与超时
+  - 数据库：按语句类型统计查询数、耗时与错误
+  - 队列采集：每个模型距上次成功采集的时间、采集错误
+  - 调度：各策略的决策次数与耗时、按类型和结果统计的部署操作
+"""
+import math
+import time
+import functools
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config import settings
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+JOB_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+def _escape_label(value: str) -> str:
+    return _escape_help(value).replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape_label(str(v))}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """指标基类，每组标签值对应一个时间序列"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际传入 {labels}")
+        return tuple(str(v) for v in labels)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return lines
+
+class Counter(Metric):
+    """只增不减的计数"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(Metric):
+    """可任意设置的数值；指定 function 时在输出时计算 {标签值: 数值}"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function = function
+
+    def set(self, *labels: str, value: float):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def retain(self, keys: Iterable[LabelValues]):
+        """只保留指定的时间序列（删除已不存在的对象）"""
+        keep = set(keys)
+        with self._lock:
+            for key in [k for k in self._values if k not in keep]:
+                del self._values[key]
+
+    def items(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self) -> Iterable[str]:
+        items = list(self._function().items()) if self._function else self.items()
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(Metric):
+    """分桶统计；每次观测只增加所在的桶，输出时再累加为 Prometheus 的累积桶"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # [各桶计数..., +Inf 桶计数, 总和]
+
+    def observe(self, *labels: str, value: float):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0.0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {_format_value(cumulative)}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标 {metric.name} 已注册")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), function=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# API请求
+
+http_requests = registry.counter("http_requests_total", "API请求数", ["method", "route", "status"])
+http_request_duration = registry.histogram("http_request_duration_seconds", "API请求耗时（秒）", ["method", "route"])
+
+class MetricsMiddleware:
+    """按路由模板统计API请求数与延迟，未匹配到路由的请求统一记为 unmatched，避免标签数量失控"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # 路由匹配后 FastAPI 会把路由对象写入 scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_requests.inc(scope["method"], route, str(status))
+            http_request_duration.observe(scope["method"], route, value=time.perf_counter() - started)
+
+# 定时任务
+
+job_duration = registry.histogram("scheduler_job_duration_seconds", "定时任务执行耗时（秒）", ["job"], JOB_BUCKETS)
+job_runs = registry.counter("scheduler_job_runs_total", "定时任务执行次数，result 为 success 或 error（任务抛出异常）", ["job", "result"])
+job_last_success = registry.gauge("scheduler_job_last_success_timestamp_seconds", "定时任务最近一次成功完成的时间（Unix时间戳）", ["job"])
+job_misfires = registry.counter("scheduler_job_misfires_total", "定时任务错过计划执行时间（超过 misfire_grace_time）的次数", ["job"])
+job_overruns = registry.counter("scheduler_job_overruns_total", "上一次执行尚未结束、本次执行被跳过的次数", ["job"])
+
+def instrument_job(job_id: str, func: Callable):
+    """包装异步定时任务，记录执行耗时和结果"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = "error"
+        try:
+            value = await func(*args, **kwargs)
+            result = "success"
+            return value
+        finally:
+            job_duration.observe(job_id, value=time.perf_counter() - started)
+            job_runs.inc(job_id, result)
+            if result == "success":
+                job_last_success.set(job_id, value=time.time())
+    return wrapper
+
+# 节点请求
+
+node_request_duration = registry.histogram("node_http_request_duration_seconds", "节点API请求耗时（秒）", ["method", "endpoint"])
+node_requests = registry.counter(
+    "node_http_requests_total",
+    "节点API请求数，outcome 为 ok、http_error（4xx/5xx）、timeout、error（连接失败等）或 cancelled（超过批量请求截止时间被取消）",
+    ["node", "outcome"],
+)
+node_request_seconds = registry.counter("node_http_request_seconds_total", "节点API请求累计耗时（秒），除以请求数得到平均延迟", ["node"])
+node_deadline_exceeded = registry.counter("node_call_deadline_exceeded_total", "批量请求中超过截止时间的节点调用次数", ["node"])
+
+def _node_label(node_key: str) -> str:
+    return node_key if settings.METRICS_PER_NODE else "all"
+
+def observe_node_request(node_key: str, method: str, endpoint: str, outcome: str, seconds: float):
+    node = _node_label(node_key)
+    node_request_duration.observe(method, endpoint, value=seconds)
+    node_requests.inc(node, outcome)
+    node_request_seconds.inc(node, amount=seconds)
+
+def record_node_deadline_exceeded(node_key: str):
+    node_deadline_exceeded.inc(_node_label(node_key))
+
+# 数据库
+
+db_queries = registry.counter("db_queries_total", "数据库语句执行次数", ["operation"])
+db_query_duration = registry.histogram("db_query_duration_seconds", "数据库语句执行耗时（秒）", ["operation"], DB_BUCKETS)
+db_query_errors = registry.counter("db_query_errors_total", "数据库语句执行失败次数", ["operation"])
+
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+def _sql_operation(statement: Optional[str]) -> str:
+    words = (statement or "").split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in _SQL_OPERATIONS else "OTHER"
+
+def instrument_engine(engine):
+    """通过 SQLAlchemy 事件统计语句的执行次数、耗时和失败"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        operation = _sql_operation(statement)
+        db_queries.inc(operation)
+        db_query_duration.observe(operation, value=time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        stack = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+        db_query_errors.inc(_sql_operation(context.statement))
+
+# 队列采集
+
+queue_scrape_duration = registry.histogram("queue_scrape_duration_seconds", "一轮抓取所有RabbitMQ端点的耗时（秒）")
+queue_scrape_errors = registry.counter(
+    "queue_scrape_errors_total",
+    "抓取RabbitMQ队列信息失败的次数，reason 为 network、status、parse 或 missing_queue",
+    ["broker", "reason"],
+)
+queue_last_scrape = registry.gauge(
+    "queue_scrape_last_success_timestamp_seconds", "各模型最近一次成功采集队列长度的时间（Unix时间戳）", ["model_id", "model"]
+)
+queue_scrape_staleness = registry.gauge(
+    "queue_scrape_staleness_seconds",
+    "各模型距最近一次成功采集队列长度的时间（秒）",
+    ["model_id", "model"],
+    function=lambda: {key: max(time.time() - value, 0.0) for key, value in queue_last_scrape.items()},
+)
+
+def record_queue_scrape(models, sampled_ids: Iterable[int], seconds: float):
+    """记录一轮采集：更新成功采集的模型的时间戳，删除已不再配置队列的模型"""
+    now = time.time()
+    sampled = set(sampled_ids)
+    keys = []
+    for model in models:
+        key = (str(model.id), model.model_name)
+        keys.append(key)
+        if model.id in sampled:
+            queue_last_scrape.set(*key, value=now)
+    queue_last_scrape.retain(keys)
+    queue_scrape_duration.observe(value=seconds)
+
+def record_queue_scrape_error(broker: str, reason: str):
+    queue_scrape_errors.inc(broker, reason)
+
+# 调度
+
+scheduling_decisions = registry.counter(
+    "scheduling_decisions_total", "调度决策次数，outcome 为 actions（生成了操作）或 noop", ["strategy", "outcome"]
+)
+scheduling_decision_duration = registry.histogram(
+    "scheduling_decision_duration_seconds", "plan 阶段生成部署计划的耗时（秒）", ["strategy"], DB_BUCKETS
+)
+scheduling_planned_actions = registry.counter("scheduling_planned_actions_total", "部署计划中的操作数", ["strategy", "action"])
+scheduling_actions = registry.counter(
+    "scheduling_actions_total", "执行的部署操作数，result 为 success、failed 或 skipped", ["strategy", "action", "result"]
+)
+scheduling_action_duration = registry.histogram(
+    "scheduling_action_duration_seconds", "单个部署操作的执行耗时（秒）", ["strategy", "action"], JOB_BUCKETS
+)
+
+def record_plan(plan):
+    """记录一次调度决策（DeploymentPlan）"""
+    scheduling_decisions.inc(plan.strategy, "actions" if plan.actions else "noop")
+    scheduling_decision_duration.observe(plan.strategy, value=plan.decision_ms / 1000)
+    for action in plan.actions:
+        scheduling_planned_actions.inc(plan.strategy, action.action)
+
+def record_execution_report(strategy: str, report):
+    """记录部署计划（ExecutionReport）中各操作的执行结果"""
+    for result in report.results:
+        outcome = "success" if result.success else ("skipped" if result.skipped else "failed")
+        scheduling_actions.inc(strategy, result.action.action, outcome)
+        if not result.skipped:
+            scheduling_action_duration.observe(strategy, result.action.action, value=result.duration_ms / 1000)
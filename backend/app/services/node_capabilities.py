@@ -0,0 +1,45 @@
+"""
+节点能力查询
+节点的可用GPU和支持的模型保存在 node_gpus / node_supported_models 两张关系表中（原 nodes 表的
+available_gpu_ids / available_models JSON 字段），"哪些在线节点能在空闲GPU上运行模型X" 由一次带索引的连接查询得到。
+空闲GPU指 model_instances 中没有未停止实例占用的GPU（由节点状态刷新任务维护）。
+"""
+from typing import Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.sql import Select
+
+from ..models.model_instance import ModelInstance
+from ..models.node import Node
+from ..models.node_gpu import NodeGpu
+from ..models.node_supported_model import NodeSupportedModel
+
+def free_gpus_query(
+    model_name: Optional[str] = None,
+    environment_id: Optional[int] = None,
+    online_only: bool = True,
+) -> Select:
+    """
+    查询 (node_id, gpu_id)：没有未停止实例占用的GPU。
+    指定 model_name 时只包含支持该模型的节点；online_only 时只包含在线节点
+    """
+    query = (
+        select(NodeGpu.node_id, NodeGpu.gpu_id)
+        .join(Node, Node.id == NodeGpu.node_id)
+        .outerjoin(ModelInstance, and_(
+            ModelInstance.node_id == NodeGpu.node_id,
+            ModelInstance.gpu_id == NodeGpu.gpu_id,
+            ModelInstance.status != "STOPPED",
+        ))
+        .where(ModelInstance.id.is_(None))
+    )
+    if model_name is not None:
+        query = query.join(NodeSupportedModel, and_(
+            NodeSupportedModel.node_id == NodeGpu.node_id,
+            NodeSupportedModel.model_name == model_name,
+        ))
+    if online_only:
+        query = query.where(Node.status == "online")
+    if environment_id is not None:
+        query = query.where(Node.environment_id == environment_id)
+    return query.order_by(NodeGpu.node_id, NodeGpu.id)
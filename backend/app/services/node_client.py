@@ -2,41 +2,85 @@
 节点API客户端
 用于与Model Inference Client API进行通信
 """
+import time
 import httpx
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, AsyncIterator, NamedTuple
 from ..schemas.node import GPUInfo, ModelInstanceInfo
+from ..config import settings
+from . import metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
+def create_shared_http_client() -> httpx.AsyncClient:
+    """创建所有节点共享的HTTP客户端（单一连接池）"""
+    limits = httpx.Limits(
+        max_connections=settings.NODE_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.NODE_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.NODE_HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(timeout=settings.NODE_HTTP_TIMEOUT, limits=limits)
+
 class NodeAPIClient:
     """节点API客户端"""
     
-    def __init__(self, node_ip: str, node_port: int = 6004, timeout: float = 30.0):
+    def __init__(
+        self,
+        node_ip: str,
+        node_port: int = 6004,
+        timeout: Optional[float] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_connections: Optional[int] = None,
+    ):
         self.node_ip = node_ip
         self.node_port = node_port
         self.base_url = f"http://{node_ip}:{node_port}"
-        self.timeout = timeout
-        self._client = None
+        self.timeout = timeout if timeout is not None else settings.NODE_HTTP_TIMEOUT
+        # 传入的共享客户端由 NodeManager 负责关闭，这里只关闭自己创建的客户端
+        self._client = http_client
+        self._owns_client = http_client is None
+        # 限制单个节点的并发连接数，避免某个节点占满全局连接池
+        self._limiter = asyncio.Semaphore(max_connections or settings.NODE_HTTP_MAX_CONNECTIONS_PER_HOST)
     
     async def _get_client(self) -> httpx.AsyncClient:
         """获取HTTP客户端"""
         if self._client is None:
             self._client = httpx.AsyncClient(timeout=self.timeout)
+            self._owns_client = True
         return self._client
     
+    async def _request(self, method: str, path: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+        """在单节点连接数限制内发送请求；endpoint 为指标中使用的路径模板，默认为 path"""
+        client = await self._get_client()
+        async with self._limiter:
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                response = await client.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+                outcome = "ok" if response.status_code < 400 else "http_error"
+                return response
+            except httpx.TimeoutException:
+                outcome = "timeout"
+                raise
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            finally:
+                metrics.observe_node_request(
+                    f"{self.node_ip}:{self.node_port}", method, endpoint or path, outcome, time.perf_counter() - started
+                )
+    
     async def close(self):
         """关闭客户端连接"""
-        if self._client:
+        if self._client and self._owns_client:
             await self._client.aclose()
-            self._client = None
+        self._client = None
     
     async def health_check(self) -> bool:
         """节点健康检查"""
         try:
-            client = await self._get_client()
-            response = await client.get(f"{self.base_url}/")
+            response = await self._request("GET", "/")
             return response.status_code == 200
         except Exception as e:
             logger.error(f"节点 {self.node_ip}:{self.node_port} 健康检查失败: {e}")
@@ -45,8 +89,7 @@ class NodeAPIClient:
     async def get_gpu_status(self) -> List[Dict[str, Any]]:
         """获取GPU状态信息"""
         try:
-            client = await self._get_client()
-            response = await client.get(f"{self.base_url}/api/v1/gpus")
+            response = await self._request("GET", "/api/v1/gpus")
             response.raise_for_status()
             return response.json()
         except (httpx.HTTPStatusError, httpx.RequestError) as e:
@@ -60,8 +103,7 @@ class NodeAPIClient:
     async def get_model_status(self) -> List[Dict[str, Any]]:
         """获取所有运行中模型的状态"""
         try:
-            client = await self._get_client()
-            response = await client.get(f"{self.base_url}/api/v1/models/status")
+            response = await self._request("GET", "/api/v1/models/status")
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -71,8 +113,7 @@ class NodeAPIClient:
     async def get_model_status_by_name(self, model_name: str) -> List[Dict[str, Any]]:
         """获取指定模型的状态"""
         try:
-            client = await self._get_client()
-            response = await client.get(f"{self.base_url}/api/v1/models/status/{model_name}")
+            response = await self._request("GET", f"/api/v1/models/status/{model_name}", endpoint="/api/v1/models/status/{model_name}")
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -82,16 +123,12 @@ class NodeAPIClient:
     async def start_model(self, model_name: str, gpu_id: int, config: Optional[Dict] = None) -> Dict[str, Any]:
         """在指定GPU上启动模型"""
         try:
-            client = await self._get_client()
             payload = {
                 "model_name": model_name,
                 "gpu_id": gpu_id,
                 "config": config or {}
             }
-            response = await client.post(
-                f"{self.base_url}/api/v1/models/start",
-                json=payload
-            )
+            response = await self._request("POST", "/api/v1/models/start", json=payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -101,15 +138,11 @@ class NodeAPIClient:
     async def stop_model(self, model_name: str, gpu_id: int) -> Dict[str, Any]:
         """在指定GPU上停止模型"""
         try:
-            client = await self._get_client()
             payload = {
                 "model_name": model_name,
                 "gpu_id": gpu_id
             }
-            response = await client.post(
-                f"{self.base_url}/api/v1/models/stop",
-                json=payload
-            )
+            response = await self._request("POST", "/api/v1/models/stop", json=payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -119,8 +152,7 @@ class NodeAPIClient:
     async def kill_process(self, pid: int) -> Dict[str, Any]:
         """通过PID终止进程"""
         try:
-            client = await self._get_client()
-            response = await client.delete(f"{self.base_url}/api/v1/processes/{pid}")
+            response = await self._request("DELETE", f"/api/v1/processes/{pid}", endpoint="/api/v1/processes/{pid}")
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -130,125 +162,168 @@ class NodeAPIClient:
     async def get_supported_models(self) -> Dict[str, str]:
         """获取节点支持的模型列表"""
         try:
-            client = await self._get_client()
-            response = await client.get(f"{self.base_url}/api/v1/models/supported")
+            response = await self._request("GET", "/api/v1/models/supported")
             response.raise_for_status()
             return response.json()
         except Exception as e:
             logger.error(f"获取节点 {self.node_ip}:{self.node_port} 支持的模型列表失败: {e}")
             raise
 
+class NodeStatusResult(NamedTuple):
+    """单个节点的状态获取结果"""
+    node_key: str
+    model_status: List[Dict[str, Any]]
+    gpu_status: List[Dict[str, Any]]
+    error: Optional[str] = None  # 模型状态获取失败（节点不可达）时的错误信息
+
 class NodeManager:
     """节点管理器"""
     
     def __init__(self):
         self._clients: Dict[str, NodeAPIClient] = {}
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._fanout_semaphore: Optional[asyncio.Semaphore] = None
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """获取共享的HTTP客户端，所有节点复用同一个连接池"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = create_shared_http_client()
+        return self._http_client
     
     def get_client(self, node_ip: str, node_port: int = 6004) -> NodeAPIClient:
         """获取节点客户端"""
         key = f"{node_ip}:{node_port}"
-        if key not in self._clients:
-            self._clients[key] = NodeAPIClient(node_ip, node_port)
-        return self._clients[key]
+        client = self._clients.get(key)
+        if client is None or client._client is not self._get_http_client():
+            client = NodeAPIClient(node_ip, node_port, http_client=self._get_http_client())
+            self._clients[key] = client
+        return client
+    
+    def remove_client(self, node_ip: str, node_port: int = 6004):
+        """移除节点客户端（节点被删除或地址变更时调用）"""
+        self._clients.pop(f"{node_ip}:{node_port}", None)
     
     async def close_all(self):
         """关闭所有客户端连接"""
-        for client in self._clients.values():
-            await client.close()
         self._clients.clear()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
     
-    async def batch_health_check(self, nodes: List[Dict[str, Any]]) -> Dict[str, bool]:
-        """批量健康检查"""
-        tasks = []
+    def _get_fanout_semaphore(self) -> asyncio.Semaphore:
+        """获取全局并发信号量，限制同时向节点发出的请求数"""
+        if self._fanout_semaphore is None:
+            self._fanout_semaphore = asyncio.Semaphore(settings.NODE_FANOUT_CONCURRENCY)
+        return self._fanout_semaphore
+    
+    async def _call_with_deadline(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        deadline: Optional[float] = None,
+        node_key: Optional[str] = None,
+    ) -> Any:
+        """在全局并发限制内执行单次节点调用，超过截止时间则抛出 asyncio.TimeoutError"""
+        async with self._get_fanout_semaphore():
+            try:
+                return await asyncio.wait_for(call(), timeout=deadline or settings.NODE_CALL_DEADLINE)
+            except asyncio.TimeoutError:
+                if node_key is not None:
+                    metrics.record_node_deadline_exceeded(node_key)
+                raise
+    
+    async def _fan_out(
+        self,
+        nodes: List[Dict[str, Any]],
+        call: Callable[[NodeAPIClient], Awaitable[Any]],
+        default: Any,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """对所有节点并发执行同一调用，失败或超时的节点返回默认值"""
         node_keys = []
-        
+        tasks = []
         for node in nodes:
             node_ip = node["node_ip"]
             node_port = node.get("node_port", 6004)
             client = self.get_client(node_ip, node_port)
-            tasks.append(client.health_check())
             node_keys.append(f"{node_ip}:{node_port}")
+            tasks.append(self._call_with_deadline(lambda c=client: call(c), deadline, node_keys[-1]))
         
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        health_status = {}
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                health_status[node_keys[i]] = False
-            else:
-                health_status[node_keys[i]] = result
-        
-        return health_status
+        return {
+            key: default if isinstance(result, BaseException) else result
+            for key, result in zip(node_keys, results)
+        }
+    
+    async def batch_health_check(self, nodes: List[Dict[str, Any]]) -> Dict[str, bool]:
+        """批量健康检查"""
+        return await self._fan_out(nodes, lambda client: client.health_check(), False)
     
     async def batch_get_gpu_status(self, nodes: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """批量获取GPU状态"""
-        tasks = []
-        node_keys = []
-        
-        for node in nodes:
-            node_ip = node["node_ip"]
-            node_port = node.get("node_port", 6004)
-            client = self.get_client(node_ip, node_port)
-            tasks.append(client.get_gpu_status())
-            node_keys.append(f"{node_ip}:{node_port}")
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        gpu_status = {}
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                gpu_status[node_keys[i]] = []
-            else:
-                gpu_status[node_keys[i]] = result
-        
-        return gpu_status
+        return await self._fan_out(nodes, lambda client: client.get_gpu_status(), [])
     
     async def batch_get_model_status(self, nodes: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """批量获取模型状态"""
-        tasks = []
-        node_keys = []
-        
-        for node in nodes:
-            node_ip = node["node_ip"]
-            node_port = node.get("node_port", 6004)
-            client = self.get_client(node_ip, node_port)
-            tasks.append(client.get_model_status())
-            node_keys.append(f"{node_ip}:{node_port}")
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return await self._fan_out(nodes, lambda client: client.get_model_status(), [])
+
+    async def _get_node_status(self, node_key: str, client: NodeAPIClient, deadline: Optional[float]) -> NodeStatusResult:
+        """同时获取单个节点的模型状态和GPU状态"""
+        model_result, gpu_result = await asyncio.gather(
+            self._call_with_deadline(client.get_model_status, deadline, node_key),
+            self._call_with_deadline(client.get_gpu_status, deadline, node_key),
+            return_exceptions=True,
+        )
         
-        model_status = {}
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                model_status[node_keys[i]] = []
-            else:
-                model_status[node_keys[i]] = result
+        error = None
+        if isinstance(model_result, BaseException):
+            if isinstance(model_result, asyncio.TimeoutError):
+                logger.warning(f"获取节点 {node_key} 模型状态超时")
+            error = str(model_result) or type(model_result).__name__
+            model_result = []
+        if isinstance(gpu_result, BaseException):
+            if isinstance(gpu_result, asyncio.TimeoutError):
+                logger.warning(f"获取节点 {node_key} GPU状态超时")
+            gpu_result = []
         
-        return model_status
-
-    async def batch_get_status(self, nodes: List[Dict[str, Any]]) -> (Dict[str, list], Dict[str, list]):
-        """批量获取模型和GPU状态"""
-        model_tasks = []
-        gpu_tasks = []
-        node_keys = []
+        return NodeStatusResult(node_key, model_result, gpu_result, error)
 
+    async def iter_status(
+        self,
+        nodes: List[Dict[str, Any]],
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[NodeStatusResult]:
+        """并发获取所有节点的模型和GPU状态，按完成顺序逐个返回"""
+        tasks = []
         for node in nodes:
             node_ip = node["node_ip"]
             node_port = node.get("node_port", 6004)
             client = self.get_client(node_ip, node_port)
-            model_tasks.append(client.get_model_status())
-            gpu_tasks.append(client.get_gpu_status())
-            node_keys.append(f"{node_ip}:{node_port}")
-
-        model_results = await asyncio.gather(*model_tasks, return_exceptions=True)
-        gpu_results = await asyncio.gather(*gpu_tasks, return_exceptions=True)
+            tasks.append(asyncio.ensure_future(
+                self._get_node_status(f"{node_ip}:{node_port}", client, deadline)
+            ))
+        
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 调用方提前退出时取消尚未完成的请求
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
 
+    async def batch_get_status(
+        self,
+        nodes: List[Dict[str, Any]],
+        deadline: Optional[float] = None,
+    ) -> Tuple[Dict[str, list], Dict[str, list]]:
+        """批量获取模型和GPU状态"""
         model_status_map = {}
         gpu_status_map = {}
 
-        for i, key in enumerate(node_keys):
-            model_status_map[key] = model_results[i] if not isinstance(model_results[i], Exception) else []
-            gpu_status_map[key] = gpu_results[i] if not isinstance(gpu_results[i], Exception) else []
+        async for result in self.iter_status(nodes, deadline):
+            model_status_map[result.node_key] = result.model_status
+            gpu_status_map[result.node_key] = result.gpu_status
             
         return model_status_map, gpu_status_map
 
@@ -0,0 +1,247 @@
+"""
+队列长度预测
+在10分钟聚合数据上为每个模型增量拟合 Holt-Winters 加法模型（水平 + 阻尼趋势 + 按日季节性），
+每个新的完整时间桶只做一次 O(1) 更新，状态保存在 queue_forecasts 表中。
+同时累计提前 QUEUE_FORECAST_EVAL_STEPS 个时间桶的预测误差，并与“沿用预测时的实际值”的朴素预测对比，
+评估预测在扩容所需的提前量上是否可信。
+"""
+import json
+import math
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.queue_forecast import QueueForecast
+from ..models.queue_length_rollup import QueueLengthRollup
+from .queue_rollup import EPOCH, bucket_start
+
+logger = logging.getLogger(__name__)
+
+# 使用10分钟聚合数据拟合，一天为一个季节周期
+FORECAST_RESOLUTION = 600
+SEASON_LENGTH = 86400 // FORECAST_RESOLUTION
+
+class ForecastAccuracy(NamedTuple):
+    """提前 horizon_seconds 的预测误差统计"""
+    horizon_seconds: int
+    samples: int
+    mae: Optional[float]
+    rmse: Optional[float]
+    naive_mae: Optional[float]  # 沿用预测时的实际值作为预测的平均绝对误差
+    skill: Optional[float]  # 1 - mae / naive_mae，大于0表示优于朴素预测
+
+class ForecastPoint(NamedTuple):
+    timestamp: datetime
+    length: float
+
+class QueueForecastResult(NamedTuple):
+    """单个模型的预测结果"""
+    model_id: int
+    last_bucket: Optional[datetime]
+    points: List[ForecastPoint]
+    peak_length: float  # 预测区间内的最大队列长度
+    accuracy: ForecastAccuracy
+
+def season_index(ts: datetime) -> int:
+    """时间桶在一天中的位置"""
+    return int((ts - EPOCH).total_seconds()) // FORECAST_RESOLUTION % SEASON_LENGTH
+
+def new_forecast_state(model_id: int) -> QueueForecast:
+    return QueueForecast(
+        model_id=model_id,
+        level=0.0,
+        trend=0.0,
+        # 第一个季节周期内未观测到的时间桶为 None
+        seasonal=json.dumps([None] * SEASON_LENGTH),
+        sample_count=0,
+        error_count=0,
+        error_weight=0.0,
+        abs_error_sum=0.0,
+        sq_error_sum=0.0,
+        naive_abs_error_sum=0.0,
+    )
+
+def init_seasonal(state: QueueForecast, seasonal: List[Optional[float]]):
+    """
+    第一个季节周期结束时初始化：水平分量为观测到的时间桶的均值，季节分量为各时间桶相对均值的偏差，
+    缺失的时间桶季节分量为 0（没有数据时不假设日内波动）
+    """
+    observed = [v for v in seasonal if v is not None]
+    mean = sum(observed) / len(observed) if observed else 0.0
+    state.level = mean
+    state.trend = 0.0
+    seasonal[:] = [v - mean if v is not None else 0.0 for v in seasonal]
+
+def fit_bucket(state: QueueForecast, seasonal: List[float], pending: List[list], ts: datetime, value: float):
+    """
+    用一个完整时间桶的平均队列长度更新预测状态。
+    seasonal 为已解析的季节分量，pending 为已解析的未到期预测，均原地修改
+    """
+    alpha = settings.QUEUE_FORECAST_ALPHA
+    beta = settings.QUEUE_FORECAST_BETA
+    gamma = settings.QUEUE_FORECAST_GAMMA
+    phi = settings.QUEUE_FORECAST_DAMPING
+    index = season_index(ts)
+
+    # 先结算以本时间桶为目标的预测，缺失的时间桶对应的预测直接丢弃
+    target = ts.isoformat()
+    while pending and pending[0][0] <= target:
+        target_bucket, predicted, base_value = pending.pop(0)
+        if target_bucket == target:
+            error = value - predicted
+            decay = settings.QUEUE_FORECAST_ERROR_DECAY
+            state.error_count += 1
+            state.error_weight = state.error_weight * decay + 1
+            state.abs_error_sum = state.abs_error_sum * decay + abs(error)
+            state.sq_error_sum = state.sq_error_sum * decay + error * error
+            state.naive_abs_error_sum = state.naive_abs_error_sum * decay + abs(value - base_value)
+
+    if state.sample_count < SEASON_LENGTH:
+        # 第一个季节周期（从第一个时间桶起的一天，按时间而不是按时间桶数计算，缺失的时间桶也计入）内只收集数据，
+        # 结束时用 init_seasonal 初始化，否则水平分量会追随日内波动，季节分量很难学到
+        elapsed = 1
+        if state.last_bucket is not None:
+            elapsed = round((ts - state.last_bucket.replace(tzinfo=None)).total_seconds() / FORECAST_RESOLUTION)
+        position = state.sample_count + elapsed
+        if position <= SEASON_LENGTH:
+            seasonal[index] = value
+            state.sample_count = position
+            state.last_bucket = ts
+            state.last_value = value
+            if position == SEASON_LENGTH:
+                init_seasonal(state, seasonal)
+            return
+        # 第一个季节周期的最后几个时间桶缺失：先初始化，本时间桶按正常方式拟合
+        state.sample_count = SEASON_LENGTH
+        init_seasonal(state, seasonal)
+
+    previous_level = state.level
+    state.level = alpha * (value - seasonal[index]) + (1 - alpha) * (previous_level + phi * state.trend)
+    state.trend = beta * (state.level - previous_level) + (1 - beta) * phi * state.trend
+    seasonal[index] = gamma * (value - state.level) + (1 - gamma) * seasonal[index]
+
+    state.sample_count += 1
+    state.last_bucket = ts
+    state.last_value = value
+
+    # 记录提前 QUEUE_FORECAST_EVAL_STEPS 个时间桶的预测，到期后评估
+    steps = settings.QUEUE_FORECAST_EVAL_STEPS
+    predicted = forecast_values(state, seasonal, steps)[-1]
+    pending.append([(ts + timedelta(seconds=FORECAST_RESOLUTION * steps)).isoformat(), round(predicted, 4), value])
+
+def forecast_values(state: QueueForecast, seasonal: List[float], steps: int) -> List[float]:
+    """预测最后一个时间桶之后 steps 个时间桶的队列长度"""
+    phi = settings.QUEUE_FORECAST_DAMPING
+    index = season_index(state.last_bucket)
+    values = []
+    damped = 0.0
+    for h in range(1, steps + 1):
+        damped += phi ** h
+        values.append(max(state.level + damped * state.trend + seasonal[(index + h) % SEASON_LENGTH], 0.0))
+    return values
+
+def forecast_accuracy(state: Optional[QueueForecast]) -> ForecastAccuracy:
+    horizon = settings.QUEUE_FORECAST_EVAL_STEPS * FORECAST_RESOLUTION
+    if state is None or not state.error_count:
+        return ForecastAccuracy(horizon_seconds=horizon, samples=0, mae=None, rmse=None, naive_mae=None, skill=None)
+    weight = state.error_weight
+    mae = state.abs_error_sum / weight
+    naive_mae = state.naive_abs_error_sum / weight
+    skill = (1 - mae / naive_mae) if naive_mae > 0 else None
+    return ForecastAccuracy(
+        horizon_seconds=horizon,
+        samples=state.error_count,
+        mae=round(mae, 3),
+        rmse=round(math.sqrt(state.sq_error_sum / weight), 3),
+        naive_mae=round(naive_mae, 3),
+        skill=round(skill, 3) if skill is not None else None,
+    )
+
+def update_queue_forecasts(db: Session, now: Optional[datetime] = None) -> int:
+    """用新完成的10分钟时间桶更新所有模型的预测状态，不提交事务，返回拟合的时间桶数量"""
+    now = now or datetime.utcnow()
+    current_bucket = bucket_start(now, FORECAST_RESOLUTION)
+    states = {s.model_id: s for s in db.query(QueueForecast).all()}
+
+    # 已有状态的模型从最早的 last_bucket 之后取，新模型从 QUEUE_FORECAST_WARMUP_DAYS 前开始回放
+    columns = (
+        QueueLengthRollup.model_id, QueueLengthRollup.bucket_start,
+        QueueLengthRollup.sum_length, QueueLengthRollup.sample_count
+    )
+    warmup_start = current_bucket - timedelta(days=settings.QUEUE_FORECAST_WARMUP_DAYS)
+    base = db.query(*columns).filter(
+        QueueLengthRollup.resolution == FORECAST_RESOLUTION,
+        QueueLengthRollup.bucket_start < current_bucket
+    )
+    rows = []
+    fitted = [s.last_bucket.replace(tzinfo=None) for s in states.values() if s.last_bucket is not None]
+    if fitted:
+        rows += base.filter(
+            QueueLengthRollup.model_id.in_(list(states.keys())),
+            QueueLengthRollup.bucket_start > max(min(fitted), warmup_start)
+        ).all()
+    new_models = base.filter(QueueLengthRollup.bucket_start >= warmup_start)
+    if states:
+        new_models = new_models.filter(QueueLengthRollup.model_id.notin_(list(states.keys())))
+    rows += new_models.all()
+    rows.sort(key=lambda row: (row.model_id, row.bucket_start))
+
+    fitted_count = 0
+    seasonals: Dict[int, List[float]] = {}
+    pendings: Dict[int, List[list]] = {}
+    for model_id, ts, sum_length, sample_count in rows:
+        ts = ts.replace(tzinfo=None)
+        state = states.get(model_id)
+        if state is None:
+            state = states[model_id] = new_forecast_state(model_id)
+            db.add(state)
+        if state.last_bucket is not None and ts <= state.last_bucket.replace(tzinfo=None):
+            continue
+        seasonal = seasonals.get(model_id)
+        if seasonal is None:
+            seasonal = seasonals[model_id] = json.loads(state.seasonal)
+            pendings[model_id] = json.loads(state.pending_forecasts or "[]")
+        fit_bucket(state, seasonal, pendings[model_id], ts, sum_length / sample_count if sample_count else 0.0)
+        fitted_count += 1
+
+    for model_id, seasonal in seasonals.items():
+        states[model_id].seasonal = json.dumps([round(v, 4) if v is not None else None for v in seasonal])
+        states[model_id].pending_forecasts = json.dumps(pendings[model_id])
+    return fitted_count
+
+def get_queue_forecasts(
+    db: Session,
+    horizon_seconds: int,
+    model_ids: Optional[List[int]] = None,
+) -> Dict[int, QueueForecastResult]:
+    """读取各模型从最后一个已拟合时间桶起 horizon_seconds 内的预测，返回 {model_id: QueueForecastResult}"""
+    # 第一个季节周期结束前尚未初始化，不提供预测
+    query = db.query(QueueForecast).filter(QueueForecast.sample_count >= SEASON_LENGTH)
+    if model_ids is not None:
+        query = query.filter(QueueForecast.model_id.in_(model_ids))
+
+    return {
+        state.model_id: build_forecast_result(state, json.loads(state.seasonal), horizon_seconds)
+        for state in query.all()
+    }
+
+def build_forecast_result(state: QueueForecast, seasonal: List[float], horizon_seconds: int) -> QueueForecastResult:
+    """由已初始化的预测状态生成从最后一个时间桶起 horizon_seconds 内的预测"""
+    # 最后一个时间桶之后还要跨过当前未完成的时间桶
+    steps = max(math.ceil(horizon_seconds / FORECAST_RESOLUTION), 0) + 1
+    last_bucket = state.last_bucket.replace(tzinfo=None)
+    values = forecast_values(state, seasonal, steps)
+    points = [
+        ForecastPoint(last_bucket + timedelta(seconds=FORECAST_RESOLUTION * (h + 1)), round(v, 3))
+        for h, v in enumerate(values)
+    ]
+    return QueueForecastResult(
+        model_id=state.model_id,
+        last_bucket=last_bucket,
+        points=points,
+        peak_length=max(values) if values else 0.0,
+        accuracy=forecast_accuracy(state),
+    )
@@ -0,0 +1,93 @@
+"""
+queue_length_records 按天分区（仅 PostgreSQL）
+父表按 timestamp 范围分区，每天一个子表 queue_length_records_pYYYYMMDD，另有一个默认分区接收没有对应分区的记录
+（如导入的更早的历史数据）。旧版本在 PostgreSQL 上建立的普通表由迁移 0003 转换为分区表。
+队列采集任务每轮写入前确保当天及之后几天的分区存在；
+按 QUEUE_HISTORY_TTL_SECONDS 清理时整表删除已过期的分区，代替逐行 DELETE。
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..models.queue_length_record import QueueLengthRecord
+
+logger = logging.getLogger(__name__)
+
+TABLE = QueueLengthRecord.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_PREFIX = f"{TABLE}_p"
+
+def is_partitioned(db) -> bool:
+    """
+    queue_length_records 是否为分区表。按 pg_class.relkind 判断而不是按数据库类型：
+    PostgreSQL 上旧版本建立的普通表在迁移 0003 转换之前仍按普通表处理（逐行清理，不建分区）
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE relname = :table AND pg_table_is_visible(oid)"
+    ), {"table": TABLE}).scalar())
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+def list_partitions(db) -> List[Tuple[str, date]]:
+    """已有的按天分区 [(表名, 日期)]，按日期排序，不含默认分区"""
+    names = db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": TABLE}).scalars()
+    partitions = []
+    for name in names:
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        try:
+            partitions.append((name, datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()))
+        except ValueError:
+            continue
+    return sorted(partitions, key=lambda p: p[1])
+
+def create_partitions(db, first_day: date, days: int) -> int:
+    """创建默认分区以及 first_day 起 days 天的按天分区（已存在的跳过），不提交事务，返回新建的按天分区数"""
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    existing = {day for _, day in list_partitions(db)}
+    created = 0
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        if day in existing:
+            continue
+        # 会话时区为UTC，分区边界即UTC零点
+        db.execute(text(
+            f"CREATE TABLE {partition_name(day)} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        ))
+        created += 1
+    return created
+
+def ensure_queue_history_partitions(db, now: datetime) -> int:
+    """确保当天及之后 QUEUE_HISTORY_PARTITION_PREMAKE_DAYS - 1 天的分区存在，不提交事务"""
+    created = create_partitions(db, now.date(), max(settings.QUEUE_HISTORY_PARTITION_PREMAKE_DAYS, 1))
+    if created:
+        logger.info(f"创建了 {created} 个队列历史分区")
+    return created
+
+def drop_expired_queue_history_partitions(db, cutoff: datetime) -> int:
+    """
+    删除整天都早于 cutoff 的分区，并逐行清理默认分区中早于 cutoff 的记录，不提交事务，返回默认分区中删除的记录数。
+    分区按天删除，最多会比 cutoff 多保留一天的数据。
+    """
+    dropped = []
+    for name, day in list_partitions(db):
+        if datetime.combine(day + timedelta(days=1), time.min) > cutoff:
+            break
+        db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    if dropped:
+        logger.info(f"删除了 {len(dropped)} 个过期的队列历史分区: {', '.join(dropped)}")
+    result = db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp < :cutoff"), {"cutoff": cutoff})
+    return result.rowcount or 0
@@ -0,0 +1,218 @@
+"""
+队列长度历史降采样
+将原始队列长度记录增量聚合为 1分钟 / 10分钟 / 1小时 三个精度，各精度独立保留，
+查询时自动选择能覆盖时间范围且点数最少的精度
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, NamedTuple, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.queue_length_record import QueueLengthRecord
+from ..models.queue_length_rollup import QueueLengthRollup
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# 原始记录的采集间隔（秒），与 record_queue_lengths 的执行间隔一致
+RAW_SAMPLE_INTERVAL = 60
+
+class RollupTier(NamedTuple):
+    """降采样精度"""
+    name: str
+    resolution: int  # 时间桶长度（秒），原始记录为 0
+    retention_setting: Optional[str]  # 保留天数对应的配置项
+
+    @property
+    def retention(self) -> Optional[timedelta]:
+        if self.retention_setting is None:
+            return None
+        return timedelta(days=getattr(settings, self.retention_setting))
+
+RAW_TIER = RollupTier("raw", 0, None)
+ROLLUP_TIERS = [
+    RollupTier("1m", 60, "QUEUE_ROLLUP_1M_RETENTION_DAYS"),
+    RollupTier("10m", 600, "QUEUE_ROLLUP_10M_RETENTION_DAYS"),
+    RollupTier("1h", 3600, "QUEUE_ROLLUP_1H_RETENTION_DAYS"),
+]
+TIERS_BY_NAME = {tier.name: tier for tier in [RAW_TIER, *ROLLUP_TIERS]}
+
+class QueueHistoryPoint(NamedTuple):
+    """历史查询结果中的一个点"""
+    model_id: int
+    timestamp: datetime
+    length: float  # 原始记录为队列长度，聚合数据为时间桶内平均值
+    min_length: int
+    max_length: int
+    avg_length: float
+    last_length: int
+    sample_count: int
+    id: Optional[int] = None
+
+def bucket_start(ts: datetime, resolution: int) -> datetime:
+    """计算时间戳所在时间桶的起始时间"""
+    offset = int((ts - EPOCH).total_seconds()) // resolution * resolution
+    return EPOCH + timedelta(seconds=offset)
+
+def rollup_queue_samples(db: Session, lengths: Dict[int, int], now: datetime) -> int:
+    """将本轮采集到的队列长度合并到各精度的当前时间桶，不提交事务"""
+    if not lengths:
+        return 0
+
+    model_ids = list(lengths.keys())
+    inserts = []
+    updates = []
+    for tier in ROLLUP_TIERS:
+        start = bucket_start(now, tier.resolution)
+        existing = {
+            row.model_id: row
+            for row in db.query(
+                QueueLengthRollup.id, QueueLengthRollup.model_id, QueueLengthRollup.min_length,
+                QueueLengthRollup.max_length, QueueLengthRollup.sum_length, QueueLengthRollup.sample_count
+            ).filter(
+                QueueLengthRollup.resolution == tier.resolution,
+                QueueLengthRollup.bucket_start == start,
+                QueueLengthRollup.model_id.in_(model_ids)
+            ).all()
+        }
+        for model_id, length in lengths.items():
+            row = existing.get(model_id)
+            if row is None:
+                inserts.append({
+                    "model_id": model_id,
+                    "resolution": tier.resolution,
+                    "bucket_start": start,
+                    "min_length": length,
+                    "max_length": length,
+                    "sum_length": length,
+                    "last_length": length,
+                    "sample_count": 1,
+                })
+            else:
+                updates.append({
+                    "id": row.id,
+                    "min_length": min(row.min_length, length),
+                    "max_length": max(row.max_length, length),
+                    "sum_length": row.sum_length + length,
+                    "last_length": length,
+                    "sample_count": row.sample_count + 1,
+                })
+
+    if inserts:
+        db.bulk_insert_mappings(QueueLengthRollup, inserts)
+    if updates:
+        db.bulk_update_mappings(QueueLengthRollup, updates)
+    return len(inserts) + len(updates)
+
+def prune_queue_rollups(db: Session, now: datetime) -> int:
+    """按各精度的保留时长清理过期的聚合数据，不提交事务"""
+    deleted = 0
+    for tier in ROLLUP_TIERS:
+        result = db.execute(
+            delete(QueueLengthRollup).where(
+                QueueLengthRollup.resolution == tier.resolution,
+                QueueLengthRollup.bucket_start < now - tier.retention
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        deleted += result.rowcount or 0
+    return deleted
+
+def select_history_tier(
+    db: Session,
+    model_id: int,
+    start: datetime,
+    end: datetime,
+    now: datetime,
+    resolution: Optional[str] = None,
+) -> RollupTier:
+    """
+    选择查询使用的精度：指定了 resolution 则直接使用；
+    否则选择能覆盖起始时间、且点数不超过 QUEUE_HISTORY_MAX_POINTS 的最细精度。
+    """
+    if resolution is not None:
+        return TIERS_BY_NAME[resolution]
+
+    desired = (end - start).total_seconds() / max(settings.QUEUE_HISTORY_MAX_POINTS, 1)
+
+    if desired <= RAW_SAMPLE_INTERVAL:
+        earliest_raw = db.query(func.min(QueueLengthRecord.timestamp)).filter(
+            QueueLengthRecord.model_id == model_id
+        ).scalar()
+        if earliest_raw is not None and earliest_raw.replace(tzinfo=None) <= start:
+            return RAW_TIER
+
+    for tier in ROLLUP_TIERS:
+        if tier.resolution >= desired and start >= now - tier.retention:
+            return tier
+    return ROLLUP_TIERS[-1]
+
+def query_queue_history(
+    db: Session,
+    model_id: int,
+    start: datetime,
+    end: datetime,
+    limit: int,
+    resolution: Optional[str] = None,
+) -> Tuple[RollupTier, List[QueueHistoryPoint]]:
+    """查询 [start, end] 内的队列历史，按时间倒序返回最多 limit 个点"""
+    tier = select_history_tier(db, model_id, start, end, datetime.utcnow(), resolution)
+
+    if tier is RAW_TIER:
+        records = (
+            db.query(QueueLengthRecord)
+            .filter(
+                QueueLengthRecord.model_id == model_id,
+                QueueLengthRecord.timestamp >= start,
+                QueueLengthRecord.timestamp <= end
+            )
+            .order_by(QueueLengthRecord.timestamp.desc())
+            .limit(limit)
+            .all()
+        )
+        return tier, [raw_history_point(r) for r in records]
+
+    rollups = (
+        db.query(QueueLengthRollup)
+        .filter(
+            QueueLengthRollup.model_id == model_id,
+            QueueLengthRollup.resolution == tier.resolution,
+            QueueLengthRollup.bucket_start >= bucket_start(start, tier.resolution),
+            QueueLengthRollup.bucket_start <= end
+        )
+        .order_by(QueueLengthRollup.bucket_start.desc())
+        .limit(limit)
+        .all()
+    )
+    points = [
+        QueueHistoryPoint(
+            model_id=r.model_id,
+            timestamp=r.bucket_start,
+            length=round(r.avg_length, 3),
+            min_length=r.min_length,
+            max_length=r.max_length,
+            avg_length=round(r.avg_length, 3),
+            last_length=r.last_length,
+            sample_count=r.sample_count,
+        )
+        for r in rollups
+    ]
+    return tier, points
+
+def raw_history_point(record: QueueLengthRecord) -> QueueHistoryPoint:
+    """将原始记录转换为历史点"""
+    return QueueHistoryPoint(
+        model_id=record.model_id,
+        timestamp=record.timestamp,
+        length=record.length,
+        min_length=record.length,
+        max_length=record.length,
+        avg_length=record.length,
+        last_length=record.length,
+        sample_count=1,
+        id=record.id,
+    )
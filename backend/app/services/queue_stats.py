@@ -0,0 +1,79 @@
+"""
+队列长度窗口统计
+用一条聚合查询计算各模型在时间窗口内的队列长度统计，依赖 (model_id, timestamp) 索引
+"""
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, NamedTuple
+
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from ..models.queue_length_record import QueueLengthRecord
+
+logger = logging.getLogger(__name__)
+
+class QueueWindowStats(NamedTuple):
+    """单个模型在时间窗口内的队列统计"""
+    model_id: int
+    sample_count: int
+    avg_length: float
+    max_length: int
+    recent_avg_length: float  # 最近 recent_seconds 内的平均队列长度
+    trend: float  # 窗口后半段平均值减去前半段平均值，正数表示队列在增长
+    # 最近 recent_seconds 内的平均消息速率（条/秒）与消费者数量，RabbitMQ未提供时为 None
+    publish_rate: Optional[float] = None
+    deliver_rate: Optional[float] = None
+    consumers: Optional[float] = None
+
+def get_queue_window_stats(
+    db: Session,
+    window_seconds: int,
+    recent_seconds: Optional[int] = None,
+    model_ids: Optional[List[int]] = None,
+    now: Optional[datetime] = None,
+) -> Dict[int, QueueWindowStats]:
+    """统计各模型在 [now - window_seconds, now] 内的队列长度，返回 {model_id: QueueWindowStats}"""
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    window_start = now - timedelta(seconds=window_seconds)
+    midpoint = now - timedelta(seconds=window_seconds / 2)
+    recent_start = now - timedelta(seconds=recent_seconds or window_seconds)
+
+    ts = QueueLengthRecord.timestamp
+    length = QueueLengthRecord.length
+    query = db.query(
+        QueueLengthRecord.model_id,
+        func.count(QueueLengthRecord.id),
+        func.avg(length),
+        func.max(length),
+        func.avg(case((ts >= recent_start, length))),
+        func.avg(case((ts >= midpoint, length))),
+        func.avg(case((ts < midpoint, length))),
+        func.avg(case((ts >= recent_start, QueueLengthRecord.publish_rate))),
+        func.avg(case((ts >= recent_start, QueueLengthRecord.deliver_rate))),
+        func.avg(case((ts >= recent_start, QueueLengthRecord.consumers))),
+    ).filter(ts >= window_start, ts <= now)
+    if model_ids is not None:
+        query = query.filter(QueueLengthRecord.model_id.in_(model_ids))
+    rows = query.group_by(QueueLengthRecord.model_id).all()
+
+    stats = {}
+    for model_id, count, avg_len, max_len, recent_avg, late_avg, early_avg, publish, deliver, consumers in rows:
+        trend = (late_avg - early_avg) if late_avg is not None and early_avg is not None else 0.0
+        stats[model_id] = QueueWindowStats(
+            model_id=model_id,
+            sample_count=count,
+            avg_length=float(avg_len or 0),
+            max_length=max_len or 0,
+            recent_avg_length=float(recent_avg or 0),
+            trend=float(trend),
+            publish_rate=float(publish) if publish is not None else None,
+            deliver_rate=float(deliver) if deliver is not None else None,
+            consumers=float(consumers) if consumers is not None else None,
+        )
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"队列窗口统计完成: 窗口 {window_seconds}s, {len(stats)} 个模型, 耗时 {elapsed_ms:.1f}ms")
+    return stats
@@ -0,0 +1,56 @@
+"""
+调度操作历史
+记录每次部署计划的执行结果，并按模型查询最近一次操作时间，用于冷却期判断
+"""
+import logging
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from ..models.scheduling_action import SchedulingAction
+
+logger = logging.getLogger(__name__)
+
+def save_execution_report(db: Session, strategy: str, report) -> int:
+    """批量写入执行报告中的所有操作并提交，返回写入条数"""
+    if not report.results:
+        return 0
+    now = datetime.utcnow()
+    db.execute(
+        insert(SchedulingAction),
+        [
+            {
+                "strategy": strategy,
+                "action": r.action.action,
+                "model_name": r.action.model_name,
+                "old_model_name": r.action.old_model_name,
+                "node_id": r.action.node_id,
+                "gpu_id": r.action.gpu_id,
+                "success": r.success,
+                "error": r.error,
+                "reason": r.action.reason,
+                "created_at": now,
+            }
+            for r in report.results
+        ]
+    )
+    db.commit()
+    return len(report.results)
+
+def get_last_action_times(db: Session, since: datetime) -> Dict[str, datetime]:
+    """查询 since 之后每个模型最近一次成功操作的时间（被替换的旧模型同样计入），返回 {model_name: 时间}"""
+    last_times: Dict[str, datetime] = {}
+    for column in (SchedulingAction.model_name, SchedulingAction.old_model_name):
+        rows = (
+            db.query(column, func.max(SchedulingAction.created_at))
+            .filter(SchedulingAction.success == True, SchedulingAction.created_at >= since, column.isnot(None))
+            .group_by(column)
+            .all()
+        )
+        for model_name, ts in rows:
+            ts = ts.replace(tzinfo=None)
+            if model_name not in last_times or ts > last_times[model_name]:
+                last_times[model_name] = ts
+    return last_times
@@ -0,0 +1,15 @@
+"""
+调度策略离线仿真
+用仿真的节点/GPU和队列到达过程驱动真实的策略代码，在上线前比较不同策略和参数的排队等待时间、GPU利用率和部署操作次数
+"""
+from .scenario import ArrivalPattern, SimModelSpec, SimNodeSpec, SimulationScenario, ReplayArrivals, export_queue_records
+from .cluster import SimulatedCluster, SimulatedNodeManager, SimulatedNodeError, use_node_manager
+from .observers import register_observer, get_observer
+from .simulator import ModelReport, SimulationReport, Simulator, run_simulation
+
+__all__ = [
+    "ArrivalPattern", "SimModelSpec", "SimNodeSpec", "SimulationScenario", "ReplayArrivals", "export_queue_records",
+    "SimulatedCluster", "SimulatedNodeManager", "SimulatedNodeError", "use_node_manager",
+    "register_observer", "get_observer",
+    "ModelReport", "SimulationReport", "Simulator", "run_simulation",
+]
@@ -0,0 +1,91 @@
+"""
+仿真命令行
+  python -m backend.app.simulation run backend/app/simulation/examples/week.json \
+      --params '{"cooldown_seconds": 300}' --params '{"cooldown_seconds": 1200}'
+  python -m backend.app.simulation export --out records.csv --start 2024-01-01T00:00:00
+"""
+import sys
+import json
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import List
+
+from .scenario import ReplayArrivals, SimulationScenario, export_queue_records
+from .simulator import SimulationReport, run_simulation
+
+def _format(value, digits=1) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+def print_reports(reports: List[SimulationReport]):
+    header = (
+        f"{'#':>2} {'strategy':<20} {'wait p50':>9} {'wait p95':>9} {'wait p99':>9} {'backlog':>8} "
+        f"{'gpu util':>8} {'gpu alloc':>9} {'start':>6} {'stop':>6} {'replace':>7} {'fail':>5} "
+        f"{'plan p95 ms':>11} {'wall s':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for index, r in enumerate(reports):
+        print(
+            f"{index:>2} {r.strategy:<20} {_format(r.wait_p50):>9} {_format(r.wait_p95):>9} {_format(r.wait_p99):>9} "
+            f"{_format(r.backlog):>8} {r.gpu_utilization:>8.1%} {r.gpu_allocation:>9.1%} {r.starts:>6} {r.stops:>6} "
+            f"{r.replaces:>7} {r.failed_actions:>5} {_format(r.decision_ms_p95, 2):>11} {r.wall_seconds:>7.2f}"
+        )
+    for index, r in enumerate(reports):
+        print(f"\n[{index}] {r.strategy} {json.dumps(r.parameters, ensure_ascii=False)}")
+        for m in r.models:
+            print(
+                f"    {m.model_name:<20} arrived {m.arrived:>8} backlog {_format(m.backlog):>8} "
+                f"wait p50/p95 {_format(m.wait_p50)}/{_format(m.wait_p95)}s "
+                f"gpu {m.gpu_seconds / 3600:.1f}h start {m.starts} stop {m.stops}"
+            )
+
+async def run_command(args) -> List[SimulationReport]:
+    scenario = SimulationScenario.load(args.scenario)
+    replay = ReplayArrivals.load(scenario.replay_path) if scenario.replay_path else None
+    parameter_sets = [json.loads(p) for p in args.params] or [{}]
+    reports = []
+    for strategy_name in args.strategy or ["busy_queue_scaling"]:
+        for parameters in parameter_sets:
+            reports.append(await run_simulation(scenario, strategy_name, parameters, replay))
+    return reports
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.app.simulation", description="调度策略离线仿真")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="按场景仿真策略，多个 --strategy/--params 时逐一组合并对比")
+    run_parser.add_argument("scenario", help="场景JSON文件")
+    run_parser.add_argument("--strategy", action="append", help="策略名称，可重复，默认 busy_queue_scaling")
+    run_parser.add_argument("--params", action="append", default=[], help="策略参数JSON，可重复")
+    run_parser.add_argument("--json", help="把仿真结果写入JSON文件")
+    run_parser.add_argument("-v", "--verbose", action="store_true", help="输出策略和执行器的日志")
+
+    export_parser = subparsers.add_parser("export", help="把 queue_length_records 导出为回放用的CSV")
+    export_parser.add_argument("--out", required=True)
+    export_parser.add_argument("--start", type=datetime.fromisoformat)
+    export_parser.add_argument("--end", type=datetime.fromisoformat)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if getattr(args, "verbose", False) else logging.WARNING)
+
+    if args.command == "export":
+        from ..database import SessionLocal
+        db = SessionLocal()
+        try:
+            count = export_queue_records(db, args.out, args.start, args.end)
+        finally:
+            db.close()
+        print(f"导出 {count} 条队列记录到 {args.out}")
+        return 0
+
+    reports = asyncio.run(run_command(args))
+    print_reports(reports)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([r.to_dict() for r in reports], f, ensure_ascii=False, indent=2, default=str)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+仿真集群
+在内存中模拟节点、GPU和模型实例（含冷启动时间），并通过 NodeManager 的子类对外提供与真实节点相同的客户端接口，
+执行器（strategies/executor.py）和节点状态批量获取代码无需修改即可驱动仿真集群
+"""
+import heapq
+import itertools
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..services import node_client
+from ..services.node_client import NodeManager
+
+logger = logging.getLogger(__name__)
+
+class SimulatedNodeError(Exception):
+    """仿真节点拒绝操作（GPU被占用、模型不支持等），对应真实节点返回的HTTP错误"""
+
+@dataclass
+class SimInstance:
+    model_name: str
+    gpu_id: int
+    pid: int
+    started_at: float  # 仿真时间（秒）
+    ready_at: float
+    ready: bool = False
+    stopped: bool = False
+
+class SimulatedNode:
+    def __init__(self, node_key: str, gpu_ids: List[int], models: List[str]):
+        self.node_key = node_key
+        self.gpu_ids = gpu_ids
+        self.models = set(models)
+        self.instances: Dict[int, SimInstance] = {}  # gpu_id -> 实例
+
+class SimulatedCluster:
+    """仿真集群状态，维护各模型的加载中/就绪实例数"""
+
+    def __init__(self, cold_start_seconds: Dict[str, float]):
+        self.now = 0.0
+        self.nodes: Dict[str, SimulatedNode] = {}
+        self.cold_start_seconds = cold_start_seconds
+        self.ready_counts: Dict[str, int] = {name: 0 for name in cold_start_seconds}
+        self.loading_counts: Dict[str, int] = {name: 0 for name in cold_start_seconds}
+        self._pending_ready: List[tuple] = []  # (ready_at, 序号, 实例)
+        self._pids = itertools.count(10000)
+        self._sequence = itertools.count()
+
+    def add_node(self, node_key: str, gpu_ids: List[int], models: List[str]) -> SimulatedNode:
+        node = self.nodes[node_key] = SimulatedNode(node_key, gpu_ids, models)
+        return node
+
+    @property
+    def instance_count(self) -> int:
+        return sum(self.ready_counts.values()) + sum(self.loading_counts.values())
+
+    def start(self, node_key: str, model_name: str, gpu_id: int, ready: bool = False) -> SimInstance:
+        node = self.nodes.get(node_key)
+        if node is None:
+            raise SimulatedNodeError(f"节点 {node_key} 不存在")
+        if gpu_id not in node.gpu_ids:
+            raise SimulatedNodeError(f"节点 {node_key} 没有 GPU {gpu_id}")
+        if model_name not in node.models:
+            raise SimulatedNodeError(f"节点 {node_key} 不支持模型 {model_name}")
+        if gpu_id in node.instances:
+            raise SimulatedNodeError(f"GPU {gpu_id} is already in use by model {node.instances[gpu_id].model_name}.")
+
+        ready_at = self.now if ready else self.now + self.cold_start_seconds[model_name]
+        instance = SimInstance(model_name, gpu_id, next(self._pids), self.now, ready_at)
+        node.instances[gpu_id] = instance
+        self.loading_counts[model_name] += 1
+        heapq.heappush(self._pending_ready, (ready_at, next(self._sequence), instance))
+        if ready:
+            self.advance(self.now)
+        return instance
+
+    def stop(self, node_key: str, model_name: str, gpu_id: int) -> SimInstance:
+        node = self.nodes.get(node_key)
+        instance = node.instances.get(gpu_id) if node else None
+        if instance is None or instance.model_name != model_name:
+            raise SimulatedNodeError(f"No model found running on GPU {gpu_id}.")
+        del node.instances[gpu_id]
+        instance.stopped = True
+        if instance.ready:
+            self.ready_counts[model_name] -= 1
+        else:
+            self.loading_counts[model_name] -= 1
+        return instance
+
+    def advance(self, now: float):
+        """推进仿真时间，冷启动完成的实例变为就绪"""
+        self.now = now
+        while self._pending_ready and self._pending_ready[0][0] <= now:
+            _, _, instance = heapq.heappop(self._pending_ready)
+            if instance.stopped:
+                continue
+            instance.ready = True
+            self.loading_counts[instance.model_name] -= 1
+            self.ready_counts[instance.model_name] += 1
+
+    def model_status(self, node_key: str) -> List[Dict[str, Any]]:
+        """与节点 /api/v1/models/status 返回格式一致"""
+        return [
+            {
+                "model_name": ins.model_name,
+                "gpu_id": ins.gpu_id,
+                "pid": ins.pid,
+                "status": "RUNNING" if ins.ready else "STARTING",
+                "start_time": ins.started_at,
+            }
+            for ins in self.nodes[node_key].instances.values()
+        ]
+
+    def gpu_status(self, node_key: str) -> List[Dict[str, Any]]:
+        """与节点 /api/v1/gpus 返回格式一致"""
+        node = self.nodes[node_key]
+        return [
+            {
+                "gpu_id": gpu_id,
+                "load": 0.0,
+                "memory_used": 16384.0 if gpu_id in node.instances else 0.0,
+                "memory_total": 24576.0,
+            }
+            for gpu_id in node.gpu_ids
+        ]
+
+class SimulatedNodeClient:
+    """与 NodeAPIClient 接口一致的仿真节点客户端"""
+
+    def __init__(self, cluster: SimulatedCluster, node_ip: str, node_port: int):
+        self.node_ip = node_ip
+        self.node_port = node_port
+        self._cluster = cluster
+        self._node_key = f"{node_ip}:{node_port}"
+
+    async def health_check(self) -> bool:
+        return self._node_key in self._cluster.nodes
+
+    async def get_gpu_status(self) -> List[Dict[str, Any]]:
+        return self._cluster.gpu_status(self._node_key)
+
+    async def get_model_status(self) -> List[Dict[str, Any]]:
+        return self._cluster.model_status(self._node_key)
+
+    async def start_model(self, model_name: str, gpu_id: int, config: Optional[Dict] = None) -> Dict[str, Any]:
+        self._cluster.start(self._node_key, model_name, gpu_id)
+        return {"status": "success"}
+
+    async def stop_model(self, model_name: str, gpu_id: int) -> Dict[str, Any]:
+        self._cluster.stop(self._node_key, model_name, gpu_id)
+        return {"status": "success"}
+
+    async def close(self):
+        pass
+
+class SimulatedNodeManager(NodeManager):
+    """返回仿真节点客户端的节点管理器，批量获取状态等逻辑沿用 NodeManager"""
+
+    def __init__(self, cluster: SimulatedCluster):
+        super().__init__()
+        self.cluster = cluster
+
+    def get_client(self, node_ip: str, node_port: int = 6004) -> SimulatedNodeClient:
+        key = f"{node_ip}:{node_port}"
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = SimulatedNodeClient(self.cluster, node_ip, node_port)
+        return client
+
+    async def close_all(self):
+        self._clients.clear()
+
+    async def batch_get_status(self, nodes: List[Dict[str, Any]], deadline: Optional[float] = None):
+        """直接读取仿真集群状态，省去为每个节点创建请求任务的开销（仿真节点不会超时或不可达）"""
+        model_status_map = {}
+        gpu_status_map = {}
+        for node in nodes:
+            key = f"{node['node_ip']}:{node.get('node_port', 6004)}"
+            model_status_map[key] = self.cluster.model_status(key)
+            gpu_status_map[key] = self.cluster.gpu_status(key)
+        return model_status_map, gpu_status_map
+
+@contextmanager
+def use_node_manager(manager: NodeManager):
+    """临时替换全局节点管理器，执行器通过它调用节点"""
+    previous = node_client.node_manager
+    node_client.node_manager = manager
+    try:
+        yield manager
+    finally:
+        node_client.node_manager = previous
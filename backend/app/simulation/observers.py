@@ -0,0 +1,44 @@
+"""
+仿真观测
+各策略的 observe 从数据库和节点采集状态，仿真时改由这里按相同的口径从仿真器采集：
+队列统计来自仿真的队列记录，节点状态仍经由（仿真的）NodeManager 批量获取
+"""
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..strategies.base import BaseStrategy
+from ..strategies.busy_queue_scaling import ClusterObservation
+
+Observer = Callable[[BaseStrategy, Any], Awaitable[Any]]
+
+OBSERVER_REGISTRY: Dict[str, Observer] = {}
+
+def register_observer(strategy_name: str):
+    """注册策略的仿真观测函数（函数装饰器）"""
+    def decorator(func: Observer) -> Observer:
+        OBSERVER_REGISTRY[strategy_name] = func
+        return func
+    return decorator
+
+def get_observer(strategy_name: str) -> Optional[Observer]:
+    return OBSERVER_REGISTRY.get(strategy_name)
+
+@register_observer("busy_queue_scaling")
+async def observe_busy_queue_scaling(strategy, sim) -> ClusterObservation:
+    """与 BusyQueueScalingStrategy.observe 相同的观测"""
+    params = strategy.params
+    now = sim.current_time
+    observation = ClusterObservation(
+        all_models=sim.models,
+        online_nodes=sim.nodes,
+        window_stats=sim.window_stats(params.window_seconds, params.recent_seconds),
+        now=now,
+    )
+    if params.forecast_horizon_seconds > 0:
+        observation.forecasts = sim.forecasts(params.forecast_horizon_seconds)
+    if params.scale_down_enabled:
+        observation.idle_stats = sim.window_stats(params.idle_window_seconds)
+    if params.cooldown_seconds > 0:
+        observation.last_action_times = sim.last_action_times(now - timedelta(seconds=params.cooldown_seconds))
+    observation.model_status_map, observation.gpu_status_map = await sim.manager.batch_get_status(sim.node_dicts)
+    return observation
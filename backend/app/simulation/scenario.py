@@ -0,0 +1,185 @@
+"""
+仿真场景
+描述仿真的节点/GPU、模型（服务耗时、冷启动时间、实例数上下限）以及队列到达过程。
+到达过程可以是合成的（平均速率 + 按日正弦波动 + 周末系数），也可以回放从 queue_length_records 导出的记录
+"""
+import csv
+import json
+import math
+import bisect
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy.orm import Session
+
+from ..models.model import Model
+from ..models.queue_length_record import QueueLengthRecord
+
+logger = logging.getLogger(__name__)
+
+# 导出/回放的队列记录CSV列
+RECORD_COLUMNS = ["model_name", "timestamp", "length", "consumers", "publish_rate", "deliver_rate"]
+
+class ArrivalPattern(BaseModel):
+    """合成的消息到达过程"""
+    rate: float = Field(0.0, ge=0, description="平均到达速率（条/秒）")
+    daily_amplitude: float = Field(0.0, ge=0, le=1, description="按日正弦波动的幅度（相对平均速率）")
+    peak_hour: float = Field(14.0, ge=0, lt=24, description="每日到达高峰的时刻（UTC小时）")
+    weekend_factor: float = Field(1.0, ge=0, description="周六、周日的到达速率系数")
+
+    def rate_at(self, ts: datetime) -> float:
+        hour = ts.hour + ts.minute / 60 + ts.second / 3600
+        rate = self.rate * (1 + self.daily_amplitude * math.cos(2 * math.pi * (hour - self.peak_hour) / 24))
+        if ts.weekday() >= 5:
+            rate *= self.weekend_factor
+        return max(rate, 0.0)
+
+class SimModelSpec(BaseModel):
+    """仿真中的模型"""
+    name: str
+    service_seconds: float = Field(..., gt=0, description="单实例处理一条消息的实际耗时（秒）")
+    average_inference_time: Optional[float] = Field(None, gt=0, description="策略看到的平均推理时间，为空时等于 service_seconds")
+    cold_start_seconds: float = Field(60, ge=0, description="实例从启动到可以消费消息的时间（秒）")
+    min_instances: Optional[int] = Field(None, ge=0)
+    max_instances: Optional[int] = Field(None, ge=0)
+    initial_instances: int = Field(0, ge=0, description="仿真开始时已就绪的实例数")
+    arrival: ArrivalPattern = Field(default_factory=ArrivalPattern)
+
+class SimNodeSpec(BaseModel):
+    """一组相同配置的仿真节点"""
+    count: int = Field(1, ge=1)
+    gpus: int = Field(8, ge=1, description="每个节点的GPU数量")
+    models: Optional[List[str]] = Field(None, description="节点支持的模型，为空时支持所有模型")
+
+class SimulationScenario(BaseModel):
+    """仿真场景配置"""
+    name: str = "scenario"
+    start: datetime = Field(datetime(2024, 1, 1), description="仿真开始时间（UTC），回放时取记录中的最早时间")
+    duration_seconds: Optional[int] = Field(None, gt=0, description="仿真时长（秒），为空时合成场景为7天、回放场景为记录的时间跨度")
+    step_seconds: float = Field(10, gt=0, description="队列推进的时间步长（秒），也是排队等待时间的统计精度")
+    scrape_interval_seconds: float = Field(60, gt=0, description="记录队列长度的间隔（秒）")
+    schedule_interval_seconds: float = Field(60, gt=0, description="运行调度策略的间隔（秒）")
+    forecast: bool = Field(True, description="是否按生产环境的方式拟合队列长度预测")
+    seed: int = 0
+    nodes: List[SimNodeSpec]
+    models: List[SimModelSpec]
+    replay_path: Optional[str] = Field(None, description="回放的队列记录CSV（由 export 子命令导出），覆盖同名模型的合成到达过程")
+
+    @model_validator(mode="after")
+    def check_models(self):
+        names = [m.name for m in self.models]
+        if len(names) != len(set(names)):
+            raise ValueError("模型名称重复")
+        for node in self.nodes:
+            unknown = set(node.models or []) - set(names)
+            if unknown:
+                raise ValueError(f"节点支持的模型未定义: {sorted(unknown)}")
+        return self
+
+    @classmethod
+    def load(cls, path: str) -> "SimulationScenario":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+class ReplayArrivals:
+    """按导出的队列记录推算的分段常数到达速率"""
+
+    def __init__(self, series: Dict[str, List[tuple]]):
+        # {model_name: [(时间戳, 该时刻起的到达速率)]}，按时间排序
+        self._times = {name: [ts for ts, _ in points] for name, points in series.items()}
+        self._rates = {name: [rate for _, rate in points] for name, points in series.items()}
+
+    @property
+    def model_names(self) -> List[str]:
+        return list(self._times)
+
+    def span(self):
+        """记录覆盖的时间范围"""
+        starts = [times[0] for times in self._times.values() if times]
+        ends = [times[-1] for times in self._times.values() if times]
+        return (min(starts), max(ends)) if starts else (None, None)
+
+    def rate_at(self, model_name: str, ts: datetime) -> Optional[float]:
+        times = self._times.get(model_name)
+        if not times:
+            return None
+        index = bisect.bisect_right(times, ts) - 1
+        return self._rates[model_name][index] if index >= 0 else 0.0
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayArrivals":
+        """
+        读取导出的CSV，相邻两条记录之间的到达速率取后一条记录的 publish_rate；
+        没有 publish_rate 时用 deliver_rate 加上队列长度的增长速率推算
+        """
+        records: Dict[str, List[dict]] = {}
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                records.setdefault(row["model_name"], []).append(row)
+
+        def number(value):
+            return float(value) if value not in (None, "") else None
+
+        series = {}
+        for name, rows in records.items():
+            points = []
+            rows.sort(key=lambda r: r["timestamp"])
+            for previous, current in zip(rows, rows[1:]):
+                start = datetime.fromisoformat(previous["timestamp"]).replace(tzinfo=None)
+                end = datetime.fromisoformat(current["timestamp"]).replace(tzinfo=None)
+                elapsed = (end - start).total_seconds()
+                if elapsed <= 0:
+                    continue
+                publish = number(current.get("publish_rate"))
+                if publish is None:
+                    growth = (number(current["length"]) - number(previous["length"])) / elapsed
+                    publish = (number(current.get("deliver_rate")) or 0.0) + growth
+                points.append((start, max(publish, 0.0)))
+            if points:
+                series[name] = points
+        logger.info(f"加载回放记录: {len(series)} 个模型, 文件 {path}")
+        return cls(series)
+
+def export_queue_records(
+    db: Session,
+    path: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> int:
+    """把 queue_length_records 导出为回放用的CSV，返回导出条数"""
+    query = db.query(
+        Model.model_name,
+        QueueLengthRecord.timestamp,
+        QueueLengthRecord.length,
+        QueueLengthRecord.consumers,
+        QueueLengthRecord.publish_rate,
+        QueueLengthRecord.deliver_rate,
+    ).join(Model, Model.id == QueueLengthRecord.model_id)
+    if start is not None:
+        query = query.filter(QueueLengthRecord.timestamp >= start)
+    if end is not None:
+        query = query.filter(QueueLengthRecord.timestamp <= end)
+
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(RECORD_COLUMNS)
+        for row in query.order_by(QueueLengthRecord.model_id, QueueLengthRecord.timestamp).yield_per(10000):
+            model_name, ts, length, consumers, publish, deliver = row
+            writer.writerow([model_name, ts.replace(tzinfo=None).isoformat(), length, consumers, publish, deliver])
+            count += 1
+    return count
+
+def resolve_timeline(scenario: SimulationScenario, replay: Optional[ReplayArrivals]):
+    """确定仿真的开始时间和时长（秒）"""
+    start = scenario.start
+    duration = scenario.duration_seconds
+    if replay is not None:
+        first, last = replay.span()
+        if first is not None:
+            start = first
+            if duration is None:
+                duration = int((last - first).total_seconds())
+    return start, duration or int(timedelta(days=7).total_seconds())
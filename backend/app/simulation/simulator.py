@@ -0,0 +1,499 @@
+"""
+离散事件仿真器
+按仿真时钟推进：冷启动完成、队列记录、预测拟合和策略调度作为离散事件处理，队列按 step_seconds 推进。
+每个模型的队列是按到达时间排列的消息批次（FIFO），就绪实例按服务速率依次消费，消费时记录排队等待时间。
+调度时通过 observers 采集状态，调用策略真实的 plan，并由真实的执行器经仿真节点管理器执行部署计划
+"""
+import json
+import math
+import bisect
+import time
+import random
+import logging
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional
+
+from ..models.model import Model
+from ..models.node import Node
+from ..services.queue_forecast import (
+    FORECAST_RESOLUTION, SEASON_LENGTH, QueueForecastResult,
+    build_forecast_result, fit_bucket, new_forecast_state,
+)
+from ..services.queue_rollup import bucket_start
+from ..services.queue_stats import QueueWindowStats
+from ..strategies.base import BaseStrategy
+from ..strategies.executor import execute_plan
+from ..strategies.registry import create_strategy
+from .cluster import SimulatedCluster, SimulatedNodeManager, use_node_manager
+from .observers import get_observer
+from .scenario import ReplayArrivals, SimulationScenario, resolve_timeline
+
+logger = logging.getLogger(__name__)
+
+# 仿真中保留的队列记录时长（秒），策略的统计窗口不应超过该值
+SAMPLE_RETENTION_SECONDS = 86400
+
+@dataclass
+class ModelReport:
+    """单个模型的仿真结果"""
+    model_name: str
+    arrived: int
+    served: float
+    backlog: float
+    wait_p50: Optional[float]
+    wait_p95: Optional[float]
+    wait_max: Optional[float]
+    gpu_seconds: float  # 实例（含加载中）占用的GPU时间
+    starts: int
+    stops: int
+
+@dataclass
+class SimulationReport:
+    """一次仿真的结果"""
+    scenario: str
+    strategy: str
+    parameters: Dict[str, Any]
+    simulated_seconds: float
+    wall_seconds: float
+    arrived: int
+    served: float
+    backlog: float  # 仿真结束时仍在队列中的消息数
+    wait_p50: Optional[float]  # 排队等待时间（秒），仿真结束时仍在队列中的消息按已等待时间计入
+    wait_p95: Optional[float]
+    wait_p99: Optional[float]
+    gpu_utilization: float  # 处理消息的GPU时间 / 总GPU时间
+    gpu_allocation: float  # 有实例（含加载中）的GPU时间 / 总GPU时间
+    starts: int
+    stops: int
+    replaces: int
+    failed_actions: int
+    decisions: int
+    decision_ms_p50: Optional[float]
+    decision_ms_p95: Optional[float]
+    decision_ms_max: Optional[float]
+    models: List[ModelReport] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class _SampleColumns:
+    """单个模型的队列记录，按列保存以便用二分查找定位时间窗口"""
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.lengths: List[int] = []
+        self.publish_rates: List[Optional[float]] = []
+        self.deliver_rates: List[Optional[float]] = []
+        self.consumers: List[int] = []
+
+    def append(self, ts: float, length: int, publish_rate, deliver_rate, consumers: int):
+        self.times.append(ts)
+        self.lengths.append(length)
+        self.publish_rates.append(publish_rate)
+        self.deliver_rates.append(deliver_rate)
+        self.consumers.append(consumers)
+        # 超过保留时长的记录攒够一批再删除，避免每次都移动整个列表
+        expired = bisect.bisect_left(self.times, ts - SAMPLE_RETENTION_SECONDS)
+        if expired > 1000:
+            for column in (self.times, self.lengths, self.publish_rates, self.deliver_rates, self.consumers):
+                del column[:expired]
+
+class _ModelQueue:
+    """单个模型的仿真队列"""
+
+    def __init__(self):
+        self.cohorts: Deque[list] = deque()  # [到达时间, 消息数]
+        self.length = 0.0
+        self.arrived = 0
+        self.served = 0.0
+        self.busy_seconds = 0.0
+        self.gpu_seconds = 0.0
+        self.wait_histogram: Dict[int, float] = {}  # 等待时间（单位 step_seconds）-> 消息数
+        self.starts = 0
+        self.stops = 0
+        # 自上次队列记录以来的到达/消费数量
+        self.arrived_since_scrape = 0
+        self.served_since_scrape = 0.0
+        # 当前10分钟时间桶内的队列长度记录
+        self.bucket_sum = 0.0
+        self.bucket_count = 0
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    if mean <= 0:
+        return 0
+    if mean > 30:
+        return max(int(round(rng.gauss(mean, math.sqrt(mean)))), 0)
+    limit = math.exp(-mean)
+    k, p = 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+def _percentile(histogram: Dict[int, float], width: float, q: float) -> Optional[float]:
+    total = sum(histogram.values())
+    if total <= 0:
+        return None
+    threshold = total * q
+    accumulated = 0.0
+    for bucket in sorted(histogram):
+        accumulated += histogram[bucket]
+        if accumulated >= threshold:
+            return bucket * width
+    return max(histogram) * width
+
+def _sample_percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class Simulator:
+    """驱动单个策略的仿真器"""
+
+    def __init__(self, scenario: SimulationScenario, strategy: BaseStrategy, replay: Optional[ReplayArrivals] = None):
+        self.observer = get_observer(strategy.name)
+        if self.observer is None:
+            raise ValueError(f"策略 '{strategy.name}' 没有仿真观测实现（simulation/observers.py）")
+        self.scenario = scenario
+        self.strategy = strategy
+        if replay is None and scenario.replay_path:
+            replay = ReplayArrivals.load(scenario.replay_path)
+        self.replay = replay
+        self.start, self.duration = resolve_timeline(scenario, replay)
+        self.random = random.Random(scenario.seed)
+
+        self.specs = {spec.name: spec for spec in scenario.models}
+        self.models = [
+            Model(
+                id=index + 1,
+                environment_id=1,
+                model_name=spec.name,
+                average_inference_time=spec.average_inference_time or spec.service_seconds,
+                min_instances=spec.min_instances,
+                max_instances=spec.max_instances,
+            )
+            for index, spec in enumerate(scenario.models)
+        ]
+        self.model_ids = {m.model_name: m.id for m in self.models}
+
+        self.cluster = SimulatedCluster({spec.name: spec.cold_start_seconds for spec in scenario.models})
+        self.manager = SimulatedNodeManager(self.cluster)
+        self.nodes: List[Node] = []
+        all_model_names = [spec.name for spec in scenario.models]
+        for node_spec in scenario.nodes:
+            for _ in range(node_spec.count):
+                index = len(self.nodes)
+                node_ip = f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+                gpu_ids = list(range(node_spec.gpus))
+                supported = node_spec.models or all_model_names
+                self.nodes.append(Node(
+                    id=index + 1,
+                    environment_id=1,
+                    node_ip=node_ip,
+                    node_port=6004,
+                    available_gpu_ids=[str(g) for g in gpu_ids],
+                    available_models=supported,
+                    status="online",
+                ))
+                self.cluster.add_node(f"{node_ip}:6004", gpu_ids, supported)
+        self.node_dicts = [{"node_ip": n.node_ip, "node_port": n.node_port} for n in self.nodes]
+        self.total_gpus = sum(len(node.gpu_ids) for node in self.cluster.nodes.values())
+
+        self.queues = {spec.name: _ModelQueue() for spec in scenario.models}
+        # 按列保存的队列记录 {model_id: _SampleColumns}
+        self.samples: Dict[int, _SampleColumns] = {m.id: _SampleColumns() for m in self.models}
+        self.forecast_states = {}
+        self.forecast_seasonals: Dict[int, List[float]] = {}
+        self.forecast_pending: Dict[int, List[list]] = {}
+        self._forecast_bucket: Optional[datetime] = None
+        self._forecast_cache: Dict[int, Dict[int, QueueForecastResult]] = {}
+        self._last_action_times: Dict[str, datetime] = {}
+        self.decision_ms: List[float] = []
+        self.replaces = 0
+        self.failed_actions = 0
+        self._last_scrape = 0.0
+
+        self._place_initial_instances()
+
+    @property
+    def current_time(self) -> datetime:
+        return self.start + timedelta(seconds=self.cluster.now)
+
+    def _place_initial_instances(self):
+        for spec in self.scenario.models:
+            remaining = spec.initial_instances
+            for node in self.cluster.nodes.values():
+                if remaining == 0:
+                    break
+                if spec.name not in node.models:
+                    continue
+                for gpu_id in node.gpu_ids:
+                    if remaining == 0:
+                        break
+                    if gpu_id not in node.instances:
+                        self.cluster.start(node.node_key, spec.name, gpu_id, ready=True)
+                        remaining -= 1
+            if remaining:
+                logger.warning(f"模型 {spec.name} 的初始实例有 {remaining} 个没有可用的GPU")
+
+    # ---- 供 observers 使用的状态查询，口径与生产环境的数据库查询一致 ----
+
+    def window_stats(self, window_seconds: float, recent_seconds: Optional[float] = None) -> Dict[int, QueueWindowStats]:
+        """与 services.queue_stats.get_queue_window_stats 口径一致的窗口统计"""
+        now = self.cluster.now
+        window_start = now - window_seconds
+        midpoint = now - window_seconds / 2
+        recent_start = now - (recent_seconds or window_seconds)
+
+        def average(values):
+            values = [v for v in values if v is not None]
+            return sum(values) / len(values) if values else None
+
+        stats = {}
+        for model_id, columns in self.samples.items():
+            times = columns.times
+            first = bisect.bisect_left(times, window_start)
+            if first == len(times):
+                continue
+            middle = bisect.bisect_left(times, midpoint, first)
+            recent = bisect.bisect_left(times, recent_start, first)
+            lengths = columns.lengths[first:]
+            late = columns.lengths[middle:]
+            early_count = middle - first
+            trend = 0.0
+            if late and early_count:
+                trend = sum(late) / len(late) - (sum(lengths) - sum(late)) / early_count
+            recent_lengths = columns.lengths[recent:]
+            stats[model_id] = QueueWindowStats(
+                model_id=model_id,
+                sample_count=len(lengths),
+                avg_length=sum(lengths) / len(lengths),
+                max_length=max(lengths),
+                recent_avg_length=sum(recent_lengths) / len(recent_lengths) if recent_lengths else 0.0,
+                trend=float(trend),
+                publish_rate=average(columns.publish_rates[recent:]),
+                deliver_rate=average(columns.deliver_rates[recent:]),
+                consumers=average(columns.consumers[recent:]),
+            )
+        return stats
+
+    def forecasts(self, horizon_seconds: int) -> Dict[int, QueueForecastResult]:
+        """与 services.queue_forecast.get_queue_forecasts 口径一致的预测，拟合新的时间桶之前结果不变"""
+        results = self._forecast_cache.get(horizon_seconds)
+        if results is None:
+            results = self._forecast_cache[horizon_seconds] = {
+                model_id: build_forecast_result(state, self.forecast_seasonals[model_id], horizon_seconds)
+                for model_id, state in self.forecast_states.items()
+                if state.sample_count >= SEASON_LENGTH
+            }
+        return results
+
+    def last_action_times(self, since: datetime) -> Dict[str, datetime]:
+        """与 services.scheduling_history.get_last_action_times 口径一致"""
+        return {name: ts for name, ts in self._last_action_times.items() if ts >= since}
+
+    # ---- 仿真事件 ----
+
+    def _arrival_rate(self, model_name: str, ts: datetime) -> float:
+        if self.replay is not None:
+            rate = self.replay.rate_at(model_name, ts)
+            if rate is not None:
+                return rate
+        return self.specs[model_name].arrival.rate_at(ts)
+
+    def _scrape(self, now: float):
+        """记录队列长度、消息速率和消费者数量，对应 record_queue_lengths 任务"""
+        elapsed = now - self._last_scrape
+        self._last_scrape = now
+        for name, queue in self.queues.items():
+            model_id = self.model_ids[name]
+            length = int(round(queue.length))
+            self.samples[model_id].append(
+                now,
+                length,
+                queue.arrived_since_scrape / elapsed if elapsed > 0 else None,
+                queue.served_since_scrape / elapsed if elapsed > 0 else None,
+                self.cluster.ready_counts[name],
+            )
+            queue.arrived_since_scrape = 0
+            queue.served_since_scrape = 0.0
+            queue.bucket_sum += length
+            queue.bucket_count += 1
+
+        if self.scenario.forecast:
+            self._update_forecasts()
+
+    def _update_forecasts(self):
+        """10分钟时间桶结束后用桶内平均队列长度拟合预测，对应 refresh_queue_forecasts 任务"""
+        current = bucket_start(self.current_time, FORECAST_RESOLUTION)
+        if self._forecast_bucket is None:
+            self._forecast_bucket = current
+            return
+        if current == self._forecast_bucket:
+            return
+        for name, queue in self.queues.items():
+            model_id = self.model_ids[name]
+            state = self.forecast_states.get(model_id)
+            if state is None:
+                state = self.forecast_states[model_id] = new_forecast_state(model_id)
+                self.forecast_seasonals[model_id] = json.loads(state.seasonal)
+                self.forecast_pending[model_id] = []
+            # 本次记录属于新的时间桶，其余记录属于已结束的时间桶
+            last = self.samples[model_id].lengths[-1]
+            count = queue.bucket_count - 1
+            if count > 0:
+                fit_bucket(
+                    state, self.forecast_seasonals[model_id], self.forecast_pending[model_id],
+                    self._forecast_bucket, (queue.bucket_sum - last) / count,
+                )
+            queue.bucket_sum = last
+            queue.bucket_count = 1
+        self._forecast_bucket = current
+        self._forecast_cache.clear()
+
+    async def _schedule(self):
+        """运行一次策略：observe → plan → act"""
+        observation = await self.observer(self.strategy, self)
+        plan = self.strategy.make_plan(observation)
+        self.decision_ms.append(plan.decision_ms)
+        if not plan.actions:
+            return
+
+        report = await execute_plan(plan)
+        now = self.current_time
+        for result in report.results:
+            action = result.action
+            if not result.success:
+                self.failed_actions += 0 if result.skipped else 1
+                continue
+            self._last_action_times[action.model_name] = now
+            if action.action == "stop":
+                self.queues[action.model_name].stops += 1
+                continue
+            self.queues[action.model_name].starts += 1
+            if action.action == "replace":
+                self.replaces += 1
+                self._last_action_times[action.old_model_name] = now
+                if action.old_model_name in self.queues:
+                    self.queues[action.old_model_name].stops += 1
+
+    def _step_queues(self, now: float, step: float):
+        """推进所有队列一个时间步：产生到达消息，就绪实例按FIFO消费"""
+        middle = now + step / 2
+        ts = self.start + timedelta(seconds=middle)
+        for name, queue in self.queues.items():
+            arrivals = _poisson(self.random, self._arrival_rate(name, ts) * step)
+            if arrivals:
+                queue.cohorts.append([middle, arrivals])
+                queue.length += arrivals
+                queue.arrived += arrivals
+                queue.arrived_since_scrape += arrivals
+
+            ready = self.cluster.ready_counts[name]
+            queue.gpu_seconds += (ready + self.cluster.loading_counts[name]) * step
+            if not ready or queue.length <= 0:
+                continue
+            service_seconds = self.specs[name].service_seconds
+            capacity = ready * step / service_seconds
+            served = 0.0
+            while capacity > 1e-9 and queue.cohorts:
+                cohort = queue.cohorts[0]
+                taken = min(cohort[1], capacity)
+                bucket = int(round((middle - cohort[0]) / step))
+                queue.wait_histogram[bucket] = queue.wait_histogram.get(bucket, 0.0) + taken
+                cohort[1] -= taken
+                capacity -= taken
+                served += taken
+                if cohort[1] <= 1e-9:
+                    queue.cohorts.popleft()
+            queue.length = max(queue.length - served, 0.0)
+            queue.served += served
+            queue.served_since_scrape += served
+            queue.busy_seconds += served * service_seconds
+
+    async def run(self) -> SimulationReport:
+        started = time.perf_counter()
+        step = self.scenario.step_seconds
+        scrape_interval = self.scenario.scrape_interval_seconds
+        schedule_interval = self.scenario.schedule_interval_seconds
+        steps = int(math.ceil(self.duration / step))
+        next_scrape = scrape_interval
+        next_schedule = 0.0
+
+        with use_node_manager(self.manager):
+            for index in range(steps):
+                now = index * step
+                self.cluster.advance(now)
+                if now >= next_scrape:
+                    self._scrape(now)
+                    next_scrape = (math.floor(now / scrape_interval) + 1) * scrape_interval
+                if now >= next_schedule:
+                    await self._schedule()
+                    next_schedule = (math.floor(now / schedule_interval) + 1) * schedule_interval
+                self._step_queues(now, step)
+            self.cluster.advance(steps * step)
+        return self._report(steps * step, time.perf_counter() - started)
+
+    def _report(self, simulated: float, wall_seconds: float) -> SimulationReport:
+        step = self.scenario.step_seconds
+        overall: Dict[int, float] = {}
+        model_reports = []
+        for name, queue in self.queues.items():
+            # 仍在队列中的消息按截至仿真结束的等待时间计入
+            histogram = dict(queue.wait_histogram)
+            for arrived_at, count in queue.cohorts:
+                bucket = int(round((simulated - arrived_at) / step))
+                histogram[bucket] = histogram.get(bucket, 0.0) + count
+            for bucket, count in histogram.items():
+                overall[bucket] = overall.get(bucket, 0.0) + count
+            model_reports.append(ModelReport(
+                model_name=name,
+                arrived=queue.arrived,
+                served=round(queue.served, 1),
+                backlog=round(queue.length, 1),
+                wait_p50=_percentile(histogram, step, 0.5),
+                wait_p95=_percentile(histogram, step, 0.95),
+                wait_max=max(histogram) * step if histogram else None,
+                gpu_seconds=round(queue.gpu_seconds, 1),
+                starts=queue.starts,
+                stops=queue.stops,
+            ))
+
+        gpu_time = self.total_gpus * simulated or 1.0
+        return SimulationReport(
+            scenario=self.scenario.name,
+            strategy=self.strategy.name,
+            parameters=self.strategy.params.model_dump(),
+            simulated_seconds=simulated,
+            wall_seconds=round(wall_seconds, 3),
+            arrived=sum(r.arrived for r in model_reports),
+            served=round(sum(q.served for q in self.queues.values()), 1),
+            backlog=round(sum(q.length for q in self.queues.values()), 1),
+            wait_p50=_percentile(overall, step, 0.5),
+            wait_p95=_percentile(overall, step, 0.95),
+            wait_p99=_percentile(overall, step, 0.99),
+            gpu_utilization=round(sum(q.busy_seconds for q in self.queues.values()) / gpu_time, 4),
+            gpu_allocation=round(sum(q.gpu_seconds for q in self.queues.values()) / gpu_time, 4),
+            starts=sum(r.starts for r in model_reports) - self.replaces,
+            stops=sum(r.stops for r in model_reports) - self.replaces,
+            replaces=self.replaces,
+            failed_actions=self.failed_actions,
+            decisions=len(self.decision_ms),
+            decision_ms_p50=_sample_percentile(self.decision_ms, 0.5),
+            decision_ms_p95=_sample_percentile(self.decision_ms, 0.95),
+            decision_ms_max=max(self.decision_ms) if self.decision_ms else None,
+            models=model_reports,
+        )
+
+async def run_simulation(
+    scenario: SimulationScenario,
+    strategy_name: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    replay: Optional[ReplayArrivals] = None,
+) -> SimulationReport:
+    """按场景仿真指定策略和参数，返回仿真结果"""
+    strategy = create_strategy(strategy_name, parameters)
+    return await Simulator(scenario, strategy, replay).run()
@@ -0,0 +1,13 @@
+# 导入内置策略以完成注册
+from .base import BaseStrategy, StrategyParams
+from .plan import DeploymentAction, DeploymentPlan
+from .executor import ActionResult, ExecutionReport, execute_plan
+from .registry import STRATEGY_REGISTRY, register_strategy, get_strategy_class, create_strategy, list_strategies
+from .busy_queue_scaling import BusyQueueScalingStrategy, BusyQueueScalingParams
+
+__all__ = [
+    "BaseStrategy", "StrategyParams",
+    "DeploymentAction", "DeploymentPlan", "ActionResult", "ExecutionReport", "execute_plan",
+    "STRATEGY_REGISTRY", "register_strategy", "get_strategy_class", "create_strategy", "list_strategies",
+    "BusyQueueScalingStrategy", "BusyQueueScalingParams",
+]
@@ -0,0 +1,79 @@
+"""
+调度策略基类
+每个策略按 observe（采集集群与队列状态）→ plan（生成部署计划）→ act（执行部署计划）三个阶段运行，
+plan 阶段只做计算、不访问数据库和节点，便于预演（dry-run）和基准测试
+"""
+import json
+import time
+import logging
+from typing import Any, Dict, Optional, Type, Union
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..services import metrics
+from ..services.db_writer import db_writer
+from ..services.scheduling_history import save_execution_report
+from .plan import DeploymentPlan
+from .executor import ExecutionReport, execute_plan
+
+logger = logging.getLogger(__name__)
+
+class StrategyParams(BaseModel):
+    """策略参数基类，各策略继承并声明自己的参数"""
+
+    class Config:
+        extra = "forbid"
+
+class BaseStrategy:
+    """调度策略基类"""
+
+    name: str = ""
+    description: str = ""
+    Params: Type[StrategyParams] = StrategyParams
+
+    def __init__(self, params: Optional[StrategyParams] = None):
+        self.params = params or self.Params()
+
+    @classmethod
+    def parse_parameters(cls, raw: Optional[Union[str, Dict[str, Any]]]) -> StrategyParams:
+        """解析并校验数据库中保存的参数（JSON字符串或字典），校验失败抛出 pydantic.ValidationError"""
+        if isinstance(raw, str):
+            raw = json.loads(raw) if raw.strip() else {}
+        return cls.Params(**(raw or {}))
+
+    async def observe(self, db: AsyncSession) -> Any:
+        """采集决策所需的状态，已有的同步查询函数通过 db.run_sync 调用"""
+        raise NotImplementedError
+
+    def plan(self, observation: Any) -> DeploymentPlan:
+        """根据采集到的状态生成部署计划，不应产生副作用"""
+        raise NotImplementedError
+
+    def make_plan(self, observation: Any) -> DeploymentPlan:
+        """生成部署计划并记录决策耗时"""
+        started = time.perf_counter()
+        plan = self.plan(observation)
+        plan.decision_ms = (time.perf_counter() - started) * 1000
+        return plan
+
+    async def act(self, db: AsyncSession, plan: DeploymentPlan) -> ExecutionReport:
+        """执行部署计划，并记录执行结果（用于冷却期判断与追溯）"""
+        report = await execute_plan(plan)
+        metrics.record_execution_report(plan.strategy, report)
+        await db_writer.submit(save_execution_report, plan.strategy, report)
+        return report
+
+    async def dry_run(self, db: AsyncSession) -> DeploymentPlan:
+        """只执行 observe → plan，返回部署计划而不执行"""
+        observation = await self.observe(db)
+        return self.make_plan(observation)
+
+    async def run(self, db: AsyncSession) -> DeploymentPlan:
+        """依次执行 observe → plan → act"""
+        plan = await self.dry_run(db)
+        logger.info(plan.summary())
+        metrics.record_plan(plan)
+        if plan.actions:
+            await self.act(db, plan)
+        return plan
@@ -0,0 +1,385 @@
+"""
+繁忙队列扩容策略
+按容量模型（services/capacity.py）估算各模型在目标排空时间内所需的实例数，为实例不足的模型部署实例
+（优先使用空闲GPU，其次替换闲置模型），回收持续空闲或超过最多实例数的实例，并保证每个模型的最少实例数。
+GPU的分配由 placement.solve_placement 整体求解，优先满足无实例、单实例负载最高的模型。
+缩容使用低于扩容的目标利用率形成迟滞区间，模型被操作后进入冷却期，避免反复加载模型
+"""
+import math
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import Field, model_validator
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..services.capacity import ModelCapacity, drain_seconds, estimate_model_capacity
+from ..services.cluster_state import cluster_state_cache
+from ..services.queue_forecast import QueueForecastResult, get_queue_forecasts
+from ..services.queue_stats import QueueWindowStats, get_queue_window_stats
+from ..services.scheduling_history import get_last_action_times
+from ..config import settings
+from .base import BaseStrategy, StrategyParams
+from .placement import PlacementRequest, solve_placement
+from .plan import DeploymentAction, DeploymentPlan
+from .registry import register_strategy
+
+logger = logging.getLogger(__name__)
+
+# 无实例的模型无法排空队列，分配时优先于为已有实例的模型扩容
+NO_INSTANCE_PRIORITY = 1e6
+
+class BusyQueueScalingParams(StrategyParams):
+    busy_threshold_seconds: float = Field(300, gt=0, description="目标排空时间（秒），按该时间内排空积压计算每个模型所需的实例数")
+    target_utilization: float = Field(0.8, gt=0, le=1, description="稳态下单实例的目标利用率（到达速率 / 服务能力）")
+    max_instances_per_model: int = Field(4, ge=1, description="单个模型最多扩容到的实例数，模型配置了 max_instances 时以模型配置为准")
+    forecast_horizon_seconds: int = Field(900, ge=0, description="按未来该时长（秒）内的预测队列峰值提前扩容，0 表示不使用预测")
+    min_forecast_skill: float = Field(0.0, le=1, description="预测技能分（1 - MAE / 朴素预测MAE）不低于该值时才使用预测")
+    min_forecast_samples: int = Field(144, ge=1, description="至少累计该数量的预测误差样本（每10分钟一个）后才使用预测")
+    window_seconds: int = Field(1800, ge=60, description="判断模型繁忙的统计窗口（秒）")
+    recent_seconds: int = Field(300, ge=60, description="判断模型近期是否有请求的窗口（秒）")
+    min_samples: int = Field(10, ge=1, description="统计窗口内至少需要的队列记录数")
+    allow_replace: bool = Field(True, description="没有空闲GPU时是否替换闲置模型")
+    ensure_min_instance: bool = Field(True, description="是否保证每个模型至少有一个实例，模型配置了 min_instances 时以模型配置为准")
+    scale_down_enabled: bool = Field(True, description="是否停止持续空闲或超过最多实例数的实例")
+    idle_window_seconds: int = Field(1800, ge=60, description="缩容前队列需持续空闲的时长（秒）")
+    idle_queue_length: float = Field(0, ge=0, description="空闲窗口内最大队列长度不超过该值时视为空闲")
+    scale_down_utilization: float = Field(0.5, gt=0, le=1, description="缩容后单实例的最高利用率，低于 target_utilization 以避免缩容后立即扩容")
+    cooldown_seconds: int = Field(600, ge=0, description="模型被启动、停止或替换后的冷却时间（秒），冷却期内不再缩容、替换或继续扩容")
+
+    @model_validator(mode="after")
+    def check_utilization(self):
+        # 缩容保留的实例数不少于扩容所需，否则模型每个冷却期都会在缩容和扩容之间反复
+        if self.scale_down_utilization >= self.target_utilization:
+            raise ValueError(
+                f"scale_down_utilization ({self.scale_down_utilization}) 必须小于 target_utilization ({self.target_utilization})"
+            )
+        return self
+
+@dataclass
+class ClusterObservation:
+    """策略决策所需的集群与队列状态"""
+    all_models: List[Any]
+    online_nodes: List[Any]
+    window_stats: Dict[int, QueueWindowStats]
+    model_status_map: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    gpu_status_map: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    forecasts: Dict[int, QueueForecastResult] = field(default_factory=dict)
+    idle_stats: Dict[int, QueueWindowStats] = field(default_factory=dict)  # idle_window_seconds 内的队列统计
+    last_action_times: Dict[str, datetime] = field(default_factory=dict)  # 冷却期内各模型最近一次操作的时间
+    now: datetime = field(default_factory=datetime.utcnow)
+
+def _available_gpu_ids(node) -> Set[int]:
+    """节点可用的GPU ID（整数）"""
+    return {int(gpu_id) for gpu_id in node.available_gpu_ids}
+
+@register_strategy
+class BusyQueueScalingStrategy(BaseStrategy):
+    """繁忙队列扩容策略"""
+
+    name = "busy_queue_scaling"
+    description = "基于队列积压与最近活跃度，在空闲GPU上部署繁忙模型或替换闲置模型，回收空闲实例，并保证每个模型的最少实例数"
+    Params = BusyQueueScalingParams
+
+    def load_observation(self, db: Session, now: datetime) -> ClusterObservation:
+        """从数据库读取模型、在线节点和队列统计（同步查询，由 observe 通过 run_sync 调用）"""
+        # 一次窗口聚合查询得到各模型的平均/最大队列长度、趋势和最近活跃度
+        window_stats = get_queue_window_stats(
+            db,
+            window_seconds=self.params.window_seconds,
+            recent_seconds=self.params.recent_seconds,
+            now=now,
+        )
+        all_models = db.query(models.Model).all()
+        online_nodes = db.query(models.Node).filter(models.Node.status == "online").all()
+
+        observation = ClusterObservation(all_models=all_models, online_nodes=online_nodes, window_stats=window_stats, now=now)
+        if self.params.forecast_horizon_seconds > 0:
+            observation.forecasts = get_queue_forecasts(db, self.params.forecast_horizon_seconds)
+        if self.params.scale_down_enabled:
+            observation.idle_stats = get_queue_window_stats(db, window_seconds=self.params.idle_window_seconds, now=now)
+        if self.params.cooldown_seconds > 0:
+            observation.last_action_times = get_last_action_times(db, now - timedelta(seconds=self.params.cooldown_seconds))
+        return observation
+
+    async def observe(self, db: AsyncSession) -> ClusterObservation:
+        observation = await db.run_sync(self.load_observation, datetime.utcnow())
+        if observation.online_nodes:
+            node_dicts = [{"node_ip": n.node_ip, "node_port": n.node_port} for n in observation.online_nodes]
+            snapshot = await cluster_state_cache.get_status(node_dicts, max_staleness=settings.NODE_STATUS_REFRESH_INTERVAL)
+            observation.model_status_map = snapshot.model_status
+            observation.gpu_status_map = snapshot.gpu_status
+        return observation
+
+    def estimate_capacities(
+        self, observation: ClusterObservation, running_instances: Dict[str, int]
+    ) -> Dict[int, ModelCapacity]:
+        """估算每个有队列统计的模型所需的实例数"""
+        capacities = {}
+        for model in observation.all_models:
+            stats = observation.window_stats.get(model.id)
+            if stats is None:
+                continue
+            capacities[model.id] = estimate_model_capacity(
+                stats,
+                model.average_inference_time,
+                running_instances.get(model.model_name, 0),
+                window_seconds=self.params.window_seconds,
+                target_drain_seconds=self.params.busy_threshold_seconds,
+                target_utilization=self.params.target_utilization,
+                forecast_queue_length=self.trusted_forecast_peak(observation.forecasts.get(model.id)),
+            )
+        return capacities
+
+    def trusted_forecast_peak(self, forecast: Optional[QueueForecastResult]) -> Optional[float]:
+        """预测误差样本足够且优于朴素预测时，返回预测区间内的队列峰值"""
+        if forecast is None:
+            return None
+        accuracy = forecast.accuracy
+        if accuracy.samples < self.params.min_forecast_samples:
+            return None
+        if accuracy.skill is None or accuracy.skill < self.params.min_forecast_skill:
+            return None
+        # 不足一条消息的预测视为噪声
+        if forecast.peak_length < 1:
+            return None
+        return forecast.peak_length
+
+    def min_instances(self, model) -> int:
+        """模型的最少实例数，未配置时按 ensure_min_instance 取 1 或 0"""
+        if model.min_instances is not None:
+            return model.min_instances
+        return 1 if self.params.ensure_min_instance else 0
+
+    def max_instances(self, model) -> int:
+        """模型的最多实例数，未配置时取 max_instances_per_model"""
+        if model.max_instances is not None:
+            return model.max_instances
+        return self.params.max_instances_per_model
+
+    def in_cooldown(self, observation: ClusterObservation, model_name: str) -> bool:
+        last = observation.last_action_times.get(model_name)
+        return last is not None and (observation.now - last).total_seconds() < self.params.cooldown_seconds
+
+    def find_busy_models(self, observation: ClusterObservation, capacities: Dict[int, ModelCapacity]) -> List[Any]:
+        """找出实例数不足的模型，冷却期内只处理没有实例的模型"""
+        busy_models = []
+        for model in observation.all_models:
+            stats = observation.window_stats.get(model.id)
+            capacity = capacities.get(model.id)
+            if stats is None or capacity is None or stats.sample_count < self.params.min_samples:
+                continue
+            if capacity.instances > 0 and self.in_cooldown(observation, model.model_name):
+                continue
+            target = min(capacity.required_instances, self.max_instances(model))
+            if target > capacity.instances:
+                busy_models.append(model)
+        return busy_models
+
+    def scale_down_target(
+        self, observation: ClusterObservation, model, capacity: Optional[ModelCapacity], instances: int
+    ) -> int:
+        """
+        计算模型缩容后保留的实例数，不缩容时返回当前实例数。
+        超过最多实例数时缩到上限；否则要求队列在 idle_window_seconds 内持续不超过 idle_queue_length，
+        并按 scale_down_utilization 保留足够承接当前负载的实例
+        """
+        if self.in_cooldown(observation, model.model_name):
+            return instances
+        floor = self.min_instances(model)
+        if instances > self.max_instances(model):
+            return max(self.max_instances(model), floor)
+
+        idle = observation.idle_stats.get(model.id)
+        if idle is None or idle.sample_count < self.params.min_samples or idle.max_length > self.params.idle_queue_length:
+            return instances
+        demand = capacity.demand if capacity is not None else 0.0
+        keep = max(floor, math.ceil(demand / self.params.scale_down_utilization))
+        return min(keep, instances)
+
+    def plan(self, observation: ClusterObservation) -> DeploymentPlan:
+        plan = DeploymentPlan(strategy=self.name)
+        model_status_map = observation.model_status_map
+
+        # 转换为 {model_id: 最近平均队列长度}，用于后续判断请求活跃度
+        recent_stats = {mid: s.recent_avg_length for mid, s in observation.window_stats.items()}
+        model_by_name = {m.model_name: m for m in observation.all_models}
+
+        # 统计当前所有运行中的模型实例数量及所在位置
+        running_instances: Dict[str, int] = {}
+        instance_locations: Dict[str, List[Tuple[str, int]]] = {}
+        for node_key, instances in model_status_map.items():
+            for ins in instances:
+                mname = ins.get("model_name")
+                running_instances[mname] = running_instances.get(mname, 0) + 1
+                if ins.get("gpu_id") is not None:
+                    instance_locations.setdefault(mname, []).append((node_key, ins["gpu_id"]))
+
+        # 按容量模型估算各模型所需的实例数（含预测的队列峰值）
+        capacities = self.estimate_capacities(observation, running_instances)
+        nodes: Dict[str, Any] = {f"{node.node_ip}:{node.node_port}": node for node in observation.online_nodes}
+
+        def add_action(action, node_key, gpu_id, model, reason, old_model_name=None, delta=1):
+            # 按容量模型估算该模型实例数变化前后的排空时间
+            node = nodes[node_key]
+            capacity = capacities.get(model.id)
+            instances = running_instances.get(model.model_name, 0)
+            before = after = None
+            if capacity is not None:
+                before = drain_seconds(capacity.queue_length, capacity.arrival_rate, capacity.service_rate, instances)
+                after = drain_seconds(capacity.queue_length, capacity.arrival_rate, capacity.service_rate, instances + delta)
+            plan.add(DeploymentAction(
+                action=action,
+                node_id=node.id,
+                node_ip=node.node_ip,
+                node_port=node.node_port,
+                gpu_id=gpu_id,
+                model_name=model.model_name,
+                old_model_name=old_model_name,
+                reason=reason,
+                drain_seconds_before=before,
+                drain_seconds_after=after,
+            ))
+
+        # 1. 停止持续空闲或超过最多实例数的实例，释放的GPU在本轮即可用于扩容
+        stopped_gpus: Dict[str, Set[int]] = {}
+        if self.params.scale_down_enabled:
+            for model in observation.all_models:
+                instances = running_instances.get(model.model_name, 0)
+                if instances == 0:
+                    continue
+                keep = self.scale_down_target(observation, model, capacities.get(model.id), instances)
+                if keep >= instances:
+                    continue
+                if instances > self.max_instances(model):
+                    reason = f"实例数 {instances} 超过最多实例数 {self.max_instances(model)}，缩容到 {keep} 个"
+                else:
+                    reason = f"队列持续 {self.params.idle_window_seconds}s 空闲，缩容到 {keep} 个实例"
+                # 只能停止在线节点上的实例，从最后发现的实例开始停止
+                locations = [loc for loc in instance_locations.get(model.model_name, []) if loc[0] in nodes]
+                for node_key, gpu_id in locations[::-1][:instances - keep]:
+                    add_action("stop", node_key, gpu_id, model, reason, delta=-1)
+                    running_instances[model.model_name] -= 1
+                    stopped_gpus.setdefault(node_key, set()).add(gpu_id)
+
+        # 冷却期外的模型可被替换的实例数；显式配置的 min_instances 不会因替换而被突破
+        replaceable: Dict[str, int] = {}
+        for model in observation.all_models:
+            if self.in_cooldown(observation, model.model_name):
+                replaceable[model.model_name] = 0
+            else:
+                floor = model.min_instances or 0
+                replaceable[model.model_name] = max(running_instances.get(model.model_name, 0) - floor, 0)
+
+        # 每个节点的空闲GPU、可替换GPU（运行着最近无请求的模型），以及 {模型名称: 支持该模型的节点}
+        free_slots: Dict[str, List[int]] = {}
+        idle_slots: Dict[str, List[Tuple[int, str]]] = {}
+        nodes_by_model: Dict[str, List[str]] = {}
+        for node_key, node in nodes.items():
+            model_statuses = model_status_map.get(node_key, [])
+            stopped = stopped_gpus.get(node_key, set())
+            used_gpu_ids = {ms['gpu_id'] for ms in model_statuses} - stopped
+            free_slots[node_key] = sorted(_available_gpu_ids(node) - used_gpu_ids)
+
+            idle_gpus: Dict[int, str] = {}
+            for inst in model_statuses:
+                inst_model_name = inst.get("model_name")
+                inst_gpu_id = inst.get("gpu_id")
+                if inst_model_name is None or inst_gpu_id is None or inst_gpu_id in stopped or inst_gpu_id in idle_gpus:
+                    continue
+                running_model_obj = model_by_name.get(inst_model_name)
+                running_model_id = running_model_obj.id if running_model_obj else None
+                # 最近平均队列长度为 0 且预测也不需要实例时视为闲置
+                capacity = capacities.get(running_model_id)
+                if recent_stats.get(running_model_id, 0) == 0 and (capacity is None or capacity.required_instances == 0):
+                    if running_model_obj is not None:
+                        if replaceable[inst_model_name] <= 0:
+                            continue
+                        replaceable[inst_model_name] -= 1
+                    idle_gpus[inst_gpu_id] = inst_model_name
+            idle_slots[node_key] = sorted(idle_gpus.items())
+
+            for model_name in node.available_models:
+                nodes_by_model.setdefault(model_name, []).append(node_key)
+
+        def place(requests: List[PlacementRequest], reason) -> List[Any]:
+            """求解分配并生成操作，返回未能分配的模型；reason 为字符串或 model -> 字符串"""
+            capacity = {}
+            for node_key in nodes:
+                if free_slots[node_key]:
+                    capacity[(node_key, "free")] = len(free_slots[node_key])
+                if idle_slots[node_key]:
+                    capacity[(node_key, "idle")] = len(idle_slots[node_key])
+            assigned = solve_placement(requests, capacity)
+
+            for index in sorted(assigned, key=lambda i: requests[i].value, reverse=True):
+                model = requests[index].model
+                node_key, kind = assigned[index]
+                action_reason = reason(model) if callable(reason) else reason
+                if kind == "free":
+                    add_action("start", node_key, free_slots[node_key].pop(0), model, action_reason)
+                else:
+                    gpu_id, old_model_name = idle_slots[node_key].pop(0)
+                    add_action(
+                        "replace", node_key, gpu_id, model,
+                        f"{action_reason}，替换最近无请求的模型 {old_model_name}",
+                        old_model_name=old_model_name,
+                    )
+                    running_instances[old_model_name] = running_instances.get(old_model_name, 1) - 1
+                running_instances[model.model_name] = running_instances.get(model.model_name, 0) + 1
+            unplaced = {r.model.model_name: r.model for i, r in enumerate(requests) if i not in assigned}
+            return list(unplaced.values())
+
+        # 2. 按容量模型找出实例数不足的模型
+        busy_models = self.find_busy_models(observation, capacities)
+        if busy_models:
+            logger.info(f"检测到实例不足的模型: {[m.model_name for m in busy_models]}")
+
+            # 每个缺少的实例是一个分配请求；收益为增加该实例后的单实例负载，无实例的模型优先
+            requests = []
+            for m in busy_models:
+                capacity = capacities[m.id]
+                target = min(capacity.required_instances, self.max_instances(m))
+                node_keys = nodes_by_model.get(m.model_name, [])
+                groups = [(k, "free") for k in node_keys if free_slots[k]]
+                if self.params.allow_replace:
+                    groups += [(k, "idle") for k in node_keys if idle_slots[k]]
+                for total in range(capacity.instances + 1, target + 1):
+                    value = capacity.demand / total + (NO_INSTANCE_PRIORITY if total == 1 else 0)
+                    requests.append(PlacementRequest(model=m, value=value, groups=groups))
+
+            def busy_reason(model):
+                c = capacities[model.id]
+                service = f"{c.service_rate:.3f}/s（{c.service_rate_source}）" if c.service_rate else "未知"
+                forecast = f"，预测峰值 {c.forecast_queue_length:.1f}" if c.forecast_queue_length is not None else ""
+                return (
+                    f"需要 {c.required_instances} 个实例，当前 {c.instances} 个"
+                    f"（积压 {c.queue_length:.1f}{forecast}，到达 {c.arrival_rate:.3f}/s，单实例 {service}）"
+                )
+
+            # 3. 在空闲GPU上部署，GPU不足时替换闲置模型
+            unplaced = place(requests, busy_reason)
+            if unplaced:
+                logger.info(f"没有足够的GPU为以下模型扩容: {[m.model_name for m in unplaced]}")
+
+        # 4. 保证每个模型的最少实例数（只使用空闲GPU）
+        if not observation.online_nodes:
+            logger.info("没有在线节点，跳过保底实例检查。")
+            return plan
+
+        requests = []
+        for m in observation.all_models:
+            groups = [(k, "free") for k in nodes_by_model.get(m.model_name, []) if free_slots[k]]
+            running = running_instances.get(m.model_name, 0)
+            for total in range(running + 1, self.min_instances(m) + 1):
+                requests.append(PlacementRequest(model=m, value=recent_stats.get(m.id, 0) / total, groups=groups))
+        if requests:
+            logger.info(f"模型 {sorted({r.model.model_name for r in requests})} 实例数低于最少实例数，尝试启动保底实例。")
+            unplaced = place(requests, "实例数低于最少实例数，启动保底实例")
+            if unplaced:
+                logger.info(f"没有可用的GPU启动保底实例: {[m.model_name for m in unplaced]}")
+
+        return plan
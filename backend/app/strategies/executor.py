@@ -0,0 +1,120 @@
+"""
+部署计划执行器
+不同节点、不同GPU上的操作并发执行，同一GPU上的操作按 stop → start/replace 顺序串行执行；
+并发受全局和单节点上限约束，每个操作有独立的超时时间
+"""
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..services import node_client
+from ..services.cluster_state import cluster_state_cache
+from .plan import DeploymentAction, DeploymentPlan
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ActionResult:
+    """单个操作的执行结果"""
+    action: DeploymentAction
+    success: bool
+    error: Optional[str] = None
+    duration_ms: float = 0.0
+    skipped: bool = False  # 同一GPU上的前序操作失败时跳过
+
+@dataclass
+class ExecutionReport:
+    """部署计划的执行报告，results 与计划中的操作顺序一致"""
+    results: List[ActionResult] = field(default_factory=list)
+    duration_ms: float = 0.0
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for r in self.results if r.success)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results if not r.success and not r.skipped)
+
+    @property
+    def skipped(self) -> int:
+        return sum(1 for r in self.results if r.skipped)
+
+def group_actions_by_gpu(actions: List[DeploymentAction]) -> Dict[Tuple[str, int], List[int]]:
+    """按 (节点, GPU) 分组，返回计划中操作的下标；组内 stop 排在前面，其余保持计划顺序"""
+    groups: Dict[Tuple[str, int], List[int]] = {}
+    for index, action in enumerate(actions):
+        groups.setdefault((action.node_key, action.gpu_id), []).append(index)
+    for indexes in groups.values():
+        indexes.sort(key=lambda i: 0 if actions[i].action == "stop" else 1)
+    return groups
+
+async def _apply_action(action: DeploymentAction):
+    client = node_client.node_manager.get_client(action.node_ip, action.node_port)
+    if action.action == "replace":
+        logger.info(f"在节点 {action.node_ip} 的 GPU {action.gpu_id} 上将模型 {action.old_model_name} 替换为 {action.model_name}: {action.reason}")
+        await client.stop_model(action.old_model_name, action.gpu_id)
+        await client.start_model(action.model_name, action.gpu_id)
+    elif action.action == "stop":
+        logger.info(f"在节点 {action.node_ip} 的 GPU {action.gpu_id} 上停止模型 {action.model_name}: {action.reason}")
+        await client.stop_model(action.model_name, action.gpu_id)
+    else:
+        logger.info(f"在节点 {action.node_ip} 的 GPU {action.gpu_id} 上启动模型 {action.model_name}: {action.reason}")
+        await client.start_model(action.model_name, action.gpu_id)
+
+async def execute_action(action: DeploymentAction, timeout: Optional[float] = None) -> ActionResult:
+    """执行单个操作，replace 先停止旧模型再启动新模型"""
+    timeout = timeout if timeout is not None else settings.ACTUATION_ACTION_TIMEOUT
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(_apply_action(action), timeout=timeout)
+        return ActionResult(action, True, duration_ms=(time.perf_counter() - started) * 1000)
+    except asyncio.TimeoutError:
+        logger.error(f"执行 {action.action} 模型 {action.model_name} 超时（{timeout}s），节点 {action.node_key}")
+        return ActionResult(action, False, error=f"超时（{timeout}s）", duration_ms=(time.perf_counter() - started) * 1000)
+    except Exception as e:
+        logger.error(f"执行 {action.action} 模型 {action.model_name} 失败: {e}")
+        return ActionResult(action, False, error=str(e), duration_ms=(time.perf_counter() - started) * 1000)
+    finally:
+        # 已操作过的节点状态已过期，需重新获取
+        cluster_state_cache.invalidate(action.node_key)
+
+async def execute_plan(
+    plan: DeploymentPlan,
+    concurrency: Optional[int] = None,
+    per_node_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> ExecutionReport:
+    """并发执行部署计划，总耗时取决于最慢的节点而不是所有操作之和"""
+    started = time.perf_counter()
+    actions = plan.actions
+    results: List[Optional[ActionResult]] = [None] * len(actions)
+
+    global_semaphore = asyncio.Semaphore(concurrency or settings.ACTUATION_CONCURRENCY)
+    per_node_limit = per_node_concurrency or settings.ACTUATION_PER_NODE_CONCURRENCY
+    node_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def run_gpu_group(indexes: List[int]):
+        failed = False
+        for index in indexes:
+            action = actions[index]
+            if failed:
+                results[index] = ActionResult(action, False, error="同一GPU上的前序操作失败，已跳过", skipped=True)
+                continue
+            node_semaphore = node_semaphores.setdefault(action.node_key, asyncio.Semaphore(per_node_limit))
+            # 先取节点的名额再取全局名额：等待繁忙节点的操作不占用全局名额，其他节点的操作不被阻塞
+            async with node_semaphore, global_semaphore:
+                results[index] = await execute_action(action, timeout)
+            failed = not results[index].success
+
+    await asyncio.gather(*(run_gpu_group(indexes) for indexes in group_actions_by_gpu(actions).values()))
+
+    report = ExecutionReport(results=results, duration_ms=(time.perf_counter() - started) * 1000)
+    logger.info(
+        f"部署计划执行完成: 成功 {report.succeeded} 个, 失败 {report.failed} 个, 跳过 {report.skipped} 个, "
+        f"耗时 {report.duration_ms:.1f}ms"
+    )
+    return report
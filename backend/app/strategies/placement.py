@@ -0,0 +1,89 @@
+"""
+GPU分配求解
+将待部署的模型分配到空闲/可替换的GPU上，使被分配模型的预期排空收益之和最大。
+
+同一节点上同类（空闲或可替换）的GPU对兼容性而言是等价的，因此把它们合并为一个带容量的槽位组，
+问题化为 模型 × 槽位组 的带容量二分匹配。每个模型的收益只与模型本身有关，
+可匹配的模型集合构成横截拟阵，按收益从高到低贪心加入、并用增广路径调整已有分配即可得到最优解；
+增广时优先尝试空闲GPU，尽量减少替换。
+一次增广失败时搜索到的槽位组都已满，且其中的模型无法挪出，之后也不可能再被使用，直接剪枝。
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+@dataclass
+class PlacementRequest:
+    """一个待部署的模型"""
+    model: Any
+    value: float  # 分配成功的收益，如可被排空的队列积压（秒）
+    groups: List[Hashable] = field(default_factory=list)  # 可用的槽位组，按优先级排列
+
+def solve_placement(
+    requests: Sequence[PlacementRequest],
+    capacity: Dict[Hashable, int],
+) -> Dict[int, Hashable]:
+    """求解分配，返回 {请求下标: 槽位组}；未出现在结果中的请求无法分配"""
+    remaining = dict(capacity)
+    assigned: Dict[int, Hashable] = {}
+    members: Dict[Hashable, List[int]] = {group: [] for group in capacity}
+    free_total = sum(capacity.values())
+    dead = set()
+
+    def place(index: int, group: Hashable):
+        assigned[index] = group
+        members[group].append(index)
+        remaining[group] -= 1
+
+    def unplace(index: int):
+        group = assigned.pop(index)
+        members[group].remove(index)
+        remaining[group] += 1
+
+    order = sorted(range(len(requests)), key=lambda i: requests[i].value, reverse=True)
+    for index in order:
+        if free_total <= 0:
+            break
+        # 快速路径：直接有剩余容量的槽位组（有剩余容量的槽位组不会被剪枝）
+        target = next((g for g in requests[index].groups if remaining.get(g, 0) > 0), None)
+        if target is not None:
+            place(index, target)
+            free_total -= 1
+            continue
+
+        groups = [g for g in requests[index].groups if g in remaining and g not in dead]
+        if not groups:
+            continue
+
+        # 增广路径：从已满的槽位组中挪走一个模型到其他有容量的槽位组
+        parent: Dict[Hashable, Optional[tuple]] = {g: None for g in groups}
+        queue = deque(groups)
+        found = None
+        while queue and found is None:
+            group = queue.popleft()
+            for other in members[group]:
+                for next_group in requests[other].groups:
+                    if next_group in parent or next_group not in remaining or next_group in dead:
+                        continue
+                    parent[next_group] = (group, other)
+                    if remaining[next_group] > 0:
+                        found = next_group
+                        break
+                    queue.append(next_group)
+                if found is not None:
+                    break
+        if found is None:
+            dead.update(parent)
+            continue
+
+        # 沿路径回溯，依次把模型挪到下一个槽位组
+        group = found
+        while parent[group] is not None:
+            previous, moved = parent[group]
+            unplace(moved)
+            place(moved, group)
+            group = previous
+        place(index, group)
+        free_total -= 1
+
+    return assigned
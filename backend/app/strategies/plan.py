@@ -0,0 +1,44 @@
+"""
+部署计划
+策略的决策结果，由执行器负责实际调用节点API
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+@dataclass
+class DeploymentAction:
+    """单个部署操作"""
+    action: str  # start, stop, replace
+    node_id: int
+    node_ip: str
+    node_port: int
+    gpu_id: int
+    model_name: str  # start/replace 为要启动的模型，stop 为要停止的模型
+    old_model_name: Optional[str] = None  # replace 时被替换的模型
+    reason: str = ""
+    # 预计队列排空时间（秒）：执行前后对比，None 表示处理能力不足、无法排空
+    drain_seconds_before: Optional[float] = None
+    drain_seconds_after: Optional[float] = None
+
+    @property
+    def node_key(self) -> str:
+        return f"{self.node_ip}:{self.node_port}"
+
+@dataclass
+class DeploymentPlan:
+    """策略一次决策产生的部署计划"""
+    strategy: str
+    actions: List[DeploymentAction] = field(default_factory=list)
+    decision_ms: float = 0.0  # plan 阶段耗时（毫秒）
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def add(self, action: DeploymentAction):
+        self.actions.append(action)
+
+    def summary(self) -> str:
+        counts = {}
+        for action in self.actions:
+            counts[action.action] = counts.get(action.action, 0) + 1
+        detail = ", ".join(f"{name} {count}" for name, count in counts.items()) or "无操作"
+        return f"策略 '{self.strategy}' 生成 {len(self.actions)} 个操作 ({detail})，决策耗时 {self.decision_ms:.2f}ms"
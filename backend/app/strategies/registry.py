@@ -0,0 +1,35 @@
+"""
+调度策略注册表
+"""
+from typing import Any, Dict, List, Optional, Type, Union
+
+from .base import BaseStrategy
+
+STRATEGY_REGISTRY: Dict[str, Type[BaseStrategy]] = {}
+
+def register_strategy(cls: Type[BaseStrategy]) -> Type[BaseStrategy]:
+    """注册策略类（类装饰器）"""
+    if not cls.name:
+        raise ValueError(f"策略 {cls.__name__} 未设置 name")
+    STRATEGY_REGISTRY[cls.name] = cls
+    return cls
+
+def get_strategy_class(name: str) -> Optional[Type[BaseStrategy]]:
+    """按名称获取策略类，未注册返回 None"""
+    return STRATEGY_REGISTRY.get(name)
+
+def create_strategy(name: str, raw_params: Optional[Union[str, Dict[str, Any]]] = None) -> BaseStrategy:
+    """按名称和参数创建策略实例，未注册抛出 KeyError，参数非法抛出 pydantic.ValidationError"""
+    strategy_cls = STRATEGY_REGISTRY[name]
+    return strategy_cls(strategy_cls.parse_parameters(raw_params))
+
+def list_strategies() -> List[Dict[str, Any]]:
+    """列出所有已注册策略及其参数的 JSON Schema"""
+    return [
+        {
+            "name": cls.name,
+            "description": cls.description,
+            "parameters_schema": cls.Params.model_json_schema(),
+        }
+        for cls in STRATEGY_REGISTRY.values()
+    ]
@@ -0,0 +1,4 @@
+"""
+控制面压测与基准测试工具
+包含可在单进程内模拟上千个节点的节点集群、RabbitMQ管理API替身以及基准测试
+"""
@@ -0,0 +1,329 @@
+"""
+模拟节点集群
+在单个进程、单个事件循环中模拟上千个节点，实现完整的 Model Inference Client API
+（/api/v1/gpus、/api/v1/models/status、/api/v1/models/start|stop、/api/v1/processes/{pid} 等），
+用于在没有GPU硬件的情况下压测 NodeManager 的批量请求和调度器。
+
+所有节点共用一个ASGI应用，按请求的 Host 头（ip:port）区分节点，支持两种寻址方式：
+  ports: 所有节点使用 127.0.0.1，每个节点监听一个端口（base_port 起连续分配）
+  ips:   所有节点使用同一个端口，节点地址为 127.0.x.y（Linux 下整个 127.0.0.0/8 都指向本机，需监听 0.0.0.0）
+
+可注入启动/停止耗时、请求失败、请求超时以及少量慢节点（长尾延迟）。
+
+运行：
+  python -m benchmarks.mock_node_fleet --nodes 1000 --mode ports --base-port 7000
+  python -m benchmarks.mock_node_fleet --nodes 1000 --mode ips --base-port 6004 \
+      --register http://127.0.0.1:8000 --environment-id 1
+"""
+import asyncio
+import argparse
+import itertools
+import logging
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+
+from .servers import ServerThread, bind_sockets, raise_open_file_limit
+
+logger = logging.getLogger(__name__)
+
+MOCK_GPU_MEMORY_TOTAL = 24 * 1024  # 24GB，单位MB
+MOCK_GPU_POWER_LIMIT = 450
+
+@dataclass
+class FleetConfig:
+    """模拟节点集群配置"""
+    gpus_per_node: int = 8
+    models: List[str] = field(default_factory=lambda: ["MAM", "FastFitAll"])
+    start_latency: float = 2.0  # 启动模型耗时（秒）
+    stop_latency: float = 0.5  # 停止模型耗时（秒）
+    request_latency: float = 0.0  # 其他请求的基础延迟（秒）
+    latency_jitter: float = 0.2  # 延迟的相对随机抖动
+    failure_rate: float = 0.0  # 请求返回 500 的概率
+    timeout_rate: float = 0.0  # 请求挂起 hang_seconds 秒（触发调用方超时）的概率
+    hang_seconds: float = 60.0
+    slow_node_fraction: float = 0.0  # 慢节点的比例
+    slow_node_latency: float = 2.0  # 慢节点每个请求额外增加的延迟（秒）
+    seed: int = 0
+
+class VirtualNode:
+    """单个模拟节点的状态"""
+
+    def __init__(self, key: str, gpu_count: int, slow: bool):
+        self.key = key
+        self.gpu_count = gpu_count
+        self.slow = slow
+        self.instances: Dict[int, Dict[str, Any]] = {}  # gpu_id -> 模型实例
+
+class MockFleet:
+    """模拟节点集群的状态和统计"""
+
+    def __init__(self, config: FleetConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.nodes: Dict[str, VirtualNode] = {}
+        self.processes: Dict[int, Tuple[str, int]] = {}  # pid -> (节点, gpu_id)
+        self._pids = itertools.count(10000)
+        self.requests = 0
+        self.injected_failures = 0
+        self.injected_timeouts = 0
+
+    def node(self, host: str) -> VirtualNode:
+        """按 Host 头获取节点，第一次访问时创建；是否为慢节点由节点地址决定，重启后保持一致"""
+        node = self.nodes.get(host)
+        if node is None:
+            slow = random.Random(f"{self.config.seed}:{host}").random() < self.config.slow_node_fraction
+            node = self.nodes[host] = VirtualNode(host, self.config.gpus_per_node, slow)
+        return node
+
+    def latency(self, base: float) -> float:
+        jitter = self.config.latency_jitter
+        return max(base * (1 + self.random.uniform(-jitter, jitter)), 0.0)
+
+    def reset(self):
+        self.nodes.clear()
+        self.processes.clear()
+        self.requests = self.injected_failures = self.injected_timeouts = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "nodes": len(self.nodes),
+            "slow_nodes": sum(1 for n in self.nodes.values() if n.slow),
+            "instances": sum(len(n.instances) for n in self.nodes.values()),
+            "requests": self.requests,
+            "injected_failures": self.injected_failures,
+            "injected_timeouts": self.injected_timeouts,
+        }
+
+def create_fleet_app(config: Optional[FleetConfig] = None) -> FastAPI:
+    """创建模拟节点集群的ASGI应用"""
+    fleet = MockFleet(config or FleetConfig())
+    app = FastAPI(title="Mock Node Fleet", description="模拟上千个 Model Inference Client 节点")
+    app.state.fleet = fleet
+
+    async def current_node(request: Request) -> VirtualNode:
+        """识别节点并注入延迟、失败和超时"""
+        node = fleet.node(request.headers.get("host", "unknown"))
+        fleet.requests += 1
+        cfg = fleet.config
+        delay = cfg.request_latency + (cfg.slow_node_latency if node.slow else 0.0)
+        if delay > 0:
+            await asyncio.sleep(fleet.latency(delay))
+        roll = fleet.random.random()
+        if roll < cfg.timeout_rate:
+            fleet.injected_timeouts += 1
+            await asyncio.sleep(cfg.hang_seconds)
+        elif roll < cfg.timeout_rate + cfg.failure_rate:
+            fleet.injected_failures += 1
+            raise HTTPException(status_code=500, detail="injected failure")
+        return node
+
+    @app.get("/")
+    async def read_root(node: VirtualNode = Depends(current_node)):
+        """健康检查"""
+        return {"status": "ok", "message": f"Mock node {node.key} is running."}
+
+    router = APIRouter()
+
+    @router.get("/gpus", response_model=List[Dict[str, Any]])
+    async def get_gpu_status(node: VirtualNode = Depends(current_node)):
+        rng = fleet.random
+        gpus = []
+        for gpu_id in range(node.gpu_count):
+            running = gpu_id in node.instances
+            gpus.append({
+                "gpu_id": gpu_id,
+                "load": round(rng.uniform(15, 40) if running else rng.uniform(1, 5), 2),
+                "memory_used": round(rng.uniform(8 * 1024, 16 * 1024) if running else rng.uniform(200, 800), 2),
+                "memory_total": MOCK_GPU_MEMORY_TOTAL,
+                "power_usage": round(rng.uniform(200, 350) if running else rng.uniform(50, 100), 2),
+                "power_limit": MOCK_GPU_POWER_LIMIT,
+                "temperature": round(rng.uniform(45, 75), 1),
+            })
+        return gpus
+
+    @router.get("/models/status", response_model=List[Dict[str, Any]])
+    async def get_all_model_statuses(node: VirtualNode = Depends(current_node)):
+        return list(node.instances.values())
+
+    @router.get("/models/status/{model_name}", response_model=List[Dict[str, Any]])
+    async def get_model_status(model_name: str, node: VirtualNode = Depends(current_node)):
+        return [ins for ins in node.instances.values() if ins["model_name"] == model_name]
+
+    @router.get("/models/supported", response_model=Dict[str, str])
+    async def get_supported_models(node: VirtualNode = Depends(current_node)):
+        return {name: f"mock model {name}" for name in fleet.config.models}
+
+    @router.post("/models/start")
+    async def start_model(payload: Dict[str, Any], node: VirtualNode = Depends(current_node)):
+        model_name = payload.get("model_name")
+        gpu_id = payload.get("gpu_id")
+        if model_name is None or gpu_id is None:
+            raise HTTPException(status_code=400, detail="model_name and gpu_id are required.")
+        gpu_id = int(gpu_id)
+        if not 0 <= gpu_id < node.gpu_count:
+            raise HTTPException(status_code=400, detail=f"GPU {gpu_id} does not exist.")
+        if model_name not in fleet.config.models:
+            raise HTTPException(status_code=400, detail=f"Model '{model_name}' is not supported.")
+        if gpu_id in node.instances:
+            raise HTTPException(status_code=409, detail=f"GPU {gpu_id} is already in use by model {node.instances[gpu_id]['model_name']}.")
+
+        pid = next(fleet._pids)
+        instance = {
+            "model_name": model_name,
+            "gpu_id": gpu_id,
+            "pid": pid,
+            "status": "STARTING",
+            "start_time": asyncio.get_running_loop().time(),
+        }
+        # 启动期间GPU已被占用
+        node.instances[gpu_id] = instance
+        fleet.processes[pid] = (node.key, gpu_id)
+        await asyncio.sleep(fleet.latency(fleet.config.start_latency))
+        if node.instances.get(gpu_id) is not instance:
+            raise HTTPException(status_code=409, detail=f"Model '{model_name}' on GPU {gpu_id} was stopped while starting.")
+        instance["status"] = "RUNNING"
+        return {"status": "success", "message": f"Model '{model_name}' started on GPU {gpu_id}.", "instance": instance}
+
+    @router.post("/models/stop")
+    async def stop_model(payload: Dict[str, Any], node: VirtualNode = Depends(current_node)):
+        gpu_id = payload.get("gpu_id")
+        if gpu_id is None:
+            raise HTTPException(status_code=400, detail="gpu_id is required.")
+        instance = node.instances.get(int(gpu_id))
+        model_name = payload.get("model_name")
+        if instance is None or (model_name is not None and instance["model_name"] != model_name):
+            raise HTTPException(status_code=404, detail=f"No model found running on GPU {gpu_id}.")
+        await asyncio.sleep(fleet.latency(fleet.config.stop_latency))
+        if node.instances.get(int(gpu_id)) is instance:
+            del node.instances[int(gpu_id)]
+            fleet.processes.pop(instance["pid"], None)
+        return {"status": "success", "message": f"Model '{instance['model_name']}' stopped on GPU {gpu_id}."}
+
+    @router.delete("/processes/{pid}")
+    async def kill_process(pid: int, node: VirtualNode = Depends(current_node)):
+        location = fleet.processes.get(pid)
+        if location is None or location[0] != node.key:
+            raise HTTPException(status_code=404, detail=f"Process {pid} not found.")
+        fleet.processes.pop(pid)
+        instance = node.instances.pop(location[1], None)
+        return {"status": "success", "message": f"Process {pid} killed.", "instance": instance}
+
+    app.include_router(router, prefix="/api/v1")
+
+    @app.get("/fleet/stats")
+    async def fleet_stats():
+        """集群统计（不经过故障注入）"""
+        return fleet.stats()
+
+    @app.post("/fleet/reset")
+    async def fleet_reset():
+        fleet.reset()
+        return fleet.stats()
+
+    return app
+
+def fleet_addresses(count: int, mode: str, base_port: int) -> List[Tuple[str, int]]:
+    """按寻址方式生成节点地址"""
+    if mode == "ports":
+        return [("127.0.0.1", base_port + i) for i in range(count)]
+    if mode == "ips":
+        return [(f"127.0.{i // 250}.{i % 250 + 1}", base_port) for i in range(count)]
+    raise ValueError(f"未知的寻址方式: {mode}")
+
+def bind_fleet(count: int, mode: str = "ports", base_port: int = 0, bind_host: Optional[str] = None):
+    """
+    绑定节点集群的监听端口，返回 (sockets, 节点地址列表)。
+    base_port 为 0 时由系统分配端口（ports 方式下每个节点一个随机端口）
+    """
+    if mode == "ports":
+        raise_open_file_limit(count + 256)
+        sockets = bind_sockets(bind_host or "127.0.0.1", [base_port + i if base_port else 0 for i in range(count)])
+        return sockets, [("127.0.0.1", sock.getsockname()[1]) for sock in sockets]
+    sockets = bind_sockets(bind_host or "0.0.0.0", [base_port])
+    return sockets, fleet_addresses(count, mode, sockets[0].getsockname()[1])
+
+def start_fleet(
+    count: int,
+    config: Optional[FleetConfig] = None,
+    mode: str = "ports",
+    base_port: int = 0,
+) -> Tuple[ServerThread, List[Dict[str, Any]]]:
+    """在后台线程中启动模拟节点集群，返回服务线程和节点列表（node_ip/node_port/available_gpu_ids/available_models）"""
+    config = config or FleetConfig()
+    sockets, addresses = bind_fleet(count, mode, base_port)
+    server = ServerThread(create_fleet_app(config), sockets).start()
+    return server, [node_payload(ip, port, config) for ip, port in addresses]
+
+def node_payload(node_ip: str, node_port: int, config: FleetConfig, environment_id: int = 1) -> Dict[str, Any]:
+    """节点注册请求体（与 POST /api/v1/nodes 一致）"""
+    return {
+        "environment_id": environment_id,
+        "node_ip": node_ip,
+        "node_port": node_port,
+        "available_gpu_ids": [str(i) for i in range(config.gpus_per_node)],
+        "available_models": list(config.models),
+    }
+
+def register_nodes(api_base: str, nodes: List[Dict[str, Any]]) -> int:
+    """通过控制面API注册节点，返回成功注册的数量"""
+    registered = 0
+    with httpx.Client(base_url=api_base, timeout=30) as client:
+        for payload in nodes:
+            response = client.post("/api/v1/nodes/", json=payload)
+            if response.status_code < 300:
+                registered += 1
+            else:
+                logger.warning(f"注册节点 {payload['node_ip']}:{payload['node_port']} 失败: {response.text}")
+    return registered
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.mock_node_fleet", description="模拟节点集群")
+    parser.add_argument("--nodes", type=int, default=100)
+    parser.add_argument("--mode", choices=["ports", "ips"], default="ports")
+    parser.add_argument("--base-port", type=int, default=7000, help="ports: 第一个节点的端口；ips: 所有节点共用的端口")
+    parser.add_argument("--bind", help="监听地址，默认 ports 为 127.0.0.1，ips 为 0.0.0.0")
+    parser.add_argument("--gpus", type=int, default=8, help="每个节点的GPU数量")
+    parser.add_argument("--models", default="MAM,FastFitAll", help="节点支持的模型，逗号分隔")
+    parser.add_argument("--start-latency", type=float, default=2.0)
+    parser.add_argument("--stop-latency", type=float, default=0.5)
+    parser.add_argument("--request-latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--register", metavar="API_BASE", help="启动前通过控制面API注册所有节点，例如 http://127.0.0.1:8000")
+    parser.add_argument("--environment-id", type=int, default=1)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    config = FleetConfig(
+        gpus_per_node=args.gpus,
+        models=[m.strip() for m in args.models.split(",") if m.strip()],
+        start_latency=args.start_latency,
+        stop_latency=args.stop_latency,
+        request_latency=args.request_latency,
+        failure_rate=args.failure_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        slow_node_fraction=args.slow_fraction,
+        slow_node_latency=args.slow_latency,
+        seed=args.seed,
+    )
+    sockets, addresses = bind_fleet(args.nodes, args.mode, args.base_port, args.bind)
+    logger.info(f"模拟 {len(addresses)} 个节点: {addresses[0][0]}:{addresses[0][1]} ... {addresses[-1][0]}:{addresses[-1][1]}")
+    if args.register:
+        payloads = [node_payload(ip, port, config, args.environment_id) for ip, port in addresses]
+        logger.info(f"已注册 {register_nodes(args.register, payloads)} 个节点到 {args.register}")
+
+    server = uvicorn.Server(uvicorn.Config(create_fleet_app(config), log_level="warning", access_log=False, backlog=1024))
+    asyncio.run(server.serve(sockets=sockets))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+RabbitMQ管理API替身
+实现 record_queue_lengths 与 /api/v1/queues/{model_id} 用到的管理API：
+  GET /api/queues、/api/queues/{vhost}、/api/queues/{vhost}/{name}
+支持 Basic 认证、columns 字段过滤、分页（page/page_size/name），以及可配置的请求延迟、失败和超时。
+
+每个队列的深度按脚本化的曲线随时间变化（constant/sine/ramp/spike/steps），
+消费速率 = 消费者数 × 单个消费者的速率，发布速率 = 消费速率 + 深度的变化率。
+时钟默认随墙上时间推进，也可以通过 POST /fake/clock 固定到指定的秒数，便于压测时按轮次推进。
+
+运行：
+  python -m benchmarks.mock_rabbitmq --queues 5000 --vhosts 4 --port 15672
+  python -m benchmarks.mock_rabbitmq --script queues.json --latency 0.05 --failure-rate 0.01
+
+队列脚本（JSON）为队列列表，例如：
+  [{"name": "ocr", "vhost": "/", "consumers": 4, "consumer_rate": 2.0,
+    "curve": {"kind": "sine", "base": 200, "amplitude": 150, "period": 86400}}]
+"""
+import sys
+import json
+import time
+import math
+import base64
+import socket
+import asyncio
+import argparse
+import logging
+import random
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from .servers import ServerThread, bind_sockets
+
+logger = logging.getLogger(__name__)
+
+CURVE_KINDS = ("constant", "sine", "ramp", "spike", "steps")
+
+@dataclass
+class DepthCurve:
+    """队列深度随时间（秒）变化的曲线"""
+    kind: str = "constant"
+    base: float = 0.0
+    amplitude: float = 0.0  # sine: 振幅；spike: 峰值高度
+    period: float = 86400.0  # sine 的周期；steps 大于0时循环
+    phase: float = 0.0  # 秒
+    slope: float = 0.0  # ramp: 每秒增长的消息数
+    every: float = 3600.0  # spike: 间隔（秒）
+    duration: float = 300.0  # spike: 持续时间（秒）
+    points: List[Tuple[float, float]] = field(default_factory=list)  # steps: [(起始秒数, 深度)]
+    noise: float = 0.0  # 相对随机扰动，同一时刻结果确定
+    seed: int = 0
+
+    def depth(self, t: float) -> int:
+        t += self.phase
+        if self.kind == "sine":
+            value = self.base + self.amplitude * math.sin(2 * math.pi * t / self.period)
+        elif self.kind == "ramp":
+            value = self.base + self.slope * t
+        elif self.kind == "spike":
+            value = self.base + (self.amplitude if t % self.every < self.duration else 0.0)
+        elif self.kind == "steps":
+            if self.period > 0:
+                t %= self.period
+            value = self.base
+            for start, depth in self.points:
+                if start > t:
+                    break
+                value = depth
+        else:
+            value = self.base
+        if self.noise and value > 0:
+            # 按 (seed, 整秒) 生成确定的扰动，避免为每个队列维护随机数发生器
+            h = (self.seed * 2654435761 + int(t) * 40503) & 0xFFFFFFFF
+            value *= 1 + self.noise * (h / 0xFFFFFFFF * 2 - 1)
+        return max(int(value), 0)
+
+@dataclass
+class QueueSpec:
+    """模拟队列"""
+    name: str
+    vhost: str = "/"
+    consumers: int = 1
+    consumer_rate: float = 1.0  # 单个消费者每秒处理的消息数
+    curve: DepthCurve = field(default_factory=DepthCurve)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueueSpec":
+        data = dict(data)
+        curve = data.pop("curve", None) or {}
+        if curve.get("kind", "constant") not in CURVE_KINDS:
+            raise ValueError(f"未知的曲线类型: {curve['kind']}")
+        curve["points"] = [tuple(p) for p in curve.get("points", [])]
+        return cls(curve=DepthCurve(**curve), **data)
+
+@dataclass
+class BrokerConfig:
+    """RabbitMQ替身配置"""
+    users: Dict[str, str] = field(default_factory=lambda: {"guest": "guest"})
+    request_latency: float = 0.0  # 每个请求的基础延迟（秒）
+    latency_per_queue: float = 0.0  # 每返回一个队列增加的延迟（秒），模拟管理API随队列数变慢
+    latency_jitter: float = 0.2  # 延迟的相对随机抖动
+    failure_rate: float = 0.0  # 请求返回 500 的概率
+    timeout_rate: float = 0.0  # 请求挂起 hang_seconds 秒的概率
+    hang_seconds: float = 60.0
+    time_scale: float = 1.0  # 墙上时间每秒对应的曲线时间（秒）
+    seed: int = 0
+
+def generate_queues(count: int, vhosts: int = 1, seed: int = 0, prefix: str = "queue") -> List[QueueSpec]:
+    """按固定随机种子生成一组队列，各类曲线混合"""
+    rng = random.Random(seed)
+    vhost_names = ["/"] + [f"vhost-{i}" for i in range(1, vhosts)]
+    queues = []
+    for i in range(count):
+        kind = CURVE_KINDS[i % len(CURVE_KINDS)]
+        base = rng.choice([0, 0, 5, 20, 100, 500])
+        curve = DepthCurve(kind=kind, base=base, noise=0.1, seed=seed * 1000003 + i, phase=rng.uniform(0, 86400))
+        if kind == "sine":
+            curve.amplitude = base or rng.uniform(10, 200)
+            curve.base = max(base, curve.amplitude)
+        elif kind == "ramp":
+            curve.slope = rng.uniform(-0.05, 0.2)
+        elif kind == "spike":
+            curve.amplitude = rng.uniform(100, 5000)
+            curve.every = rng.choice([900, 3600, 4 * 3600])
+            curve.duration = rng.uniform(60, 600)
+        elif kind == "steps":
+            curve.period = 86400
+            curve.points = sorted((rng.uniform(0, 86400), rng.uniform(0, 1000)) for _ in range(4))
+        queues.append(QueueSpec(
+            name=f"{prefix}-{i:05d}",
+            vhost=vhost_names[i % len(vhost_names)],
+            consumers=rng.randint(0, 8),
+            consumer_rate=round(rng.uniform(0.5, 5.0), 2),
+            curve=curve,
+        ))
+    return queues
+
+def load_queue_script(path: str) -> List[QueueSpec]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [QueueSpec.from_dict(item) for item in json.load(f)]
+
+def select_columns(item: Dict[str, Any], columns: List[List[str]]) -> Dict[str, Any]:
+    """按 columns 参数（逗号分隔，支持 a.b.c 形式的嵌套字段）保留字段，不存在的字段不返回"""
+    result: Dict[str, Any] = {}
+    for path in columns:
+        value: Any = item
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = result
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+    return result
+
+class MockBroker:
+    """RabbitMQ替身的队列、时钟和统计"""
+
+    def __init__(self, queues: List[QueueSpec], config: BrokerConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.queues: Dict[str, Dict[str, QueueSpec]] = {}
+        for queue in queues:
+            self.queues.setdefault(queue.vhost, {})[queue.name] = queue
+        self._started = time.monotonic()
+        self.frozen_time: Optional[float] = None
+        self.requests = 0
+        self.injected_failures = 0
+        self.injected_timeouts = 0
+        self.bytes_sent = 0
+
+    def now(self) -> float:
+        """当前的曲线时间（秒）"""
+        if self.frozen_time is not None:
+            return self.frozen_time
+        return (time.monotonic() - self._started) * self.config.time_scale
+
+    def latency(self, base: float) -> float:
+        jitter = self.config.latency_jitter
+        return max(base * (1 + self.random.uniform(-jitter, jitter)), 0.0)
+
+    def authorized(self, header: Optional[str]) -> bool:
+        if not header or not header.startswith("Basic "):
+            return False
+        try:
+            username, _, password = base64.b64decode(header[6:]).decode("utf-8").partition(":")
+        except Exception:
+            return False
+        return self.config.users.get(username) == password
+
+    def queue_info(self, queue: QueueSpec, t: float) -> Dict[str, Any]:
+        """与管理API返回的队列对象格式一致（只包含常用字段）"""
+        depth = queue.curve.depth(t)
+        change = depth - queue.curve.depth(t - 1)
+        deliver_rate = queue.consumers * queue.consumer_rate if depth > 0 else 0.0
+        publish_rate = max(deliver_rate + change, 0.0)
+        unacked = min(depth, queue.consumers)
+        info = {
+            "name": queue.name,
+            "vhost": queue.vhost,
+            "durable": True,
+            "auto_delete": False,
+            "exclusive": False,
+            "arguments": {"x-queue-type": "classic"},
+            "node": "rabbit@mock",
+            "state": "running",
+            "type": "classic",
+            "messages": depth,
+            "messages_details": {"rate": float(change)},
+            "messages_ready": depth - unacked,
+            "messages_ready_details": {"rate": float(change)},
+            "messages_unacknowledged": unacked,
+            "messages_unacknowledged_details": {"rate": 0.0},
+            "consumers": queue.consumers,
+            "consumer_utilisation": 1.0 if depth > 0 and queue.consumers else None,
+            "memory": 10000 + depth * 600,
+            "message_bytes": depth * 512,
+            "message_stats": {
+                "publish": int(publish_rate * t),
+                "publish_details": {"rate": publish_rate},
+                "deliver_get": int(deliver_rate * t),
+                "deliver_get_details": {"rate": deliver_rate},
+                "ack": int(deliver_rate * t),
+                "ack_details": {"rate": deliver_rate},
+            },
+            "backing_queue_status": {
+                "mode": "default",
+                "len": depth,
+                "q1": 0, "q2": 0, "q3": 0, "q4": depth,
+                "avg_ingress_rate": publish_rate,
+                "avg_egress_rate": deliver_rate,
+            },
+        }
+        if depth == 0 and deliver_rate == 0:
+            info["idle_since"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - 60))
+        return info
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "vhosts": len(self.queues),
+            "queues": sum(len(q) for q in self.queues.values()),
+            "clock": self.now(),
+            "requests": self.requests,
+            "injected_failures": self.injected_failures,
+            "injected_timeouts": self.injected_timeouts,
+            "bytes_sent": self.bytes_sent,
+        }
+
+def _error(status_code: int, error: str, reason: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse({"error": error, "reason": reason}, status_code=status_code, headers=headers)
+
+def create_broker_app(queues: List[QueueSpec], config: Optional[BrokerConfig] = None) -> FastAPI:
+    """创建RabbitMQ管理API替身的ASGI应用"""
+    broker = MockBroker(queues, config or BrokerConfig())
+    app = FastAPI(title="Mock RabbitMQ Management API", description="RabbitMQ管理API替身")
+    app.state.broker = broker
+
+    @app.get("/api/queues")
+    @app.get("/api/queues/{path:path}")
+    async def list_queues(request: Request, path: str = ""):
+        cfg = broker.config
+        broker.requests += 1
+        if not broker.authorized(request.headers.get("authorization")):
+            return _error(401, "not_authorized", "Login failed", {"WWW-Authenticate": 'Basic realm="RabbitMQ Management"'})
+
+        # vhost 和队列名可能包含编码后的 "/"（%2F），需要按原始路径拆分后再解码
+        raw_path = request.scope.get("raw_path", b"").decode("latin-1").split("?", 1)[0]
+        segments = [unquote(s) for s in raw_path[len("/api/queues"):].strip("/").split("/") if s]
+        if len(segments) > 2:
+            return _error(404, "Object Not Found", "Not Found")
+
+        if segments and segments[0] not in broker.queues:
+            items: List[QueueSpec] = []
+            found = False
+        elif len(segments) == 2:
+            queue = broker.queues[segments[0]].get(segments[1])
+            items = [queue] if queue else []
+            found = queue is not None
+        elif segments:
+            items, found = list(broker.queues[segments[0]].values()), True
+        else:
+            items, found = [q for vhost in broker.queues.values() for q in vhost.values()], True
+
+        params = request.query_params
+        name_filter = params.get("name")
+        if name_filter and len(segments) < 2:
+            items = [q for q in items if name_filter in q.name]
+        total = len(items)
+        page = params.get("page")
+        if page is not None and len(segments) < 2:
+            page_size = max(min(int(params.get("page_size", 100)), 500), 1)
+            page = max(int(page), 1)
+            items = items[(page - 1) * page_size:page * page_size]
+
+        delay = cfg.request_latency + cfg.latency_per_queue * len(items)
+        if delay > 0:
+            await asyncio.sleep(broker.latency(delay))
+        roll = broker.random.random()
+        if roll < cfg.timeout_rate:
+            broker.injected_timeouts += 1
+            await asyncio.sleep(cfg.hang_seconds)
+        elif roll < cfg.timeout_rate + cfg.failure_rate:
+            broker.injected_failures += 1
+            return _error(500, "internal_server_error", "injected failure")
+        if not found:
+            return _error(404, "Object Not Found", "Not Found")
+
+        t = broker.now()
+        columns = [c.split(".") for c in params.get("columns", "").split(",") if c]
+        body = []
+        for queue in items:
+            info = broker.queue_info(queue, t)
+            body.append(select_columns(info, columns) if columns else info)
+
+        if len(segments) == 2:
+            payload: Any = body[0]
+        elif page is not None:
+            payload = {
+                "filtered_count": total,
+                "item_count": len(body),
+                "items": body,
+                "page": page,
+                "page_count": max(math.ceil(total / page_size), 1),
+                "page_size": page_size,
+                "total_count": total,
+            }
+        else:
+            payload = body
+        content = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        broker.bytes_sent += len(content)
+        return Response(content, media_type="application/json")
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        """替身统计（不需要认证，不经过故障注入）"""
+        return broker.stats()
+
+    @app.post("/fake/clock")
+    async def fake_clock(payload: Dict[str, Any]):
+        """固定曲线时间（秒），time 为 null 时恢复随墙上时间推进"""
+        broker.frozen_time = None if payload.get("time") is None else float(payload["time"])
+        return broker.stats()
+
+    return app
+
+def start_broker(
+    queues: List[QueueSpec],
+    config: Optional[BrokerConfig] = None,
+    port: int = 0,
+) -> Tuple[ServerThread, int]:
+    """在后台线程中启动RabbitMQ替身，返回服务线程和端口"""
+    sockets = bind_sockets("127.0.0.1", [port])
+    server = ServerThread(create_broker_app(queues, config), sockets).start()
+    return server, server.addresses[0][1]
+
+def add_broker_arguments(parser: argparse.ArgumentParser):
+    """队列与故障注入参数（压测脚本启动子进程时复用）"""
+    parser.add_argument("--queues", type=int, default=1000, help="生成的队列数量（指定 --script 时忽略）")
+    parser.add_argument("--vhosts", type=int, default=1, help="生成的队列分布在多少个vhost中")
+    parser.add_argument("--script", help="队列脚本JSON文件")
+    parser.add_argument("--user", default="guest:guest", help="管理API用户，username:password")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的基础延迟（秒）")
+    parser.add_argument("--latency-per-queue", type=float, default=0.0, help="每返回一个队列增加的延迟（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="墙上时间每秒对应的曲线时间（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+
+def broker_from_args(args) -> Tuple[List[QueueSpec], BrokerConfig]:
+    queues = load_queue_script(args.script) if args.script else generate_queues(args.queues, args.vhosts, args.seed)
+    username, _, password = args.user.partition(":")
+    config = BrokerConfig(
+        users={username: password},
+        request_latency=args.latency,
+        latency_per_queue=args.latency_per_queue,
+        failure_rate=args.failure_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+    return queues, config
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.mock_rabbitmq", description="RabbitMQ管理API替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=15672)
+    parser.add_argument("--fd", type=int, help="使用父进程传入的已监听socket（压测脚本使用）")
+    parser.add_argument("--dump", metavar="PATH", help="把生成的队列脚本写入文件后退出")
+    add_broker_arguments(parser)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    queues, config = broker_from_args(args)
+    if args.dump:
+        with open(args.dump, "w", encoding="utf-8") as f:
+            json.dump([asdict(q) for q in queues], f, ensure_ascii=False, indent=2)
+        return 0
+
+    if args.fd is not None:
+        sockets = [socket.socket(fileno=args.fd)]
+    else:
+        sockets = bind_sockets(args.host, [args.port])
+    host, port = sockets[0].getsockname()[:2]
+    logger.info(f"RabbitMQ管理API替身: http://{host}:{port}，{len(queues)} 个队列")
+    server = uvicorn.Server(uvicorn.Config(create_broker_app(queues, config), log_level="warning", access_log=False, backlog=1024))
+    asyncio.run(server.serve(sockets=sockets))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+队列抓取基准测试
+按不同的队列数量启动RabbitMQ管理API替身和临时SQLite数据库，逐轮执行与 record_queue_lengths 相同的
+抓取（scrape_queue_lengths）和写入（store_queue_samples + commit），统计每轮的：
+  - 抓取耗时、加载模型配置耗时、数据库写入耗时
+  - 进程RSS以及单轮的内存分配峰值（tracemalloc，单独多跑一轮，不计入耗时统计）
+  - 每次抓取的响应体大小
+
+RabbitMQ替身默认运行在子进程中，避免与被测代码争用GIL、混入内存统计。
+
+运行：
+  python -m benchmarks.queue_scrape --queues 100,1000,5000 --ticks 5
+  python -m benchmarks.queue_scrape --queues 1000 --vhosts 8 --latency-per-queue 0.0001 --prefill 1000 --json scrape.json
+"""
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.database import Base, configure_sqlite
+from backend.app.models import Environment, Model, QueueLengthRecord
+from backend.app.jobs.queue_jobs import scrape_queue_lengths, store_queue_samples
+from .mock_rabbitmq import BrokerConfig, QueueSpec, generate_queues, start_broker
+from .servers import bind_sockets
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TICK_SECONDS = 60  # 与 record_queue_lengths 的执行间隔一致
+
+@dataclass
+class ScrapeResult:
+    """某个队列数量下的测试结果，耗时单位为毫秒"""
+    queues: int
+    vhosts: int
+    ticks: int
+    sampled: int  # 最后一轮抓取到的队列数
+    load_ms_p50: float
+    scrape_ms_p50: float
+    scrape_ms_max: float
+    write_ms_p50: float
+    write_ms_max: float
+    response_kb: float  # 每次请求的平均响应体大小
+    rss_mb: float
+    rss_growth_mb: float  # 测试期间RSS的增长
+    alloc_peak_mb: float  # 单轮（抓取+写入）的内存分配峰值
+    db_mb: float
+
+def current_rss_mb() -> float:
+    """当前进程的常驻内存（MB），非 Linux 系统返回历史峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+@contextmanager
+def broker_process(args, queue_count: int) -> Iterator[int]:
+    """在子进程中运行RabbitMQ替身，监听socket由本进程绑定后传入，返回端口"""
+    sock = bind_sockets("127.0.0.1", [0])[0]
+    port = sock.getsockname()[1]
+    command = [
+        sys.executable, "-m", "benchmarks.mock_rabbitmq", "--fd", str(sock.fileno()),
+        "--queues", str(queue_count), "--vhosts", str(args.vhosts), "--seed", str(args.seed),
+        "--latency", str(args.latency), "--latency-per-queue", str(args.latency_per_queue),
+        "--failure-rate", str(args.failure_rate),
+    ]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, pass_fds=[sock.fileno()])
+    sock.close()
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/fake/stats", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("RabbitMQ替身启动失败")
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(10)
+
+@contextmanager
+def broker_thread(args, queue_count: int) -> Iterator[int]:
+    """在后台线程中运行RabbitMQ替身（--in-process）"""
+    config = BrokerConfig(
+        request_latency=args.latency,
+        latency_per_queue=args.latency_per_queue,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    server, port = start_broker(generate_queues(queue_count, args.vhosts, args.seed), config)
+    try:
+        yield port
+    finally:
+        server.stop()
+
+def seed_database(db: Session, queues: List[QueueSpec], port: int, prefill: int, start: datetime):
+    """创建环境和与队列一一对应的模型，可预先写入若干轮历史记录（使清理历史的开销接近线上）"""
+    environment = Environment(name="benchmark", description="队列抓取基准测试")
+    db.add(environment)
+    db.flush()
+    db.execute(insert(Model), [
+        {
+            "environment_id": environment.id,
+            "model_name": queue.name,
+            "rabbitmq_queue_name": queue.name,
+            "rabbitmq_host": "127.0.0.1",
+            "rabbitmq_port": port,
+            "rabbitmq_username": "guest",
+            "rabbitmq_password": "guest",
+            "rabbitmq_vhost": queue.vhost,
+        }
+        for queue in queues
+    ])
+    model_ids = [row.id for row in db.query(Model.id).order_by(Model.id)]
+    for step in range(prefill, 0, -1):
+        timestamp = start - timedelta(seconds=step * TICK_SECONDS)
+        db.execute(insert(QueueLengthRecord), [
+            {"model_id": model_id, "length": 0, "consumers": 1, "timestamp": timestamp}
+            for model_id in model_ids
+        ])
+    db.commit()
+
+async def run_tick(db: Session, now: datetime) -> Dict[str, float]:
+    """执行一轮抓取和写入，返回各阶段耗时（毫秒）和抓取到的队列数"""
+    started = time.perf_counter()
+    models = db.query(Model).filter(Model.rabbitmq_host.isnot(None), Model.rabbitmq_queue_name.isnot(None)).all()
+    loaded = time.perf_counter()
+    samples = await scrape_queue_lengths(models)
+    scraped = time.perf_counter()
+    store_queue_samples(db, samples, now)
+    db.commit()
+    written = time.perf_counter()
+    db.expunge_all()
+    return {
+        "load_ms": (loaded - started) * 1000,
+        "scrape_ms": (scraped - loaded) * 1000,
+        "write_ms": (written - scraped) * 1000,
+        "sampled": len(samples),
+    }
+
+async def benchmark_queue_count(args, queue_count: int) -> ScrapeResult:
+    workdir = tempfile.mkdtemp(prefix="queue-scrape-")
+    db_path = os.path.join(workdir, "bench.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    broker = broker_thread if args.in_process else broker_process
+    try:
+        with broker(args, queue_count) as port:
+            start = datetime(2024, 1, 1)
+            seed_database(db, generate_queues(queue_count, args.vhosts, args.seed), port, args.prefill, start)
+            gc.collect()
+            rss_before = current_rss_mb()
+
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as control:
+                ticks = []
+                for tick in range(args.ticks + 1):
+                    # 曲线时间与写入的时间戳同步推进
+                    await control.post("/fake/clock", json={"time": tick * TICK_SECONDS})
+                    now = start + timedelta(seconds=tick * TICK_SECONDS)
+                    if tick < args.ticks:
+                        ticks.append(await run_tick(db, now))
+                        continue
+                    gc.collect()
+                    tracemalloc.start()
+                    await run_tick(db, now)
+                    alloc_peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                stats = (await control.get("/fake/stats")).json()
+            rss_after = current_rss_mb()
+    finally:
+        db.close()
+        engine.dispose()
+    db_mb = os.path.getsize(db_path) / 2 ** 20
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    def column(key: str) -> List[float]:
+        return [t[key] for t in ticks]
+
+    return ScrapeResult(
+        queues=queue_count,
+        vhosts=args.vhosts,
+        ticks=args.ticks,
+        sampled=ticks[-1]["sampled"],
+        load_ms_p50=round(statistics.median(column("load_ms")), 2),
+        scrape_ms_p50=round(statistics.median(column("scrape_ms")), 2),
+        scrape_ms_max=round(max(column("scrape_ms")), 2),
+        write_ms_p50=round(statistics.median(column("write_ms")), 2),
+        write_ms_max=round(max(column("write_ms")), 2),
+        response_kb=round(stats["bytes_sent"] / max(stats["requests"], 1) / 1024, 1),
+        rss_mb=round(rss_after, 1),
+        rss_growth_mb=round(rss_after - rss_before, 1),
+        alloc_peak_mb=round(alloc_peak / 2 ** 20, 2),
+        db_mb=round(db_mb, 2),
+    )
+
+def print_results(results: List[ScrapeResult]):
+    header = (
+        f"{'queues':>7} {'vhosts':>6} {'sampled':>7} {'load ms':>8} {'scrape p50':>10} {'scrape max':>10} "
+        f"{'write p50':>9} {'write max':>9} {'resp KB':>8} {'alloc MB':>8} {'rss MB':>7} {'rss +MB':>7} {'db MB':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.queues:>7} {r.vhosts:>6} {r.sampled:>7} {r.load_ms_p50:>8.1f} {r.scrape_ms_p50:>10.1f} {r.scrape_ms_max:>10.1f} "
+            f"{r.write_ms_p50:>9.1f} {r.write_ms_max:>9.1f} {r.response_kb:>8.1f} {r.alloc_peak_mb:>8.2f} "
+            f"{r.rss_mb:>7.1f} {r.rss_growth_mb:>7.1f} {r.db_mb:>7.2f}"
+        )
+
+async def run_benchmark(args) -> List[ScrapeResult]:
+    results = []
+    for queue_count in args.queues:
+        logger.info(f"测试 {queue_count} 个队列")
+        results.append(await benchmark_queue_count(args, queue_count))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.queue_scrape", description="队列抓取基准测试")
+    parser.add_argument("--queues", type=lambda s: [int(x) for x in s.split(",")], default=[100, 1000, 5000],
+                        help="队列数量，逗号分隔")
+    parser.add_argument("--vhosts", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=5, help="每个队列数量下计时的轮数")
+    parser.add_argument("--prefill", type=int, default=0, help="预先为每个队列写入的历史记录条数")
+    parser.add_argument("--latency", type=float, default=0.0, help="RabbitMQ替身每个请求的基础延迟（秒）")
+    parser.add_argument("--latency-per-queue", type=float, default=0.0, help="RabbitMQ替身每返回一个队列增加的延迟（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true", help="在本进程的后台线程中运行RabbitMQ替身")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    results = asyncio.run(run_benchmark(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
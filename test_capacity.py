@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+模型容量估算测试：到达速率、单实例服务速率、排空时间、所需处理能力与实例数的计算。
+纯函数计算，不需要数据库和服务。在项目根目录运行: pytest -q test_capacity.py
+"""
+import pytest
+
+from backend.app.services.capacity import (
+    capacity_demand, drain_seconds, estimate_arrival_rate, estimate_model_capacity, estimate_service_rate,
+)
+from backend.app.services.queue_stats import QueueWindowStats
+
+def _stats(recent_avg_length=0.0, trend=0.0, publish_rate=None, deliver_rate=None, consumers=None):
+    return QueueWindowStats(
+        model_id=1, sample_count=30, avg_length=recent_avg_length, max_length=int(recent_avg_length),
+        recent_avg_length=recent_avg_length, trend=trend,
+        publish_rate=publish_rate, deliver_rate=deliver_rate, consumers=consumers,
+    )
+
+@pytest.mark.parametrize("stats, window_seconds, expected", [
+    # 有发布速率时直接使用，忽略投递速率与趋势
+    (_stats(publish_rate=5.0, deliver_rate=3.0, trend=60.0), 1200, 5.0),
+    (_stats(publish_rate=-1.0), 1200, 0.0),
+    # 没有发布速率：投递速率 + 队列增长速率（趋势 60 条，两段中心相隔 600 秒）
+    (_stats(deliver_rate=3.0, trend=60.0), 1200, 3.1),
+    (_stats(deliver_rate=3.0, trend=-60.0), 1200, 2.9),
+    (_stats(trend=-600.0), 1200, 0.0),
+    (_stats(deliver_rate=3.0, trend=60.0), 0, 3.0),
+])
+def test_estimate_arrival_rate(stats, window_seconds, expected):
+    assert estimate_arrival_rate(stats, window_seconds) == pytest.approx(expected)
+
+@pytest.mark.parametrize("stats, inference_time, expected", [
+    # 有积压时由投递速率 / 消费者数观测
+    (_stats(recent_avg_length=5.0, deliver_rate=10.0, consumers=2.0), 0.5, (5.0, "observed")),
+    # 没有积压、没有消费者或没有投递速率时按平均推理时间换算
+    (_stats(recent_avg_length=0.0, deliver_rate=10.0, consumers=2.0), 0.5, (2.0, "static")),
+    (_stats(recent_avg_length=5.0, deliver_rate=10.0), 0.5, (2.0, "static")),
+    (_stats(recent_avg_length=5.0, consumers=2.0), 0.5, (2.0, "static")),
+    (None, 0.25, (4.0, "static")),
+    (_stats(recent_avg_length=5.0), None, (None, "none")),
+])
+def test_estimate_service_rate(stats, inference_time, expected):
+    assert estimate_service_rate(stats, inference_time) == expected
+
+@pytest.mark.parametrize("queue_length, arrival_rate, service_rate, instances, expected", [
+    (0.0, 5.0, 1.0, 0, 0.0),
+    (100.0, 1.0, 1.0, 2, 100.0),
+    # 处理能力不超过到达速率、没有实例或服务速率未知时无法排空
+    (100.0, 2.0, 1.0, 2, None),
+    (100.0, 3.0, 1.0, 2, None),
+    (100.0, 0.0, 1.0, 0, None),
+    (100.0, 0.0, None, 2, None),
+])
+def test_drain_seconds(queue_length, arrival_rate, service_rate, instances, expected):
+    assert drain_seconds(queue_length, arrival_rate, service_rate, instances) == expected
+
+@pytest.mark.parametrize("queue_length, arrival_rate, service_rate, target_utilization, expected", [
+    # 没有积压也没有流量
+    (0.0, 0.0, 1.0, 0.8, 0.0),
+    (0.0, 0.0, None, 0.8, 0.0),
+    # 服务速率未知时按一个实例计
+    (10.0, 0.0, None, 0.8, 1.0),
+    # 排空积压所需 (λ + L/T) / μ = (1 + 600/300) / 1 大于稳态所需 λ / (ρμ) = 1.25
+    (600.0, 1.0, 1.0, 0.8, 3.0),
+    # 没有积压时由稳态利用率决定：4 / (1 × 0.8)
+    (0.0, 4.0, 1.0, 0.8, 5.0),
+])
+def test_capacity_demand(queue_length, arrival_rate, service_rate, target_utilization, expected):
+    assert capacity_demand(queue_length, arrival_rate, service_rate, 300, target_utilization) == pytest.approx(expected)
+
+@pytest.mark.parametrize("publish_rate, inference_time, expected", [
+    # 0.1 + 0.2 的浮点误差使 demand 略大于 3，不应多算一个实例
+    (0.1 + 0.2, 10.0, 3),
+    (0.32, 10.0, 4),
+    (0.0, 10.0, 0),
+])
+def test_required_instances_ceiling(publish_rate, inference_time, expected):
+    capacity = estimate_model_capacity(
+        _stats(publish_rate=publish_rate), inference_time, instances=1, window_seconds=1800, target_drain_seconds=300,
+    )
+    assert capacity.required_instances == expected
+
+def test_capacity_deficit_cannot_drain():
+    """实例处理能力低于到达速率：无法排空，所需实例数按积压与稳态利用率计算"""
+    capacity = estimate_model_capacity(
+        _stats(recent_avg_length=10.0, publish_rate=2.0), 1.0, instances=1, window_seconds=1800,
+        target_drain_seconds=300, target_utilization=0.8,
+    )
+    assert capacity.service_rate == 1.0 and capacity.service_rate_source == "static"
+    assert capacity.drain_seconds is None
+    assert capacity.wait_seconds == 5.0
+    assert capacity.required_instances == 3
+
+def test_forecast_peak_overrides_smaller_backlog():
+    """预测峰值大于当前积压时按预测峰值计算所需实例数，排空时间与排队时间仍按当前积压计算"""
+    stats = _stats(recent_avg_length=10.0, publish_rate=1.0)
+    current = estimate_model_capacity(stats, 1.0, instances=2, window_seconds=1800, target_drain_seconds=300)
+    planned = estimate_model_capacity(
+        stats, 1.0, instances=2, window_seconds=1800, target_drain_seconds=300, forecast_queue_length=600.0,
+    )
+    assert current.required_instances == 2 and current.forecast_queue_length is None
+    assert planned.demand == pytest.approx(3.0)
+    assert planned.required_instances == 3
+    assert planned.forecast_queue_length == 600.0
+    assert planned.queue_length == 10.0
+    assert planned.drain_seconds == current.drain_seconds == 10.0
+
+    # 预测峰值小于当前积压时不降低所需实例数
+    smaller = estimate_model_capacity(
+        stats, 1.0, instances=2, window_seconds=1800, target_drain_seconds=300, forecast_queue_length=1.0,
+    )
+    assert smaller.demand == current.demand
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+部署计划执行器测试：同一GPU上 stop 先于 start、前序操作失败后跳过、单个操作超时、单节点与全局并发上限。
+用记录调用的模拟节点客户端替换全局节点管理器（与仿真相同的 use_node_manager），不需要数据库和节点服务。
+在项目根目录运行: pytest -q test_executor.py
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+from backend.app.services.node_client import NodeManager
+from backend.app.simulation import use_node_manager
+from backend.app.strategies.executor import execute_plan, group_actions_by_gpu
+from backend.app.strategies.plan import DeploymentAction, DeploymentPlan
+
+class FakeNodeClient:
+    def __init__(self, manager: "FakeNodeManager", node_key: str):
+        self._manager = manager
+        self._node_key = node_key
+
+    async def _call(self, name: str, model_name: str, gpu_id: int):
+        manager = self._manager
+        manager.calls.append((self._node_key, name, model_name, gpu_id))
+        manager.in_flight[self._node_key] = manager.in_flight.get(self._node_key, 0) + 1
+        manager.total_in_flight += 1
+        manager.peak[self._node_key] = max(manager.peak.get(self._node_key, 0), manager.in_flight[self._node_key])
+        manager.total_peak = max(manager.total_peak, manager.total_in_flight)
+        try:
+            await asyncio.sleep(manager.delays.get(model_name, manager.delay))
+            if model_name in manager.failing:
+                raise RuntimeError(f"{name} {model_name} 失败")
+        finally:
+            manager.in_flight[self._node_key] -= 1
+            manager.total_in_flight -= 1
+        return {"status": "success"}
+
+    async def start_model(self, model_name: str, gpu_id: int, config: Optional[Dict] = None):
+        return await self._call("start", model_name, gpu_id)
+
+    async def stop_model(self, model_name: str, gpu_id: int):
+        return await self._call("stop", model_name, gpu_id)
+
+class FakeNodeManager(NodeManager):
+    """记录调用顺序与同时进行中的调用数；delays 按模型名称指定耗时，failing 中的模型调用失败"""
+
+    def __init__(self, delay: float = 0.01, delays: Optional[Dict[str, float]] = None, failing=()):
+        super().__init__()
+        self.delay = delay
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.calls: List[tuple] = []
+        self.in_flight: Dict[str, int] = {}
+        self.peak: Dict[str, int] = {}
+        self.total_in_flight = 0
+        self.total_peak = 0
+
+    def get_client(self, node_ip: str, node_port: int = 6004) -> FakeNodeClient:
+        return FakeNodeClient(self, f"{node_ip}:{node_port}")
+
+def _action(action, node_ip, gpu_id, model_name, old_model_name=None):
+    return DeploymentAction(
+        action=action, node_id=1, node_ip=node_ip, node_port=6004, gpu_id=gpu_id,
+        model_name=model_name, old_model_name=old_model_name,
+    )
+
+def _execute(manager, actions, **kwargs):
+    with use_node_manager(manager):
+        return asyncio.run(execute_plan(DeploymentPlan(strategy="test", actions=actions), **kwargs))
+
+def test_stop_runs_before_start_on_same_gpu():
+    """计划中 start 排在 stop 之前时，同一GPU上仍先停止再启动；replace 先停止旧模型"""
+    actions = [
+        _action("start", "10.0.0.1", 0, "new"),
+        _action("stop", "10.0.0.1", 0, "old"),
+        _action("replace", "10.0.0.1", 1, "B", old_model_name="A"),
+    ]
+    assert group_actions_by_gpu(actions)[("10.0.0.1:6004", 0)] == [1, 0]
+
+    manager = FakeNodeManager()
+    report = _execute(manager, actions)
+    assert report.succeeded == 3
+    gpu0 = [(name, model) for _, name, model, gpu in manager.calls if gpu == 0]
+    gpu1 = [(name, model) for _, name, model, gpu in manager.calls if gpu == 1]
+    assert gpu0 == [("stop", "old"), ("start", "new")]
+    assert gpu1 == [("stop", "A"), ("start", "B")]
+
+def test_failure_skips_later_actions_on_same_gpu():
+    """stop 失败后同一GPU上的 start 跳过，其他GPU上的操作不受影响；results 与计划顺序一致"""
+    actions = [
+        _action("start", "10.0.0.1", 0, "new"),
+        _action("stop", "10.0.0.1", 0, "broken"),
+        _action("start", "10.0.0.1", 1, "other"),
+    ]
+    manager = FakeNodeManager(failing={"broken"})
+    report = _execute(manager, actions)
+
+    start, stop, other = report.results
+    assert not stop.success and not stop.skipped and "broken" in stop.error
+    assert not start.success and start.skipped
+    assert other.success
+    assert (report.succeeded, report.failed, report.skipped) == (1, 1, 1)
+    assert ("10.0.0.1:6004", "start", "new", 0) not in manager.calls
+
+def test_each_action_has_its_own_timeout():
+    """超时的操作返回超时错误，不影响其他操作"""
+    actions = [_action("start", "10.0.0.1", 0, "slow"), _action("start", "10.0.0.1", 1, "fast")]
+    manager = FakeNodeManager(delays={"slow": 5.0})
+    report = _execute(manager, actions, timeout=0.05)
+
+    slow, fast = report.results
+    assert not slow.success and not slow.skipped
+    assert slow.error == "超时（0.05s）"
+    assert fast.success
+    assert report.duration_ms < 2000
+
+def test_concurrency_limits_per_node_and_global():
+    """同时进行中的操作数不超过单节点上限和全局上限"""
+    actions = [_action("start", f"10.0.0.{n}", gpu, f"m{n}-{gpu}") for n in (1, 2, 3) for gpu in range(6)]
+    manager = FakeNodeManager(delay=0.02)
+    report = _execute(manager, actions, concurrency=4, per_node_concurrency=2)
+
+    assert report.succeeded == len(actions)
+    assert max(manager.peak.values()) == 2
+    assert manager.total_peak == 4
+
+def test_busy_node_does_not_hold_global_slots():
+    """繁忙节点上排队的操作不占用全局名额：另一节点的操作与繁忙节点的第一个操作同时开始"""
+    actions = [_action("start", "10.0.0.1", gpu, f"busy-{gpu}") for gpu in range(4)]
+    actions.append(_action("start", "10.0.0.2", 0, "other"))
+    manager = FakeNodeManager(delay=0.05)
+    _execute(manager, actions, concurrency=2, per_node_concurrency=1)
+
+    started = [model for _, _, model, _ in manager.calls]
+    assert "other" in started[:2]
+    assert manager.peak["10.0.0.1:6004"] == 1
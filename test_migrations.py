@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+数据库迁移测试：修改模型（新增表、列、索引）时必须同时提交迁移，否则已有数据的数据库升级后会缺少这些结构。
+使用临时 SQLite 数据库，不需要启动服务。在项目根目录运行: pytest -q test_migrations.py
+"""
+from sqlalchemy import create_engine, text
+from alembic import command
+
+from backend.app.migrations import BASELINE_REVISION, alembic_config, schema_differences, upgrade_database
+
+def _engine(tmp_path, name):
+    return create_engine(f"sqlite:///{tmp_path / name}")
+
+def _upgrade(engine, revision):
+    config = alembic_config()
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+def test_fresh_database_matches_models(tmp_path):
+    """从空数据库升级到最新版本后与模型一致"""
+    engine = _engine(tmp_path, "fresh.db")
+    upgrade_database(engine)
+    with engine.connect() as connection:
+        assert schema_differences(connection) == []
+
+def test_original_database_upgrades_with_data(tmp_path):
+    """最初版本的数据库（含数据）升级后与模型一致，节点的GPU与模型列表迁移到关系表"""
+    engine = _engine(tmp_path, "original.db")
+    _upgrade(engine, BASELINE_REVISION)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO environments (name) VALUES ('env')"))
+        connection.execute(text(
+            "INSERT INTO nodes (environment_id, node_ip, node_port, available_gpu_ids, available_models) "
+            "VALUES (1, '10.0.0.1', 6004, '[\"0\", \"1\", \"gpu-x\"]', '[\"MAM\"]')"
+        ))
+        # 模拟引入迁移前的数据库：没有版本记录
+        connection.execute(text("DROP TABLE alembic_version"))
+    upgrade_database(engine)
+
+    with engine.connect() as connection:
+        assert schema_differences(connection) == []
+        gpus = connection.execute(text("SELECT gpu_id FROM node_gpus WHERE node_id = 1 ORDER BY gpu_id")).scalars().all()
+        models = connection.execute(text("SELECT model_name FROM node_supported_models WHERE node_id = 1")).scalars().all()
+    # 无法转换为整数的GPU ID在 gpu_id 改为整数时删除
+    assert gpus == [0, 1]
+    assert models == ["MAM"]
+
+def test_downgrade_to_original_and_upgrade_again(tmp_path):
+    """降级到最初版本再升级，数据和结构保持一致"""
+    engine = _engine(tmp_path, "roundtrip.db")
+    upgrade_database(engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO environments (name) VALUES ('env')"))
+        connection.execute(text("INSERT INTO nodes (environment_id, node_ip, node_port) VALUES (1, '10.0.0.1', 6004)"))
+        connection.execute(text("INSERT INTO node_gpus (node_id, gpu_id) VALUES (1, 3)"))
+
+    config = alembic_config()
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.downgrade(config, BASELINE_REVISION)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT available_gpu_ids FROM nodes")).scalar() == '["3"]'
+
+    upgrade_database(engine)
+    with engine.connect() as connection:
+        assert schema_differences(connection) == []
+        assert connection.execute(text("SELECT count(*) FROM node_gpus")).scalar() == 1
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+GPU分配求解测试：增广路径、空闲GPU优先、剪枝后继续分配、容量约束，并在随机小规模实例上与穷举的最优解对比。
+直接在内存中求解，不需要数据库和服务。在项目根目录运行: pytest -q test_placement.py
+"""
+import itertools
+import random
+
+from backend.app.strategies.placement import PlacementRequest, solve_placement
+
+def _request(name, value, *groups):
+    return PlacementRequest(model=name, value=value, groups=list(groups))
+
+def _placed(requests, assigned):
+    return {requests[i].model: group for i, group in assigned.items()}
+
+def _check_feasible(requests, capacity, assigned):
+    """每个请求只分配到自己可用的槽位组，且任何槽位组不超过容量"""
+    for index, group in assigned.items():
+        assert group in requests[index].groups
+    for group, count in capacity.items():
+        assert sum(1 for g in assigned.values() if g == group) <= count
+
+def _best_value(requests, capacity):
+    """穷举每个请求的分配（或不分配），返回满足容量约束的最大收益"""
+    best = 0.0
+    choices = [[None] + [g for g in r.groups if g in capacity] for r in requests]
+    for combination in itertools.product(*choices):
+        used = {}
+        for group in combination:
+            if group is not None:
+                used[group] = used.get(group, 0) + 1
+        if all(count <= capacity[group] for group, count in used.items()):
+            best = max(best, sum(r.value for r, g in zip(requests, combination) if g is not None))
+    return best
+
+def test_augmenting_path_moves_earlier_model():
+    """收益高的模型先占用了唯一兼容后者的槽位组，需要把它挪到另一个槽位组"""
+    requests = [_request("A", 10, "g1", "g2"), _request("B", 5, "g1")]
+    assigned = solve_placement(requests, {"g1": 1, "g2": 1})
+    assert _placed(requests, assigned) == {"A": "g2", "B": "g1"}
+
+def test_prefers_free_group_over_replaceable():
+    """
+    与 busy_queue_scaling 一样，所有空闲GPU的槽位组排在可替换GPU（运行闲置模型）的槽位组之前：
+    优先使用空闲GPU，增广挪动已分配的模型时同样优先挪到空闲GPU
+    """
+    free, idle = ("node1", "free"), ("node1", "idle")
+    requests = [_request("A", 10, free, idle)]
+    assert _placed(requests, solve_placement(requests, {free: 1, idle: 1})) == {"A": free}
+
+    other_free = ("node2", "free")
+    requests = [_request("A", 10, free, other_free, idle), _request("B", 5, free)]
+    assigned = solve_placement(requests, {free: 1, other_free: 1, idle: 1})
+    assert _placed(requests, assigned) == {"A": other_free, "B": free}
+
+def test_requests_after_failed_augmentation_are_placed():
+    """B 增广失败后 g1 被剪枝，之后的请求仍可在其余槽位组上直接分配或增广"""
+    requests = [
+        _request("A", 10, "g1"),
+        _request("B", 9, "g1"),
+        _request("C", 8, "g2", "g3"),
+        _request("D", 7, "g1", "g2"),
+    ]
+    assigned = solve_placement(requests, {"g1": 1, "g2": 1, "g3": 1})
+    assert _placed(requests, assigned) == {"A": "g1", "C": "g3", "D": "g2"}
+
+def test_unknown_and_empty_groups_are_ignored():
+    requests = [_request("A", 10, "missing"), _request("B", 5), _request("C", 1, "missing", "g1")]
+    assert _placed(requests, solve_placement(requests, {"g1": 1})) == {"C": "g1"}
+
+def test_random_instances_are_feasible_and_optimal():
+    """随机小规模实例上分配满足容量约束，且收益之和等于穷举得到的最优值"""
+    rng = random.Random(20240101)
+    for _ in range(300):
+        groups = [f"g{i}" for i in range(rng.randint(1, 4))]
+        capacity = {g: rng.randint(0, 2) for g in groups}
+        requests = [
+            _request(f"m{i}", rng.choice([1, 2, 3, 5, 8]), *rng.sample(groups, rng.randint(0, len(groups))))
+            for i in range(rng.randint(1, 6))
+        ]
+        assigned = solve_placement(requests, capacity)
+        _check_feasible(requests, capacity, assigned)
+        assert sum(requests[i].value for i in assigned) == _best_value(requests, capacity)
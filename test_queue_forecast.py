@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+队列长度预测测试：第一个季节周期的初始化，包括有缺失时间桶的序列。
+直接在内存中拟合预测状态，不需要数据库和服务。在项目根目录运行: pytest -q test_queue_forecast.py
+"""
+import math
+from datetime import datetime, timedelta
+
+from backend.app.services.queue_forecast import (
+    FORECAST_RESOLUTION, SEASON_LENGTH, fit_bucket, forecast_values, new_forecast_state, season_index,
+)
+
+START = datetime(2024, 1, 1)
+BASE = 20.0
+
+def _daily_pattern(ts):
+    """日内波动的队列长度：均值 BASE，白天高、夜间低"""
+    return BASE + 10.0 * math.sin(2 * math.pi * season_index(ts) / SEASON_LENGTH)
+
+def _fit(buckets, value=_daily_pattern):
+    state = new_forecast_state(model_id=1)
+    seasonal = [None] * SEASON_LENGTH
+    pending = []
+    for bucket in buckets:
+        ts = START + timedelta(seconds=FORECAST_RESOLUTION * bucket)
+        fit_bucket(state, seasonal, pending, ts, value(ts))
+    return state, seasonal
+
+def test_full_first_season_initializes_from_daily_mean():
+    """完整的第一天：水平分量为日均值，季节分量为相对日均值的偏差"""
+    state, seasonal = _fit(range(SEASON_LENGTH))
+    assert state.sample_count == SEASON_LENGTH
+    assert math.isclose(state.level, BASE, abs_tol=1e-9)
+    assert math.isclose(sum(seasonal), 0.0, abs_tol=1e-9)
+    assert math.isclose(seasonal[36], 10.0, abs_tol=1e-9)
+
+def test_gaps_in_first_season():
+    """
+    第一天中间缺失 6 小时、且最后一个时间桶缺失：第二天的第一个时间桶到达时（按时间）完成初始化，
+    水平分量为观测值的均值，观测到的时间桶为相对该均值的偏差，缺失的时间桶为 0
+    """
+    missing = set(range(36, 72)) | {SEASON_LENGTH - 1}
+    observed = [b for b in range(SEASON_LENGTH) if b not in missing]
+    state, seasonal = _fit(observed)
+    assert state.sample_count == SEASON_LENGTH - 1
+    assert all(v is None for i, v in enumerate(seasonal) if i in missing)
+
+    state, seasonal = _fit(observed + [SEASON_LENGTH])
+    values = [_daily_pattern(START + timedelta(seconds=FORECAST_RESOLUTION * b)) for b in observed]
+    mean = sum(values) / len(values)
+    assert state.sample_count == SEASON_LENGTH + 1
+    # 第二天的第一个时间桶与第一天同一位置的值相同，初始化后的水平分量不变
+    assert math.isclose(state.level, mean, rel_tol=1e-6)
+    for bucket in missing:
+        assert seasonal[bucket] == 0.0
+    assert math.isclose(seasonal[10], values[10] - mean, rel_tol=1e-6)
+
+def test_forecast_after_gappy_first_day():
+    """
+    第一天每 5 个时间桶缺失 1 个：初始化后的预测在观测到的时间桶上跟随日内波动，
+    缺失的时间桶预测为水平分量（而不是被减去均值后截断为 0）
+    """
+    missing = {b for b in range(SEASON_LENGTH) if b % 5 == 2}
+    state, seasonal = _fit([b for b in range(SEASON_LENGTH) if b not in missing] + [SEASON_LENGTH])
+    predicted = forecast_values(state, seasonal, SEASON_LENGTH - 1)
+    for h, value in enumerate(predicted, start=1):
+        bucket = (SEASON_LENGTH + h) % SEASON_LENGTH
+        if bucket in missing:
+            assert math.isclose(value, state.level, rel_tol=1e-3)
+        else:
+            ts = START + timedelta(seconds=FORECAST_RESOLUTION * bucket)
+            assert abs(value - _daily_pattern(ts)) < 0.5